@@ -0,0 +1,213 @@
+# python/alert_dispatcher.py
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from log_utils import RateLimitedLogger
+
+throttled_logger = RateLimitedLogger(logging.getLogger(__name__))
+
+
+class _ClientChannel:
+    """单个Socket.IO客户端的待发送队列与发送额度"""
+    __slots__ = ('sid', 'pending', 'in_flight', 'dropped', 'sent')
+
+    def __init__(self, sid: str, max_pending: int):
+        self.sid = sid
+        self.pending = deque(maxlen=max_pending)
+        self.in_flight: Dict[int, float] = {}  # 已发送未确认的消息 {消息序号: 发送时间}
+        self.dropped = 0
+        self.sent = 0
+
+
+class AlertDispatcher:
+    def __init__(self, emit: Callable, event_name: str = 'intrusion_alert', coalesce_window: float = 0.5,
+                 max_inbox: int = 1000, max_pending_per_client: int = 50, max_in_flight: int = 4,
+                 ack_timeout: float = 5.0, stats_window: int = 200):
+        """
+        Socket.IO告警分发器
+        检测线程只把告警放入收件箱，由后台线程合并同一摄像头短时间内的多条告警后，按客户端分别发送；
+        每个客户端最多有 max_in_flight 条未确认消息，慢客户端只会丢弃自己的旧消息，不会拖慢检测
+        :param emit: 发送函数 emit(event_name, payload, to=sid, callback=ack)
+        :param event_name: Socket.IO事件名
+        :param coalesce_window: 合并窗口（秒），同一摄像头窗口内的告警合并为一条批量消息
+        :param max_inbox: 收件箱容量，满时丢弃最旧的告警
+        :param max_pending_per_client: 每个客户端待发送队列容量，满时丢弃最旧的消息
+        :param max_in_flight: 每个客户端最多未确认消息数
+        :param ack_timeout: 未确认消息超时（秒），超时后释放发送额度
+        :param stats_window: 统计最近多少次发送的延迟
+        """
+        self.emit = emit
+        self.event_name = event_name
+        self.coalesce_window = coalesce_window
+        self.max_pending_per_client = max_pending_per_client
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+
+        self._cond = threading.Condition()
+        self._inbox = deque(maxlen=max_inbox)  # (发布时间, 事件)
+        self._windows: Dict[str, List] = {}  # 各摄像头合并窗口 {deviceId: [窗口开始时间, 事件列表]}
+        self._clients: Dict[str, _ClientChannel] = {}
+        self._message_seq = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计信息
+        self.published = 0
+        self.inbox_dropped = 0
+        self.messages = 0  # 合并后的消息数
+        self._emit_latencies = deque(maxlen=stats_window)  # 告警发布到发送的延迟（秒）
+        self._ack_latencies = deque(maxlen=stats_window)  # 发送到客户端确认的延迟（秒）
+
+    def start(self):
+        """启动分发线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """停止分发线程"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def publish(self, event: Dict):
+        """提交一条告警 (不阻塞，可作为IntrusionDetector的事件回调)"""
+        with self._cond:
+            if len(self._inbox) == self._inbox.maxlen:
+                self.inbox_dropped += 1
+            self._inbox.append((time.time(), event))
+            self.published += 1
+            self._cond.notify()
+
+    def add_client(self, sid: str):
+        """登记新连接的客户端"""
+        with self._cond:
+            self._clients[sid] = _ClientChannel(sid, self.max_pending_per_client)
+
+    def remove_client(self, sid: str):
+        """移除已断开的客户端"""
+        with self._cond:
+            self._clients.pop(sid, None)
+
+    def _on_ack(self, sid: str, message_seq: int):
+        with self._cond:
+            client = self._clients.get(sid)
+            if client is None:
+                return
+            sent_at = client.in_flight.pop(message_seq, None)
+            if sent_at is not None:
+                self._ack_latencies.append(time.time() - sent_at)
+                metrics.ALERT_DELIVERY_SECONDS.labels('socketio_ack').observe(time.time() - sent_at)
+            self._cond.notify()
+
+    def _collect(self, now: float) -> List[Dict]:
+        """把收件箱中的告警放入各摄像头的合并窗口，返回窗口已到期的合并消息"""
+        while self._inbox:
+            published_at, event = self._inbox.popleft()
+            key = str(event.get('deviceId'))
+            window = self._windows.get(key)
+            if window is None:
+                self._windows[key] = [published_at, [event]]
+            else:
+                window[1].append(event)
+
+        messages = []
+        for key in [k for k, (opened_at, _) in self._windows.items() if now - opened_at >= self.coalesce_window]:
+            opened_at, events = self._windows.pop(key)
+            if len(events) == 1:
+                payload = events[0]
+            else:
+                payload = {'deviceId': events[-1].get('deviceId'), 'count': len(events), 'alerts': events}
+            messages.append((opened_at, payload))
+        return messages
+
+    def _pump(self, client: _ClientChannel, now: float, sends: List):
+        """在发送额度内取出客户端的待发送消息 (实际发送在锁外进行)"""
+        for message_seq, sent_at in list(client.in_flight.items()):
+            if now - sent_at >= self.ack_timeout:
+                del client.in_flight[message_seq]
+
+        while client.pending and len(client.in_flight) < self.max_in_flight:
+            message_seq, opened_at, payload = client.pending.popleft()
+            client.in_flight[message_seq] = now
+            client.sent += 1
+            self._emit_latencies.append(now - opened_at)
+            metrics.ALERT_DELIVERY_SECONDS.labels('socketio').observe(now - opened_at)
+            sends.append((client.sid, message_seq, payload))
+
+    def _run(self):
+        while True:
+            sends = []
+            with self._cond:
+                if not self._running:
+                    break
+                now = time.time()
+                for opened_at, payload in self._collect(now):
+                    self._message_seq += 1
+                    self.messages += 1
+                    for client in self._clients.values():
+                        if len(client.pending) == client.pending.maxlen:
+                            client.dropped += 1
+                        client.pending.append((self._message_seq, opened_at, payload))
+
+                for client in self._clients.values():
+                    self._pump(client, now, sends)
+
+                if not sends:
+                    # 等待下一个合并窗口到期、新告警或客户端确认
+                    if self._windows:
+                        timeout = min(opened_at for opened_at, _ in self._windows.values()) + self.coalesce_window - now
+                    else:
+                        timeout = self.ack_timeout
+                    if not self._inbox and timeout > 0:
+                        self._cond.wait(timeout)
+                    continue
+
+            # 在锁外发送，避免慢客户端阻塞检测线程提交告警
+            for sid, message_seq, payload in sends:
+                try:
+                    self.emit(self.event_name, payload, to=sid,
+                              callback=lambda *args, _sid=sid, _seq=message_seq: self._on_ack(_sid, _seq))
+                except Exception as e:
+                    with self._cond:
+                        client = self._clients.get(sid)
+                        if client is not None:
+                            client.in_flight.pop(message_seq, None)
+                    throttled_logger.error('emit', "发送告警通知失败: %s", e)
+
+    def get_stats(self) -> Dict:
+        """获取分发统计：告警数、合并后消息数、丢弃数以及发送/确认延迟（毫秒）"""
+        with self._cond:
+            emit_latencies = [latency * 1000 for latency in self._emit_latencies]
+            ack_latencies = [latency * 1000 for latency in self._ack_latencies]
+            clients = {
+                sid: {
+                    'pending': len(client.pending),
+                    'inFlight': len(client.in_flight),
+                    'sent': client.sent,
+                    'dropped': client.dropped,
+                }
+                for sid, client in self._clients.items()
+            }
+            stats = {
+                'published': self.published,
+                'messages': self.messages,
+                'inboxDropped': self.inbox_dropped,
+                'clientDropped': sum(client['dropped'] for client in clients.values()),
+                'clients': clients,
+            }
+        stats['avgEmitLatencyMs'] = round(sum(emit_latencies) / len(emit_latencies), 2) if emit_latencies else 0
+        stats['maxEmitLatencyMs'] = round(max(emit_latencies), 2) if emit_latencies else 0
+        stats['avgAckLatencyMs'] = round(sum(ack_latencies) / len(ack_latencies), 2) if ack_latencies else 0
+        return stats
@@ -0,0 +1,289 @@
+# python/alert_outbox.py
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from log_utils import RateLimitedLogger
+
+throttled_logger = RateLimitedLogger(logging.getLogger(__name__))
+
+
+class AlertOutbox:
+    def __init__(self, report_url: str, token_provider: Callable[[], Optional[str]],
+                 batch_url: Optional[str] = None, max_queue: int = 1000, batch_size: int = 20,
+                 batch_wait: float = 0.5, max_retries: int = 4, backoff_base: float = 1.0,
+                 backoff_max: float = 60.0, journal_path: str = 'alert_outbox.jsonl',
+                 timeout: float = 10.0, verify=False, pool_size: int = 4):
+        """
+        告警上报发件箱
+        检测线程只把告警放入有界队列，由后台线程通过连接池批量上报RuoYi；
+        上报失败时指数退避重试，RuoYi不可达时写入本地日志文件，恢复后自动补发
+        :param report_url: 单条告警上报地址
+        :param token_provider: 获取RuoYi认证Token的函数
+        :param batch_url: 批量上报地址 (接收告警数组)，为None时逐条上报
+        :param max_queue: 内存队列容量，满时直接写入本地日志
+        :param batch_size: 单批次最多告警数
+        :param batch_wait: 凑批最长等待时间（秒）
+        :param max_retries: 单批次最大重试次数
+        :param backoff_base: 退避基数（秒），第n次重试等待 base * 2^n (带随机抖动)
+        :param backoff_max: 最大退避时间（秒），也是RuoYi不可达后再次探测的间隔
+        :param journal_path: 本地日志文件路径 (JSON Lines)
+        :param timeout: 单次HTTP请求超时（秒）
+        :param verify: 是否校验SSL证书
+        :param pool_size: HTTP连接池大小
+        """
+        self.report_url = report_url
+        self.batch_url = batch_url
+        self.token_provider = token_provider
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.journal_path = journal_path
+        self.timeout = timeout
+        self.verify = verify
+
+        self._queue: "queue.Queue[Tuple[float, Dict]]" = queue.Queue(maxsize=max_queue)
+        self._journal_lock = threading.Lock()
+        self._running = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._offline_until = 0.0  # RuoYi被判定不可达，在此之前直接写入本地日志
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # 统计信息
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.delivered = 0
+        self.retries = 0
+        self.spilled = 0
+        self.replayed = 0
+
+    def start(self):
+        """启动后台上报线程"""
+        if self._running:
+            return
+        self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='alert-outbox', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """停止后台线程，未发送的告警写入本地日志"""
+        if not self._running:
+            return
+        self._running = False
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        remaining = self._drain(self._queue.qsize())
+        if remaining:
+            self._spill([alert for _, alert in remaining])
+
+    def submit(self, alert: Dict) -> bool:
+        """
+        提交一条告警 (不阻塞)
+        :return: 是否进入内存队列；队列已满时写入本地日志并返回False
+        """
+        with self._stats_lock:
+            self.submitted += 1
+        try:
+            # 队列中保存提交时间，用于统计提交到上报成功的耗时
+            self._queue.put_nowait((time.time(), alert))
+            return True
+        except queue.Full:
+            self._spill([alert])
+            return False
+
+    def _drain(self, limit: int) -> List[Tuple[float, Dict]]:
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _next_batch(self) -> List[Tuple[float, Dict]]:
+        """等待第一条告警，然后在batch_wait内尽量凑满一个批次"""
+        try:
+            first = self._queue.get(timeout=1.0)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        self._replay_journal()
+        while self._running:
+            items = self._next_batch()
+            if items:
+                batch = [alert for _, alert in items]
+                if time.time() < self._offline_until:
+                    self._spill(batch)
+                    continue
+                failed = self._deliver(batch)
+                # 发送失败的总是批次末尾的告警 (逐条上报时遇到失败即停止)
+                now = time.time()
+                for submitted_at, _ in items[:len(items) - len(failed)]:
+                    metrics.ALERT_DELIVERY_SECONDS.labels('ruoyi').observe(now - submitted_at)
+                if failed:
+                    self._spill(failed)
+                    self._offline_until = time.time() + self.backoff_max
+                    continue
+            if time.time() >= self._offline_until:
+                self._replay_journal()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _deliver(self, batch: List[Dict]) -> List[Dict]:
+        """
+        带重试地发送一批告警
+        :return: 重试耗尽后仍未成功的告警
+        """
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            pending = self._send(pending)
+            if not pending:
+                return []
+            if attempt < self.max_retries:
+                with self._stats_lock:
+                    self.retries += 1
+                if self._stop_event.wait(self._backoff(attempt)):
+                    break
+        return pending
+
+    def _send(self, batch: List[Dict]) -> List[Dict]:
+        """
+        发送一批告警
+        :return: 发送失败的告警
+        """
+        token = self.token_provider()
+        if not token:
+            return batch
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+        if self.batch_url and len(batch) > 1:
+            if self._post(self.batch_url, batch, headers):
+                self._mark_delivered(len(batch))
+                return []
+            return batch
+
+        failed = []
+        for i, alert in enumerate(batch):
+            if self._post(self.report_url, alert, headers):
+                self._mark_delivered(1)
+            else:
+                # 一条失败说明RuoYi当前状态异常，剩余告警留待重试
+                failed = batch[i:]
+                break
+        return failed
+
+    def _post(self, url: str, payload, headers: Dict) -> bool:
+        try:
+            response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout, verify=self.verify)
+            return response.status_code == 200 and response.json().get('code') == 200
+        except Exception as e:
+            throttled_logger.warning('post', "上报告警失败: %s", e)
+            return False
+
+    def _mark_delivered(self, count: int):
+        with self._stats_lock:
+            self.delivered += count
+
+    def _spill(self, alerts: List[Dict]):
+        """将告警追加写入本地日志文件"""
+        if not alerts:
+            return
+        try:
+            with self._journal_lock:
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    for alert in alerts:
+                        f.write(json.dumps(alert, ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+            with self._stats_lock:
+                self.spilled += len(alerts)
+        except Exception as e:
+            throttled_logger.error('journal', "写入告警日志失败: %s", e)
+
+    def _replay_journal(self):
+        """RuoYi恢复后补发本地日志中的告警，发送失败的部分写回日志"""
+        replay_path = self.journal_path + '.replay'
+        with self._journal_lock:
+            has_journal = os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0
+            if os.path.exists(replay_path):
+                # 上次补发中途退出遗留的文件，与新日志合并后一起补发
+                if has_journal:
+                    with open(self.journal_path, 'r', encoding='utf-8') as src, \
+                            open(replay_path, 'a', encoding='utf-8') as dst:
+                        dst.write(src.read())
+                    os.remove(self.journal_path)
+            elif has_journal:
+                os.replace(self.journal_path, replay_path)
+            else:
+                return
+
+        alerts = []
+        with open(replay_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        alerts.append(json.loads(line))
+                    except ValueError:
+                        continue
+
+        for start in range(0, len(alerts), self.batch_size):
+            batch = alerts[start:start + self.batch_size]
+            failed = self._send(batch)
+            with self._stats_lock:
+                self.replayed += len(batch) - len(failed)
+            if failed:
+                self._spill(failed + alerts[start + self.batch_size:])
+                self._offline_until = time.time() + self.backoff_max
+                break
+        os.remove(replay_path)
+
+    def get_stats(self) -> Dict:
+        """获取发件箱统计信息"""
+        with self._stats_lock:
+            stats = {
+                'submitted': self.submitted,
+                'delivered': self.delivered,
+                'retries': self.retries,
+                'spilled': self.spilled,
+                'replayed': self.replayed,
+            }
+        stats['queued'] = self._queue.qsize()
+        stats['offline'] = time.time() < self._offline_until
+        with self._journal_lock:
+            stats['journalBytes'] = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        return stats
@@ -0,0 +1,217 @@
+# python/camera_pipeline.py
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from camera_supervisor import ConnectLimiter
+from frame_grabber import FrameGrabber
+from inference_backends import scale_detections
+from log_utils import RateLimitedLogger
+from motion_gate import MotionGate
+from rate_controller import DetectionRateController
+from stream_broadcaster import StreamHub
+from zones import ZoneSet
+
+throttled_logger = RateLimitedLogger(logging.getLogger(__name__))
+
+
+class CameraPipeline:
+    def __init__(self, rate_controller: DetectionRateController, stream_hub: StreamHub,
+                 on_tracks: Optional[Callable] = None, connect_limiter: Optional[ConnectLimiter] = None,
+                 inference_timeout: float = 5.0, display_fps: float = 15.0, stall_timeout: float = 15.0,
+                 reconnect_options: Optional[Dict] = None):
+        """
+        单个进程内所有摄像头的处理流水线：采集 -> 运动/频率门控 -> 批量推理 -> 跟踪报警 -> 发布画面
+        Web进程 (线程模式) 和各分片进程 (多进程模式) 使用同一套流水线
+        :param rate_controller: 自适应检测帧率控制器
+        :param stream_hub: 视频流广播
+        :param on_tracks: 跟踪结果回调 on_tracks(device_id, shape, tracks, captured_at)
+        :param connect_limiter: 所有摄像头共享的连接速率限制
+        :param inference_timeout: 等待推理结果的超时时间（秒）
+        :param display_fps: 有人观看时显示画面需要的帧率
+        :param stall_timeout: 已连接的码流超过该时间没有新帧视为卡死（秒）
+        :param reconnect_options: 传给 FrameGrabber 的重连参数 (reconnect_delay、max_reconnect_delay、reconnect_jitter)
+        """
+        self.rate_controller = rate_controller
+        self.stream_hub = stream_hub
+        self.on_tracks = on_tracks
+        self.connect_limiter = connect_limiter
+        self.inference_timeout = inference_timeout
+        self.display_fps = display_fps
+        self.stall_timeout = stall_timeout
+        self.reconnect_options = dict(reconnect_options or {})
+
+        # 检测器与推理调度器在模型加载完成后设置
+        self.detector = None
+        self.inference_scheduler = None
+        self.running = False
+
+        self.frame_grabbers: Dict[str, FrameGrabber] = {}  # 每个设备的采集线程 (检测码流)
+        self.display_grabbers: Dict[str, FrameGrabber] = {}  # 检测使用子码流时，显示用主码流的采集线程
+        self.motion_gates: Dict[str, MotionGate] = {}  # 每个设备的运动预过滤器
+        self.lock = threading.Lock()
+        self.latest_frames: Dict[str, object] = {}  # 每个设备最新发布的原始画面
+        self.frame_lock = threading.Lock()
+
+    def run_device(self, device_id, device_info: Dict, stop_event: threading.Event, settings: Dict,
+                   sub_url: Optional[str] = None):
+        """
+        处理单个设备的视频流 (检测阶段，从采集线程的单槽缓冲区取最新帧)，stop_event置位或流水线停止后返回
+        :param device_info: RuoYi设备数据 (rtspUrl为主码流地址)
+        :param settings: 该设备的摄像头参数 (camera_settings合并后的结果)
+        :param sub_url: 检测使用的子码流地址，None表示检测与显示都使用主码流
+        """
+        rtsp_url = device_info.get('rtspUrl')
+        if not rtsp_url:
+            return
+        inference_settings = settings.get('inference', {})
+        imgsz = inference_settings.get('imgsz')  # 为None时使用模型默认输入尺寸
+        # 采集后端与解码参数 (camera_settings.capture)；decode 为 auto 时按检测/显示需要的帧率跳过解码或颜色转换
+        capture_options = settings.get('capture')
+        options = dict(self.reconnect_options, connect_limiter=self.connect_limiter, capture_options=capture_options)
+        # 检测可使用低分辨率子码流，显示仍使用主码流，检测框按分辨率映射回主码流画面
+        grabber = FrameGrabber(device_id, sub_url or rtsp_url, stream='sub' if sub_url else 'main', **options)
+        display_grabber = FrameGrabber(device_id, rtsp_url, stream='main', **options) if sub_url else None
+        motion_gate = MotionGate.from_config(settings.get('motion_gate'))
+        with self.lock:
+            self.frame_grabbers[device_id] = grabber
+            if display_grabber is not None:
+                self.display_grabbers[device_id] = display_grabber
+            self.motion_gates[device_id] = motion_gate
+        self.rate_controller.register(device_id, settings.get('detection_rate'))
+        grabber.start()
+        if display_grabber is not None:
+            display_grabber.set_target_fps(self.display_fps)
+            display_grabber.start()
+
+        frames_skipped = metrics.FRAMES.labels(device_id, 'skipped')
+        frames_detected = metrics.FRAMES.labels(device_id, 'detected')
+        frames_timeout = metrics.FRAMES.labels(device_id, 'timeout')
+        tracking_seconds = metrics.STAGE_SECONDS.labels(device_id, 'tracking')
+        active_tracks = metrics.ACTIVE_TRACKS.labels(device_id)
+        last_seq = 0
+        last_tracks: List[Dict] = []  # 最近一次检测的跟踪结果，跳过检测的帧沿用它绘制
+        try:
+            while self.running and not stop_event.is_set():
+                item = grabber.get_latest(last_seq, timeout=1.0)
+                if item is None:
+                    continue
+                last_seq, frame, captured_at = item
+
+                try:
+                    detector, inference_scheduler = self.detector, self.inference_scheduler
+                    if detector is None or inference_scheduler is None:
+                        time.sleep(0.1)
+                        continue
+                    display_frame = frame
+                    if display_grabber is not None:
+                        display_item = display_grabber.peek()
+                        if display_item is not None:
+                            # 主码流帧仍在采集线程的缓冲区中，绘制前复制一份
+                            display_frame = display_item[1].copy()
+                    has_tracks = detector.has_active_tracks(device_id)
+                    if not has_tracks:
+                        last_tracks = []
+                    # 未到该摄像头的检测时间，或画面静止且没有活动目标时跳过推理；
+                    # 跳过的帧仍按采集/显示帧率发布，标注沿用最近一次的跟踪结果
+                    should_process = self.rate_controller.should_process(device_id, has_tracks, now=captured_at)
+                    # 采集只需输出检测需要的帧；检测码流同时用于显示且有人观看时还需满足显示帧率
+                    target_fps = self.rate_controller.get_target_fps(device_id)
+                    if target_fps and display_grabber is None and self.stream_hub.has_subscribers(device_id):
+                        target_fps = max(target_fps, self.display_fps)
+                    grabber.set_target_fps(round(target_fps, 1) if target_fps else None)
+                    if not (should_process and motion_gate.should_infer(frame, has_tracks)):
+                        frames_skipped.inc()
+                        self.publish_frame(device_id, display_frame, last_tracks)
+                        continue
+                    # 配置了禁区时只对覆盖禁区的区域推理，检测框再平移回原图坐标；
+                    # 禁区与告警判断一样按显示画面的尺寸解析，裁剪区域再缩放到检测码流的分辨率
+                    zones = detector.get_zones(device_id)
+                    infer_frame, offset = (zones.crop(frame, display_frame.shape) if zones is not None
+                                           else (frame, (0, 0)))
+                    detections = inference_scheduler.infer(device_id, infer_frame, timeout=self.inference_timeout,
+                                                           imgsz=imgsz)
+                    if detections is None:
+                        # 推理超时也照常发布画面，原始画面 (overlay=client) 不会因推理变慢而停顿
+                        frames_timeout.inc()
+                        self.publish_frame(device_id, display_frame, last_tracks)
+                        continue
+                    detections = ZoneSet.offset_detections(detections, offset)
+                    detections = scale_detections(detections, frame.shape, display_frame.shape)
+                    # 跟踪器按距上次检测跨越的帧数预测，跳过的帧不会丢失目标
+                    dt = self.rate_controller.mark_processed(device_id, now=captured_at)
+                    # 检测线程只做跟踪和报警，标注绘制推迟到有人观看视频流时
+                    started = time.perf_counter()
+                    tracks = detector.process_detections(display_frame.shape, device_id, detections, dt,
+                                                         now=captured_at)
+                    tracking_seconds.observe(time.perf_counter() - started)
+                    frames_detected.inc()
+                    active_tracks.set(len(tracks))
+                    last_tracks = tracks
+                    self.publish_frame(device_id, display_frame, tracks)
+                    if self.on_tracks is not None:
+                        self.on_tracks(device_id, display_frame.shape, tracks, captured_at)
+                    grabber.mark_detected(captured_at)
+                except Exception as e:
+                    throttled_logger.error(f'frame:{device_id}', "设备 %s 处理帧错误: %s", device_id, e)
+        finally:
+            grabber.stop()
+            if display_grabber is not None:
+                display_grabber.stop()
+            with self.lock:
+                if self.frame_grabbers.get(device_id) is grabber:
+                    del self.frame_grabbers[device_id]
+                if display_grabber is not None and self.display_grabbers.get(device_id) is display_grabber:
+                    del self.display_grabbers[device_id]
+                if self.motion_gates.get(device_id) is motion_gate:
+                    del self.motion_gates[device_id]
+
+    def publish_frame(self, device_id, frame, tracks: List[Dict]):
+        """
+        发布一帧画面：保存原始帧，标注只在有客户端订阅服务端绘制的视频流时才绘制 (每帧最多一次)
+        每个取到的帧都会发布，是否检测只影响跟踪结果的更新频率
+        :param tracks: 本帧的跟踪结果 (未检测的帧为最近一次的结果)，为空时只绘制禁区和统计信息
+        """
+        with self.frame_lock:
+            self.latest_frames[device_id] = frame
+        detector = self.detector
+        drawing_seconds = metrics.STAGE_SECONDS.labels(device_id, 'drawing')
+
+        def render(copy):
+            started = time.perf_counter()
+            annotated = detector.annotate_frame(copy, tracks, device_id)
+            drawing_seconds.observe(time.perf_counter() - started)
+            return annotated
+
+        self.stream_hub.publish(device_id, frame, render=render)
+
+    def remove_device(self, device_id):
+        """销毁已移除设备的跟踪上下文、缓存帧与视频流 (工作线程由监管器停止)"""
+        if self.detector is not None:
+            self.detector.remove_context(device_id)
+        with self.frame_lock:
+            self.latest_frames.pop(device_id, None)
+        self.stream_hub.remove(device_id)
+        self.rate_controller.unregister(device_id)
+        metrics.REGISTRY.remove_camera(device_id)
+
+    def get_grabbers(self, device_id) -> List[FrameGrabber]:
+        """设备当前的采集线程 (检测码流，以及使用子码流检测时的显示码流)"""
+        with self.lock:
+            return [grabber for grabber in (self.frame_grabbers.get(device_id), self.display_grabbers.get(device_id))
+                    if grabber is not None]
+
+    def frame_age(self, device_id) -> Optional[float]:
+        """设备各已连接码流中最久没有新帧的时间（秒），都未连接时返回None"""
+        ages = [age for age in (grabber.frame_age() for grabber in self.get_grabbers(device_id)) if age is not None]
+        return max(ages) if ages else None
+
+    def on_stall(self, device_id):
+        """看门狗检测到视频流卡死：请求卡死的码流断开重连"""
+        for grabber in self.get_grabbers(device_id):
+            age = grabber.frame_age()
+            if age is not None and age > self.stall_timeout:
+                grabber.request_reconnect()
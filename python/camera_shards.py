@@ -0,0 +1,549 @@
+# python/camera_shards.py
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import metrics
+from camera_supervisor import ReconnectBackoff
+from log_utils import RateLimitedLogger, setup_logging
+
+# 分片进程回传的消息分两个通道：
+# 控制通道 (不限长度，发送不阻塞也不丢弃)：('health', 状态)、('event', 告警事件)、('report', RuoYi上报数据)
+# 结果通道 (有界，满时直接丢弃)：('tracks', 设备ID, 画面尺寸, 跟踪结果, 采集时间)、
+#                               ('frame', 设备ID, 档位, 是否服务端标注, multipart数据块)
+RESULT_QUEUE_SIZE = 512
+
+logger = logging.getLogger(__name__)
+throttled_logger = RateLimitedLogger(logger)
+
+
+def _rss_bytes() -> Optional[int]:
+    """当前进程的常驻内存（字节），无法获取时返回None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # 非Linux平台只能取到峰值内存 (macOS为字节，其余为KB)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
+
+
+class _ResultSink:
+    """分片进程中的事件存储：把告警事件转发给Web进程，由Web进程统一写入事件日志/事件库"""
+
+    def __init__(self, control):
+        self.control = control
+
+    def append(self, event: Dict):
+        self.control.put(('event', event))
+
+
+class _ShardRuntime:
+    def __init__(self, index: int, options: Dict, control, results):
+        """
+        分片进程内的运行环境：独立的检测器、推理调度器、检测帧率控制、视频流广播和工作线程监管器
+        :param index: 分片序号
+        :param options: 由Web进程传入的配置 (见 ShardPool)
+        :param control: 回传Web进程的控制通道 (心跳、告警事件、RuoYi上报)，不与画面争用队列空间
+        :param results: 回传Web进程的结果队列 (画面数据块、跟踪结果)，满时丢弃
+        """
+        self.index = index
+        self.options = options
+        self.control = control
+        self.results = results
+        self.state = 'loading'
+        self.devices: Dict[str, Tuple[Dict, Optional[str]]] = {}  # 设备ID -> (摄像头参数, 子码流地址)
+        self.pumps: Dict[Tuple[str, str, bool], threading.Event] = {}
+        self.track_devices: Set[str] = set()
+        self.detector = None
+        self.scheduler = None
+        self.rate_controller = None
+        self.pipeline = None
+        self.supervisor = None
+
+    def load(self):
+        """加载模型并创建流水线 (耗时，期间心跳状态为loading)"""
+        from camera_pipeline import CameraPipeline
+        from camera_supervisor import CameraSupervisor, ConnectLimiter
+        from inference_scheduler import InferenceScheduler
+        from intrusion_detector import IntrusionDetector
+        from rate_controller import DetectionRateController
+        from stream_broadcaster import StreamHub
+
+        options = self.options
+        self.detector = IntrusionDetector(**options['detector'])
+        self.scheduler = InferenceScheduler(self.detector.detect_batch, **options['scheduler'])
+        self.scheduler.start()
+        metrics.REGISTRY.add_collector(
+            lambda: metrics.QUEUE_DEPTH.labels('inference').set(self.scheduler.get_stats()['pending']))
+        self.rate_controller = DetectionRateController(
+            busy_time_provider=lambda: self.scheduler.busy_time, **options['rate']
+        )
+        self.detector.add_event_sink(_ResultSink(self.control))
+        self.detector.add_event_callback(lambda event: self.rate_controller.note_alert(event.get('deviceId')))
+        self.detector.set_report_alert_callback(lambda data: self.control.put(('report', data)))
+
+        self.pipeline = CameraPipeline(
+            self.rate_controller,
+            StreamHub(tiers=options['stream_tiers']),
+            on_tracks=self._on_tracks,
+            connect_limiter=ConnectLimiter(rate=options['max_connects_per_second']),
+            **options['pipeline']
+        )
+        self.pipeline.detector = self.detector
+        self.pipeline.inference_scheduler = self.scheduler
+        self.pipeline.running = True
+        self.supervisor = CameraSupervisor(
+            self._run_device,
+            frame_age=self.pipeline.frame_age,
+            on_stall=self.pipeline.on_stall,
+            **options['watchdog']
+        )
+        self.supervisor.start()
+        self.state = 'running'
+
+    def _run_device(self, device_id, device_data, stop_event):
+        settings, sub_url = self.devices.get(device_id, ({}, None))
+        self.pipeline.run_device(device_id, device_data, stop_event, settings, sub_url)
+
+    def _on_tracks(self, device_id, shape, tracks, captured_at):
+        if device_id in self.track_devices:
+            self._put_nowait(('tracks', device_id, tuple(shape[:2]), tracks, captured_at))
+
+    def _put_nowait(self, message) -> bool:
+        """发送可丢弃的消息 (画面/跟踪结果)，Web进程处理不过来时直接丢弃，不阻塞检测"""
+        try:
+            self.results.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def _pump(self, key: Tuple[str, str, bool], stop: threading.Event):
+        """把本进程编码好的视频流数据块转发给Web进程 (只在Web进程中有人观看该档位时运行)"""
+        device_id, tier, overlay = key
+        stream = self.pipeline.stream_hub.get(device_id, tier, overlay=overlay).subscribe()
+        try:
+            for chunk in stream:
+                if stop.is_set() or self.state != 'running':
+                    break
+                self._put_nowait(('frame', device_id, tier, overlay, chunk))
+        finally:
+            stream.close()
+
+    def _watch(self, streams, track_devices):
+        """更新Web进程中有人观看的视频流和订阅了跟踪结果的设备"""
+        streams = {tuple(key) for key in streams}
+        for key in list(self.pumps):
+            if key not in streams:
+                self.pumps.pop(key).set()
+        for key in streams - set(self.pumps):
+            stop = threading.Event()
+            self.pumps[key] = stop
+            threading.Thread(target=self._pump, args=(key, stop), name=f'pump-{key[0]}-{key[1]}', daemon=True).start()
+        self.track_devices = set(track_devices)
+
+    def handle(self, message) -> bool:
+        """
+        处理Web进程的指令
+        :return: 是否继续运行
+        """
+        command = message[0]
+        if command == 'ensure':
+            _, device_id, device_data, settings, sub_url, zones = message
+            self.devices[device_id] = (settings, sub_url)
+            self.detector.create_context(device_id, device_data)
+            self.detector.set_zones(device_id, zones)
+            self.supervisor.ensure(device_id, device_data)
+        elif command == 'remove':
+            device_id = message[1]
+            self.supervisor.remove(device_id)
+            self.pipeline.remove_device(device_id)
+            self.devices.pop(device_id, None)
+        elif command == 'watch':
+            self._watch(message[1], message[2])
+        elif command == 'stop':
+            return False
+        return True
+
+    def health(self) -> Dict:
+        """心跳状态：进程资源占用以及各摄像头的工作线程、采集和推理统计"""
+        times = os.times()
+        health = {
+            'pid': os.getpid(),
+            'state': self.state,
+            'ts': time.time(),
+            'cpuSeconds': round(times.user + times.system, 2),
+            'rssBytes': _rss_bytes(),
+            'threads': threading.active_count(),
+        }
+        if self.state == 'running':
+            with self.pipeline.frame_lock:
+                online = list(self.pipeline.latest_frames)
+            with self.pipeline.lock:
+                grabbers = dict(self.pipeline.frame_grabbers)
+            health.update({
+                'cameras': self.supervisor.get_stats(),
+                'online': online,
+                'capture': {device_id: grabber.get_stats() for device_id, grabber in grabbers.items()},
+                'inference': self.scheduler.get_stats(),
+                'rates': self.rate_controller.get_stats(),
+                'streams': len(self.pumps),
+                'metrics': metrics.REGISTRY.collect(),
+            })
+        return health
+
+    def heartbeat_loop(self, interval: float, stop: threading.Event):
+        while not stop.wait(interval):
+            try:
+                self.control.put(('health', self.health()))
+            except Exception as e:
+                throttled_logger.error('heartbeat', "分片 %s 心跳失败: %s", self.index, e)
+
+    def shutdown(self):
+        self.state = 'stopping'
+        for stop in self.pumps.values():
+            stop.set()
+        if self.supervisor is not None:
+            self.supervisor.stop()
+        if self.pipeline is not None:
+            self.pipeline.running = False
+        if self.scheduler is not None:
+            self.scheduler.stop()
+
+
+def shard_main(index: int, options: Dict, commands, control, results):
+    """分片进程入口：加载模型后按Web进程的指令启动/停止摄像头工作线程，定期回传心跳"""
+    setup_logging(options.get('log_level', 'INFO'))
+    runtime = _ShardRuntime(index, options, control, results)
+    stop = threading.Event()
+    # 心跳在加载模型前启动，Web进程据此区分"正在加载"和"已卡死"
+    heartbeat = threading.Thread(target=runtime.heartbeat_loop, args=(options['heartbeat_interval'], stop),
+                                 name='shard-heartbeat', daemon=True)
+    heartbeat.start()
+    try:
+        runtime.load()
+        logger.info("分片进程 %s (pid=%s) 已启动", index, os.getpid())
+        parent = multiprocessing.parent_process()
+        while parent is None or parent.is_alive():
+            try:
+                message = commands.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if not runtime.handle(message):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        runtime.shutdown()
+
+
+class _Shard:
+    """Web进程中对单个分片进程的记录"""
+
+    def __init__(self, index: int, backoff: ReconnectBackoff):
+        self.index = index
+        self.backoff = backoff
+        self.process = None
+        self.commands = None
+        self.control = None
+        self.results = None
+        self.readers: List[threading.Thread] = []
+        self.generation = 0
+        self.devices: Dict[str, Tuple] = {}  # 设备ID -> ensure指令参数
+        self.watch = None  # 上次发送的 (视频流, 跟踪结果设备)
+        self.health: Dict = {}
+        self.state = 'stopped'
+        self.started_at = 0.0
+        self.last_heartbeat = 0.0
+        self.next_start_at = 0.0
+        self.starts = 0
+        self.last_failure: Optional[str] = None
+
+
+class ShardPool:
+    def __init__(self, num_shards: int, options: Dict, stream_hub,
+                 on_event: Callable[[Dict], None], on_report: Callable[[Dict], None],
+                 on_tracks: Optional[Callable] = None,
+                 watch_provider: Optional[Callable[[], Tuple[Set, Set]]] = None,
+                 heartbeat_timeout: float = 30.0, startup_timeout: float = 300.0, check_interval: float = 1.0,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, jitter: float = 0.5):
+        """
+        多进程摄像头分片：摄像头分配到N个子进程，每个进程独立完成采集、推理、跟踪与报警，绕开GIL利用多核；
+        告警、跟踪结果和编码好的视频流数据块回传Web进程。子进程退出或心跳超时后按指数退避重启，并恢复其摄像头
+        :param num_shards: 子进程数
+        :param options: 子进程配置：detector、scheduler、rate、pipeline、watchdog 参数，stream_tiers、
+                        max_connects_per_second、heartbeat_interval
+        :param stream_hub: Web进程的视频流广播 (接收子进程编码好的数据块)
+        :param on_event: 告警事件回调 (写事件日志/事件库、Socket.IO推送)
+        :param on_report: RuoYi上报回调
+        :param on_tracks: 跟踪结果回调 on_tracks(device_id, shape, tracks, captured_at)
+        :param watch_provider: 返回 (有人观看的视频流{(设备ID, 档位, 是否服务端标注)}, 订阅了跟踪结果的设备ID集合)
+        :param heartbeat_timeout: 运行中的子进程超过该时间没有心跳视为卡死（秒）
+        :param startup_timeout: 子进程启动 (加载/导出模型) 的最长时间（秒）
+        :param check_interval: 健康检查间隔（秒）
+        """
+        self.num_shards = num_shards
+        self.options = options
+        self.stream_hub = stream_hub
+        self.on_event = on_event
+        self.on_report = on_report
+        self.on_tracks = on_tracks
+        self.watch_provider = watch_provider
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        self.check_interval = check_interval
+
+        # spawn在各平台行为一致，且不会把Web进程中的线程和锁状态复制到子进程
+        self._context = multiprocessing.get_context('spawn')
+        self._shards = [_Shard(i, ReconnectBackoff(backoff_base, backoff_max, jitter)) for i in range(num_shards)]
+        self._assignments: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._monitor: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动所有子进程和健康检查线程"""
+        if self._running:
+            return
+        self._running = True
+        with self._lock:
+            for shard in self._shards:
+                self._start_shard_locked(shard)
+        self._monitor = threading.Thread(target=self._monitor_loop, name='shard-monitor', daemon=True)
+        self._monitor.start()
+
+    def stop(self, timeout: float = 10.0):
+        """通知所有子进程退出，超时未退出的强制结束"""
+        self._running = False
+        if self._monitor is not None:
+            self._monitor.join(timeout)
+        with self._lock:
+            for shard in self._shards:
+                self._stop_shard_locked(shard, timeout)
+
+    def _start_shard_locked(self, shard: _Shard):
+        shard.generation += 1
+        shard.commands = self._context.Queue()
+        shard.control = self._context.Queue()
+        shard.results = self._context.Queue(RESULT_QUEUE_SIZE)
+        shard.process = self._context.Process(
+            target=shard_main, args=(shard.index, self.options, shard.commands, shard.control, shard.results),
+            name=f'camera-shard-{shard.index}', daemon=True
+        )
+        shard.process.start()
+        shard.state = 'starting'
+        shard.health = {}
+        shard.started_at = shard.last_heartbeat = time.time()
+        shard.starts += 1
+        shard.watch = None
+        # 控制通道和结果通道各用一个读取线程，画面积压时心跳和告警照常处理
+        shard.readers = [
+            threading.Thread(target=self._read_results, args=(shard, shard.generation, q),
+                             name=f'shard-{name}-{shard.index}', daemon=True)
+            for name, q in (('control', shard.control), ('reader', shard.results))
+        ]
+        for reader in shard.readers:
+            reader.start()
+        # 重启后恢复该分片的所有摄像头
+        for args in shard.devices.values():
+            shard.commands.put(('ensure',) + args)
+
+    def _stop_shard_locked(self, shard: _Shard, timeout: float = 5.0, kill: bool = False):
+        process = shard.process
+        if process is None:
+            return
+        if not kill and process.is_alive():
+            shard.commands.put(('stop',))
+            process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join(timeout)
+        shard.generation += 1  # 旧的读取线程随之退出
+        shard.process = None
+        shard.state = 'stopped'
+        for q in (shard.commands, shard.control, shard.results):
+            q.cancel_join_thread()
+            q.close()
+
+    def _read_results(self, shard: _Shard, generation: int, results):
+        """读取分片回传的一个通道 (每个分片的控制通道和结果通道各一个线程，分片重启后旧线程退出)"""
+        while self._running and shard.generation == generation:
+            try:
+                message = results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError, ValueError):
+                break
+            try:
+                self._dispatch(shard, message)
+            except Exception as e:
+                throttled_logger.error(f'dispatch:{shard.index}', "处理分片 %s 回传结果失败: %s", shard.index, e)
+
+    def _dispatch(self, shard: _Shard, message):
+        kind = message[0]
+        if kind == 'frame':
+            _, device_id, tier, overlay, chunk = message
+            self.stream_hub.publish_encoded(device_id, tier, chunk, overlay=overlay)
+        elif kind == 'tracks':
+            if self.on_tracks is not None:
+                self.on_tracks(*message[1:])
+        elif kind == 'event':
+            self.on_event(message[1])
+        elif kind == 'report':
+            self.on_report(message[1])
+        elif kind == 'health':
+            shard.health = message[1]
+            shard.last_heartbeat = time.time()
+            if message[1].get('state') == 'running' and shard.state == 'starting':
+                shard.state = 'running'
+
+    def _monitor_loop(self):
+        while self._running:
+            time.sleep(self.check_interval)
+            try:
+                self._update_watch()
+                self.check()
+            except Exception as e:
+                throttled_logger.error('check', "分片健康检查失败: %s", e)
+
+    def check(self, now: Optional[float] = None):
+        """检查所有分片一次：退出或心跳超时的强制结束，退避时间到后重启"""
+        now = time.time() if now is None else now
+        with self._lock:
+            for shard in self._shards:
+                if shard.state == 'backoff':
+                    if now >= shard.next_start_at:
+                        throttled_logger.info(f'restart:{shard.index}', "重启分片进程 %s (第 %s 次重启)",
+                                              shard.index, shard.starts)
+                        self._start_shard_locked(shard)
+                    continue
+                if shard.process is None:
+                    continue
+                timeout = self.startup_timeout if shard.state == 'starting' else self.heartbeat_timeout
+                failure = None
+                if not shard.process.is_alive():
+                    failure = f"进程退出 (exitcode={shard.process.exitcode})"
+                elif now - shard.last_heartbeat > timeout:
+                    failure = f"{now - shard.last_heartbeat:.0f} 秒没有心跳"
+                if failure is None:
+                    if shard.state == 'running' and now - shard.started_at > shard.backoff.maximum:
+                        shard.backoff.reset()
+                    continue
+                throttled_logger.warning(f'failure:{shard.index}', "分片进程 %s 异常: %s，将重启", shard.index, failure)
+                shard.last_failure = failure
+                self._stop_shard_locked(shard, kill=True)
+                shard.state = 'backoff'
+                shard.next_start_at = now + shard.backoff.next_delay()
+
+    def _update_watch(self):
+        """把Web进程中有人观看的视频流和跟踪结果订阅同步给对应分片 (变化时才发送)"""
+        if self.watch_provider is None:
+            return
+        streams, track_devices = self.watch_provider()
+        with self._lock:
+            for shard in self._shards:
+                if shard.state not in ('starting', 'running'):
+                    continue
+                watch = (
+                    sorted(key for key in streams if str(key[0]) in shard.devices),
+                    sorted(str(device_id) for device_id in track_devices if str(device_id) in shard.devices),
+                )
+                if watch != shard.watch:
+                    shard.commands.put(('watch',) + watch)
+                    shard.watch = watch
+
+    def assign(self, device_id, device_data: Dict, settings: Dict, sub_url: Optional[str], zones) -> int:
+        """
+        把摄像头分配到分片 (已分配的保持不变，新摄像头分配到摄像头最少的分片)，并启动/更新其工作线程
+        :return: 分片序号
+        """
+        device_id = str(device_id)
+        with self._lock:
+            index = self._assignments.get(device_id)
+            if index is None:
+                index = min(self._shards, key=lambda shard: len(shard.devices)).index
+                self._assignments[device_id] = index
+            shard = self._shards[index]
+            args = (device_id, device_data, settings, sub_url, zones)
+            shard.devices[device_id] = args
+            if shard.process is not None:
+                shard.commands.put(('ensure',) + args)
+            return index
+
+    def remove(self, device_id):
+        """停止摄像头的工作线程并取消分配"""
+        device_id = str(device_id)
+        with self._lock:
+            index = self._assignments.pop(device_id, None)
+            if index is None:
+                return
+            shard = self._shards[index]
+            shard.devices.pop(device_id, None)
+            if shard.process is not None:
+                shard.commands.put(('remove', device_id))
+
+    def metric_sources(self) -> List[Tuple[List[Dict], Dict[str, str]]]:
+        """各分片最近一次心跳中的指标快照及其 process 标签 (供 metrics.merge_families 合并)"""
+        with self._lock:
+            return [(shard.health.get('metrics', []), {'process': str(shard.index)}) for shard in self._shards]
+
+    def device_status(self, device_id) -> Optional[Dict]:
+        """摄像头所在分片及其在分片中的工作线程/采集状态"""
+        device_id = str(device_id)
+        with self._lock:
+            index = self._assignments.get(device_id)
+            if index is None:
+                return None
+            shard = self._shards[index]
+            health = shard.health
+            return {
+                'shard': index,
+                'pid': health.get('pid'),
+                'shardState': shard.state,
+                'worker': health.get('cameras', {}).get(device_id),
+                'capture': health.get('capture', {}).get(device_id),
+            }
+
+    def is_online(self, device_id) -> bool:
+        """摄像头是否已有画面"""
+        device_id = str(device_id)
+        with self._lock:
+            index = self._assignments.get(device_id)
+            if index is None:
+                return False
+            shard = self._shards[index]
+            return shard.state == 'running' and device_id in shard.health.get('online', [])
+
+    def get_stats(self) -> Dict:
+        """各分片进程的状态：pid、CPU时间、内存、摄像头数、重启次数、最近心跳"""
+        now = time.time()
+        with self._lock:
+            return {
+                str(shard.index): {
+                    'state': shard.state,
+                    'pid': shard.health.get('pid'),
+                    'devices': sorted(shard.devices),
+                    'restarts': max(0, shard.starts - 1),
+                    'lastFailure': shard.last_failure,
+                    'uptime': round(now - shard.started_at, 1) if shard.process is not None else 0,
+                    'heartbeatAge': round(now - shard.last_heartbeat, 1) if shard.process is not None else None,
+                    'nextStartIn': round(max(0.0, shard.next_start_at - now), 1) if shard.state == 'backoff' else None,
+                    'cpuSeconds': shard.health.get('cpuSeconds'),
+                    'rssBytes': shard.health.get('rssBytes'),
+                    'threads': shard.health.get('threads'),
+                    'streams': shard.health.get('streams', 0),
+                    'inference': shard.health.get('inference'),
+                    'cameras': shard.health.get('cameras', {}),
+                }
+                for shard in self._shards
+            }
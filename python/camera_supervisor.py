@@ -0,0 +1,287 @@
+# python/camera_supervisor.py
+
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from log_utils import RateLimitedLogger
+
+throttled_logger = RateLimitedLogger(logging.getLogger(__name__))
+
+
+class ReconnectBackoff:
+    def __init__(self, base: float = 1.0, maximum: float = 60.0, jitter: float = 0.5):
+        """
+        带随机抖动的指数退避
+        第n次重试等待 min(maximum, base * 2^n)，再随机缩短最多 jitter 比例，避免大量摄像头在同一时刻重连
+        :param base: 首次重试间隔（秒）
+        :param maximum: 最大重试间隔（秒）
+        :param jitter: 随机抖动比例 (0~1)
+        """
+        self.base = base
+        self.maximum = maximum
+        self.jitter = jitter
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """下一次重试前的等待时间（秒），每调用一次退避加倍"""
+        delay = min(self.maximum, self.base * (2 ** min(self.attempts, 16)))
+        self.attempts += 1
+        return delay * (1 - self.jitter * random.random())
+
+    def reset(self):
+        """连接恢复正常后重置"""
+        self.attempts = 0
+
+
+class ConnectLimiter:
+    def __init__(self, rate: float = 2.0, burst: int = 4):
+        """
+        所有摄像头共享的连接速率限制 (令牌桶)，网络抖动后大量摄像头同时重连时按速率排队，避免压垮NVR
+        :param rate: 每秒最多发起的连接数
+        :param burst: 允许的突发连接数
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waiting = 0
+
+    def acquire(self, is_running: Optional[Callable[[], bool]] = None, poll: float = 0.1) -> bool:
+        """
+        等待获取一次连接许可
+        :param is_running: 返回False时放弃等待 (采集线程已停止)
+        :return: 是否获得许可
+        """
+        with self._lock:
+            self.waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+                    wait = (1 - self._tokens) / self.rate
+                if is_running is not None and not is_running():
+                    return False
+                time.sleep(min(wait, poll))
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+
+class _Worker:
+    """单个设备的工作线程及其监控状态"""
+
+    def __init__(self, device_id: str, device_data: Dict, backoff: ReconnectBackoff):
+        self.device_id = device_id
+        self.device_data = device_data
+        self.backoff = backoff
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.state = 'starting'
+        self.started_at = 0.0
+        self.next_start_at = 0.0
+        self.starts = 0
+        self.stalls = 0
+        self.stalled = False
+        self.last_error: Optional[str] = None
+
+
+class CameraSupervisor:
+    def __init__(self, worker: Callable[[str, Dict, threading.Event], None],
+                 frame_age: Optional[Callable[[str], Optional[float]]] = None,
+                 on_stall: Optional[Callable[[str], None]] = None,
+                 check_interval: float = 2.0, stall_timeout: float = 15.0, restart_timeout: float = 60.0,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, jitter: float = 0.5):
+        """
+        摄像头工作线程监管器：保证每个设备同时只有一个工作线程
+        看门狗定期检查各设备的帧龄，已连接但长时间没有新帧的视频流先请求重连，仍无恢复则重启工作线程；
+        工作线程异常退出后按带抖动的指数退避重启
+        :param worker: 工作线程函数 worker(device_id, device_data, stop_event)，stop_event置位后应尽快返回
+        :param frame_age: 返回设备距最近一帧的时间（秒），视频流未连接时返回None (由采集线程自行退避重连)
+        :param on_stall: 检测到视频流卡死时的回调 (请求采集线程重连)
+        :param check_interval: 看门狗检查间隔（秒）
+        :param stall_timeout: 帧龄超过该值视为卡死
+        :param restart_timeout: 帧龄超过该值时重启工作线程
+        :param backoff_base: 工作线程重启的首次退避间隔（秒）
+        :param backoff_max: 最大退避间隔（秒）
+        :param jitter: 退避随机抖动比例
+        """
+        self.worker = worker
+        self.frame_age = frame_age
+        self.on_stall = on_stall
+        self.check_interval = check_interval
+        self.stall_timeout = stall_timeout
+        self.restart_timeout = restart_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+
+        self._workers: Dict[str, _Worker] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动看门狗线程"""
+        if self._running:
+            return
+        self._running = True
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._watch, name='camera-supervisor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """停止看门狗和所有工作线程"""
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.stop_event.set()
+        for worker in workers:
+            if worker.thread is not None:
+                worker.thread.join(timeout)
+
+    def ensure(self, device_id, device_data: Dict) -> bool:
+        """
+        确保设备有且只有一个工作线程 (已存在时只更新设备信息)
+        :return: 是否新启动了工作线程
+        """
+        device_id = str(device_id)
+        with self._lock:
+            worker = self._workers.get(device_id)
+            if worker is not None:
+                worker.device_data = device_data
+                return False
+            worker = _Worker(device_id, device_data,
+                             ReconnectBackoff(self.backoff_base, self.backoff_max, self.jitter))
+            self._workers[device_id] = worker
+            self._start_locked(worker)
+        return True
+
+    def remove(self, device_id, timeout: float = 0.0):
+        """
+        停止并移除设备的工作线程
+        :param timeout: 等待线程退出的时间（秒），0表示不等待
+        """
+        with self._lock:
+            worker = self._workers.pop(str(device_id), None)
+        if worker is None:
+            return
+        worker.stop_event.set()
+        if timeout and worker.thread is not None:
+            worker.thread.join(timeout)
+
+    def device_ids(self):
+        with self._lock:
+            return list(self._workers)
+
+    def _start_locked(self, worker: _Worker):
+        """启动新的工作线程 (调用方持有锁，且该设备旧线程已退出)"""
+        worker.stop_event = threading.Event()
+        worker.thread = threading.Thread(target=self._run_worker, args=(worker, worker.stop_event),
+                                         name=f'camera-{worker.device_id}', daemon=True)
+        worker.state = 'running'
+        worker.started_at = time.time()
+        worker.stalled = False
+        worker.starts += 1
+        worker.thread.start()
+
+    def _run_worker(self, worker: _Worker, stop_event: threading.Event):
+        try:
+            self.worker(worker.device_id, worker.device_data, stop_event)
+        except Exception as e:
+            worker.last_error = str(e)
+            throttled_logger.error(f'worker:{worker.device_id}', "设备 %s 工作线程异常退出: %s", worker.device_id, e)
+
+    def _watch(self):
+        while self._running:
+            self._wakeup.wait(self.check_interval)
+            if not self._running:
+                break
+            try:
+                self.check()
+            except Exception as e:
+                throttled_logger.error('check', "摄像头看门狗检查失败: %s", e)
+
+    def check(self, now: Optional[float] = None):
+        """检查所有工作线程一次 (看门狗线程定期调用)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            alive = worker.thread is not None and worker.thread.is_alive()
+            if not alive:
+                self._handle_exited(worker, now)
+                continue
+            if worker.state == 'restarting':
+                continue
+            age = self.frame_age(worker.device_id) if self.frame_age is not None else None
+            if age is None or age <= self.stall_timeout:
+                if worker.stalled and age is not None:
+                    throttled_logger.info(f'recovered:{worker.device_id}', "设备 %s 视频流已恢复", worker.device_id)
+                    worker.backoff.reset()
+                worker.stalled = False
+                worker.state = 'running' if age is not None else 'connecting'
+                continue
+            if not worker.stalled:
+                worker.stalled = True
+                worker.stalls += 1
+                worker.state = 'stalled'
+                throttled_logger.warning(f'stall:{worker.device_id}', "设备 %s 已 %.1f 秒没有新帧，请求重连",
+                                         worker.device_id, age)
+                if self.on_stall is not None:
+                    self.on_stall(worker.device_id)
+            elif age > self.restart_timeout:
+                # 重连请求无效 (线程卡住)，停止工作线程，待其退出后按退避间隔重启
+                throttled_logger.warning(f'restart:{worker.device_id}', "设备 %s 重连后仍无新帧，重启工作线程",
+                                         worker.device_id)
+                worker.state = 'restarting'
+                worker.stop_event.set()
+
+    def _handle_exited(self, worker: _Worker, now: float):
+        """工作线程已退出：按退避间隔重启 (旧线程退出后才启动新线程，保证同一设备只有一个线程)"""
+        with self._lock:
+            if self._workers.get(worker.device_id) is not worker or not self._running:
+                return
+            if worker.state != 'backoff':
+                worker.state = 'backoff'
+                worker.next_start_at = now + worker.backoff.next_delay()
+                return
+            if now >= worker.next_start_at:
+                throttled_logger.info(f'start:{worker.device_id}', "重启设备 %s 的工作线程 (第 %s 次重启)",
+                                      worker.device_id, worker.starts)
+                self._start_locked(worker)
+
+    def get_stats(self) -> Dict:
+        """获取各设备工作线程的状态"""
+        with self._lock:
+            workers = list(self._workers.values())
+        now = time.time()
+        stats = {}
+        for worker in workers:
+            age = self.frame_age(worker.device_id) if self.frame_age is not None else None
+            stats[worker.device_id] = {
+                'state': worker.state,
+                'alive': worker.thread is not None and worker.thread.is_alive(),
+                'restarts': max(0, worker.starts - 1),
+                'stalls': worker.stalls,
+                'uptime': round(now - worker.started_at, 1) if worker.started_at else 0,
+                'frameAge': round(age, 2) if age is not None else None,
+                'nextStartIn': round(max(0.0, worker.next_start_at - now), 1) if worker.state == 'backoff' else None,
+                'lastError': worker.last_error,
+            }
+        return stats
@@ -0,0 +1,323 @@
+# python/capture_backends.py
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from log_utils import RateLimitedLogger
+
+try:
+    import av
+except ImportError:  # PyAV为可选依赖，缺失时只能使用OpenCV采集
+    av = None
+
+throttled_logger = RateLimitedLogger(logging.getLogger(__name__))
+
+CAPTURE_BACKENDS = ('opencv', 'pyav')
+DECODE_MODES = ('all', 'nth', 'keyframes', 'auto')
+TRANSPORTS = ('tcp', 'udp')
+
+# OPENCV_FFMPEG_CAPTURE_OPTIONS 是进程级环境变量，打开视频流时需要串行设置
+_opencv_env_lock = threading.Lock()
+
+# RTSP地址中的 user:password@ 部分
+_USERINFO_PATTERN = re.compile(r'(\w+://)[^/\s]*@')
+
+
+def redact_url(text) -> str:
+    """去掉地址 (或包含地址的错误信息) 中的用户名和密码，用于日志输出"""
+    return _USERINFO_PATTERN.sub(r'\1', str(text))
+
+
+class DecodeStats:
+    def __init__(self):
+        """
+        单个摄像头的解码统计 (跨重连累计)
+        CPU时间为采集线程的线程CPU时间；解码器内部线程 (threads > 1) 的耗时只能体现在墙钟时间中
+        """
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.decoded_frames = 0  # 解码出的帧数
+        self.output_frames = 0  # 转换为BGR并输出的帧数
+        self.skipped_frames = 0  # 解码后未转换直接丢弃的帧数
+        self.skipped_packets = 0  # 只解关键帧时未送入解码器的数据包数
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def add(self, cpu: float, wall: float, decoded: int = 0, output: int = 0, skipped: int = 0, skipped_packets: int = 0):
+        with self._lock:
+            self.cpu_seconds += cpu
+            self.wall_seconds += wall
+            self.decoded_frames += decoded
+            self.output_frames += output
+            self.skipped_frames += skipped
+            self.skipped_packets += skipped_packets
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            elapsed = max(time.time() - self.started_at, 1e-6)
+            return {
+                'decodedFrames': self.decoded_frames,
+                'outputFrames': self.output_frames,
+                'skippedFrames': self.skipped_frames,
+                'skippedPackets': self.skipped_packets,
+                'decodeCpuSeconds': round(self.cpu_seconds, 3),
+                'decodeWallSeconds': round(self.wall_seconds, 3),
+                # 解码占用的CPU核数 (1.0 表示占满一个核)
+                'decodeCpuCores': round(self.cpu_seconds / elapsed, 3),
+                'cpuMsPerFrame': round(self.cpu_seconds * 1000 / self.output_frames, 2) if self.output_frames else 0,
+            }
+
+
+class CaptureBackend:
+    """采集后端基类，接口与 cv2.VideoCapture 保持一致 (isOpened/read/release)，可直接替换"""
+    name = 'base'
+
+    def __init__(self, url: str, transport: str = 'tcp', threads: int = 0, decode: str = 'all', every_n: int = 1,
+                 keyframe_below_fps: float = 1.0, open_timeout: float = 10.0, read_timeout: float = 10.0,
+                 stats: Optional[DecodeStats] = None):
+        """
+        :param url: RTSP地址或本地视频文件
+        :param transport: RTSP传输方式 'tcp' 或 'udp'
+        :param threads: 解码线程数，0表示由FFmpeg决定
+        :param decode: 'all' 输出每一帧；'nth' 每 every_n 帧输出一帧；'keyframes' 只解码关键帧；
+                       'auto' 按目标帧率 (set_target_fps) 自动选择
+        :param every_n: decode为'nth'时的输出间隔
+        :param keyframe_below_fps: decode为'auto'时，目标帧率低于该值切换为只解码关键帧
+        :param open_timeout: 打开视频流的超时（秒）
+        :param read_timeout: 读取数据的超时（秒），连接假死时read()在超时后返回失败而不是一直阻塞
+        :param stats: 解码统计，重连时传入同一个对象以累计
+        """
+        if transport not in TRANSPORTS:
+            raise ValueError(f"不支持的RTSP传输方式: {transport}，可选 {TRANSPORTS}")
+        if decode not in DECODE_MODES:
+            raise ValueError(f"不支持的解码模式: {decode}，可选 {DECODE_MODES}")
+        self.url = url
+        self.log_url = redact_url(url)  # 日志中使用的地址 (不含用户名和密码)
+        self.transport = transport
+        self.threads = threads
+        self.decode = decode
+        self.keyframe_below_fps = keyframe_below_fps
+        self.open_timeout = open_timeout
+        self.read_timeout = read_timeout
+        self.stats = stats or DecodeStats()
+        self.source_fps = 25.0
+        self.target_fps: Optional[float] = None
+        self.every_n = max(1, int(every_n)) if decode == 'nth' else 1
+        self.keyframes_only = decode == 'keyframes'
+
+    @property
+    def is_rtsp(self) -> bool:
+        return self.url.lower().startswith(('rtsp://', 'rtsps://'))
+
+    def _set_source_fps(self, fps: Optional[float]):
+        """记录码流帧率 (部分摄像头上报的帧率明显不合理，此时按25帧处理)"""
+        self.source_fps = float(fps) if fps and 1 <= fps <= 120 else 25.0
+        self.set_target_fps(self.target_fps)
+
+    def set_target_fps(self, fps: Optional[float]):
+        """
+        更新需要的输出帧率 (decode为'auto'时据此决定只解关键帧或隔帧输出)
+        :param fps: 检测/显示需要的帧率，None表示需要每一帧
+        """
+        self.target_fps = fps
+        if self.decode != 'auto':
+            return
+        if not fps or fps >= self.source_fps:
+            self.keyframes_only, self.every_n = False, 1
+        elif fps < self.keyframe_below_fps:
+            self.keyframes_only, self.every_n = True, 1
+        else:
+            self.keyframes_only, self.every_n = False, max(1, int(self.source_fps / fps))
+
+    def isOpened(self) -> bool:
+        raise NotImplementedError
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+    def describe(self) -> Dict:
+        return {
+            'backend': self.name,
+            'transport': self.transport,
+            'threads': self.threads,
+            'decode': self.decode,
+            'sourceFps': round(self.source_fps, 2),
+            'targetFps': self.target_fps,
+            'keyframesOnly': self.keyframes_only,
+            'everyN': self.every_n,
+        }
+
+
+class OpenCvCapture(CaptureBackend):
+    name = 'opencv'
+
+    def __init__(self, url: str, **kwargs):
+        """
+        通过 cv2.VideoCapture (FFmpeg) 采集 (原有方式)
+        OpenCV无法区分关键帧，'keyframes' 模式按隔帧输出处理；跳过的帧用 grab() 只解码不做颜色转换
+        """
+        super().__init__(url, **kwargs)
+        params = []
+        if self.threads and hasattr(cv2, 'CAP_PROP_N_THREADS'):
+            params += [cv2.CAP_PROP_N_THREADS, self.threads]
+        if hasattr(cv2, 'CAP_PROP_OPEN_TIMEOUT_MSEC'):
+            params += [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.open_timeout * 1000)]
+        if hasattr(cv2, 'CAP_PROP_READ_TIMEOUT_MSEC'):
+            params += [cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.read_timeout * 1000)]
+        with _opencv_env_lock:
+            previous = os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')
+            if self.is_rtsp:
+                os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = f'rtsp_transport;{self.transport}'
+            try:
+                self.cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG, params)
+            finally:
+                if previous is None:
+                    os.environ.pop('OPENCV_FFMPEG_CAPTURE_OPTIONS', None)
+                else:
+                    os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = previous
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._set_source_fps(self.cap.get(cv2.CAP_PROP_FPS))
+
+    def set_target_fps(self, fps: Optional[float]):
+        super().set_target_fps(fps)
+        if self.keyframes_only:
+            # 没有关键帧信息，按目标帧率隔帧输出
+            self.keyframes_only = False
+            self.every_n = max(1, int(self.source_fps / fps)) if fps else max(1, int(self.source_fps))
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        cpu_start, wall_start = time.thread_time(), time.perf_counter()
+        skipped = 0
+        for _ in range(self.every_n - 1):
+            if not self.cap.grab():
+                self.stats.add(time.thread_time() - cpu_start, time.perf_counter() - wall_start, skipped, 0, skipped)
+                return False, None
+            skipped += 1
+        success, frame = self.cap.read()
+        output = 1 if success else 0
+        self.stats.add(time.thread_time() - cpu_start, time.perf_counter() - wall_start,
+                       skipped + output, output, skipped)
+        return success, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class PyAvCapture(CaptureBackend):
+    name = 'pyav'
+
+    def __init__(self, url: str, **kwargs):
+        """
+        通过PyAV (FFmpeg) 采集
+        只解关键帧时非关键帧的数据包不送入解码器；隔帧输出时所有帧仍需解码 (后续帧依赖参考帧)，
+        但只有输出的帧才做YUV到BGR的转换
+        """
+        super().__init__(url, **kwargs)
+        if av is None:
+            raise RuntimeError("未安装PyAV (av)，无法使用pyav采集后端")
+        options = {}
+        if self.is_rtsp:
+            options['rtsp_transport'] = self.transport
+        self.container = None
+        self._opened = False
+        try:
+            self.container = av.open(url, options=options, timeout=(self.open_timeout, self.read_timeout))
+            self.stream = self.container.streams.video[0]
+            self.stream.thread_type = 'AUTO'
+            if self.threads:
+                self.stream.codec_context.thread_count = self.threads
+            self._set_source_fps(self.stream.average_rate or self.stream.guessed_rate)
+            self._packets = self.container.demux(self.stream)
+            self._opened = True
+        except (av.FFmpegError, IndexError) as e:
+            throttled_logger.warning(f'open:{self.log_url}', "PyAV打开视频流失败 %s: %s",
+                                     self.log_url, redact_url(e))
+            self.release()
+        self._frame_index = 0
+        # 从只解关键帧切回逐帧解码必须从关键帧开始，否则会引用未解码的参考帧
+        self._decoding_keyframes = self.keyframes_only
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self._opened:
+            return False, None
+        skipped_packets = 0
+        while True:
+            try:
+                packet = next(self._packets, None)
+            except av.FFmpegError as e:
+                throttled_logger.warning(f'demux:{self.log_url}', "PyAV读取数据包失败 %s: %s",
+                                         self.log_url, redact_url(e))
+                packet = None
+            if packet is None:
+                # 文件结束或连接断开，由调用方重连
+                self._opened = False
+                self.stats.add(0, 0, skipped_packets=skipped_packets)
+                return False, None
+            if packet.is_keyframe:
+                self._decoding_keyframes = self.keyframes_only
+            # 结束时的空数据包用于取出解码器中缓存的帧，始终送入解码器
+            if self._decoding_keyframes and not packet.is_keyframe and packet.size:
+                skipped_packets += 1
+                continue
+
+            cpu_start, wall_start = time.thread_time(), time.perf_counter()
+            image = None
+            decoded = skipped = 0
+            try:
+                for frame in packet.decode():
+                    decoded += 1
+                    self._frame_index += 1
+                    if self._decoding_keyframes or self._frame_index % self.every_n == 0:
+                        image = frame.to_ndarray(format='bgr24')
+                    else:
+                        skipped += 1
+            except av.FFmpegError as e:
+                # 单个损坏的数据包 (UDP丢包等) 直接跳过
+                throttled_logger.warning(f'decode:{self.log_url}', "PyAV解码失败 %s: %s",
+                                         self.log_url, redact_url(e))
+            output = 1 if image is not None else 0
+            # 一个数据包解出多帧时只输出最后一帧，其余计为跳过
+            skipped += max(0, decoded - skipped - output)
+            self.stats.add(time.thread_time() - cpu_start, time.perf_counter() - wall_start,
+                           decoded, output, skipped, skipped_packets)
+            skipped_packets = 0
+            if image is not None:
+                return True, image
+
+    def release(self):
+        self._opened = False
+        if self.container is not None:
+            self.container.close()
+            self.container = None
+
+
+def create_capture(url: str, backend: str = 'opencv', **options) -> CaptureBackend:
+    """
+    创建采集后端
+    :param backend: 'opencv' 或 'pyav' (未安装PyAV时回退为opencv)
+    :param options: transport、threads、decode、every_n、keyframe_below_fps、open_timeout、read_timeout、stats
+    """
+    if backend not in CAPTURE_BACKENDS:
+        raise ValueError(f"不支持的采集后端: {backend}，可选 {CAPTURE_BACKENDS}")
+    if backend == 'pyav' and av is None:
+        throttled_logger.warning('pyav', "未安装PyAV，采集后端回退为opencv")
+        backend = 'opencv'
+    if backend == 'pyav':
+        return PyAvCapture(url, **options)
+    return OpenCvCapture(url, **options)
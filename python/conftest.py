@@ -0,0 +1,4 @@
+# python/conftest.py
+
+# soak_test.py 是独立运行的长时间压力测试脚本 (需要启动服务端)，文件名符合 *_test.py 但不是单元测试
+collect_ignore = ['soak_test.py']
@@ -0,0 +1,197 @@
+# python/event_log.py
+
+import csv
+import glob
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from log_utils import RateLimitedLogger
+
+throttled_logger = RateLimitedLogger(logging.getLogger(__name__))
+
+# CSV格式的列顺序 (与原 save_events 输出的字段一致)
+EVENT_FIELDS = [
+    'timestamp', 'confidence', 'position', 'velocity', 'person_id', 'time_since_first',
+    'deviceId', 'deviceName', 'facilityId', 'facilityName'
+]
+
+
+class EventLog:
+    def __init__(self, path: str = 'intrusion_events.csv', fmt: Optional[str] = None,
+                 max_bytes: int = 50 * 1024 * 1024, rotate_interval: float = 24 * 3600,
+                 backup_count: int = 30, flush_interval: float = 1.0, fsync_interval: float = 5.0,
+                 ring_size: int = 1000):
+        """
+        追加写入的入侵事件日志
+        每条告警发生时立即写入缓冲区，后台线程定期flush/fsync，按大小或时间轮转文件，
+        内存中只保留最近的事件，长期运行内存占用保持不变，进程崩溃最多丢失最近几秒的事件
+        :param path: 日志文件路径
+        :param fmt: 'csv' 或 'jsonl'，为None时按文件扩展名判断
+        :param max_bytes: 单个文件最大字节数，超过后轮转；0表示不按大小轮转
+        :param rotate_interval: 按时间轮转的间隔（秒）；0表示不按时间轮转
+        :param backup_count: 保留的历史文件数量
+        :param flush_interval: 缓冲区写入文件的间隔（秒）
+        :param fsync_interval: 强制落盘的间隔（秒）
+        :param ring_size: 内存中保留的最近事件数量
+        """
+        self.path = path
+        self.fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        if self.fmt not in ('csv', 'jsonl'):
+            raise ValueError(f"不支持的事件日志格式: {self.fmt}")
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+
+        self.recent_events = deque(maxlen=ring_size)
+        self._lock = threading.Lock()
+        self._file = None
+        self._opened_at = 0.0
+        self._dirty = False
+        self._last_fsync = time.time()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.written = 0
+        self.rotations = 0
+
+    def start(self):
+        """打开日志文件并启动后台刷盘线程"""
+        with self._lock:
+            if self._file is None:
+                self._open()
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """停止后台线程，刷盘并关闭文件"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        if self.fmt == 'csv':
+            # 新文件写入BOM，便于Excel识别UTF-8
+            self._file = open(self.path, 'a', encoding='utf-8-sig' if is_new else 'utf-8', newline='')
+            if is_new:
+                self._file.write(self._csv_line(EVENT_FIELDS))
+        else:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+
+    @staticmethod
+    def _csv_line(values: List) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue()
+
+    def _format(self, event: Dict) -> str:
+        if self.fmt == 'jsonl':
+            return json.dumps(event, ensure_ascii=False, default=str) + '\n'
+        return self._csv_line([event.get(field, '') for field in EVENT_FIELDS])
+
+    def append(self, event: Dict):
+        """追加一条事件 (写入缓冲区，不等待落盘)"""
+        line = self._format(event)
+        with self._lock:
+            self.recent_events.append(event)
+            if self._file is None:
+                self._open()
+            self._maybe_rotate()
+            self._file.write(line)
+            self._dirty = True
+            self.written += 1
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict]:
+        """获取内存中最近的事件 (按时间先后排列)"""
+        with self._lock:
+            events = list(self.recent_events)
+        return events[-limit:] if limit else events
+
+    def flush(self, fsync: bool = True):
+        """立即将缓冲区写入文件，可选强制落盘"""
+        with self._lock:
+            if self._file is None:
+                return
+            if fsync:
+                self._sync()
+            else:
+                self._file.flush()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self._last_fsync = time.time()
+
+    def _maybe_rotate(self):
+        now = time.time()
+        size_exceeded = self.max_bytes and self._file.tell() >= self.max_bytes
+        time_exceeded = self.rotate_interval and now - self._opened_at >= self.rotate_interval
+        if not (size_exceeded or time_exceeded):
+            return
+
+        self._sync()
+        self._file.close()
+        base, ext = os.path.splitext(self.path)
+        rotated = f"{base}.{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}{ext}"
+        suffix = 1
+        while os.path.exists(rotated):
+            rotated = f"{base}.{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{suffix}{ext}"
+            suffix += 1
+        os.replace(self.path, rotated)
+        self.rotations += 1
+
+        if self.backup_count:
+            backups = sorted(glob.glob(f"{glob.escape(base)}.*{ext}"), key=os.path.getmtime)
+            for old in backups[:-self.backup_count]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        self._open()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            with self._lock:
+                if self._file is None:
+                    continue
+                try:
+                    if self._dirty and time.time() - self._last_fsync >= self.fsync_interval:
+                        self._sync()
+                    else:
+                        self._file.flush()
+                    self._maybe_rotate()
+                except Exception as e:
+                    throttled_logger.error('write', "写入事件日志失败: %s", e)
+
+    def get_stats(self) -> Dict:
+        """获取事件日志统计信息"""
+        with self._lock:
+            return {
+                'path': self.path,
+                'format': self.fmt,
+                'written': self.written,
+                'rotations': self.rotations,
+                'recent': len(self.recent_events),
+                'currentBytes': self._file.tell() if self._file is not None else 0,
+            }
@@ -0,0 +1,257 @@
+# python/event_store.py
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from log_utils import RateLimitedLogger
+
+throttled_logger = RateLimitedLogger(logging.getLogger(__name__))
+
+_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts REAL NOT NULL,
+        device_id TEXT,
+        device_name TEXT,
+        facility_id TEXT,
+        facility_name TEXT,
+        person_id TEXT,
+        confidence REAL,
+        time_since_first REAL,
+        payload TEXT NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts)',
+    'CREATE INDEX IF NOT EXISTS idx_events_device_ts ON events (device_id, ts)',
+    'CREATE INDEX IF NOT EXISTS idx_events_facility_ts ON events (facility_id, ts)',
+    'CREATE INDEX IF NOT EXISTS idx_events_person_ts ON events (person_id, ts)',
+    # 按小时预聚合的计数表，统计接口只需读取小时粒度的行，不扫描明细
+    '''CREATE TABLE IF NOT EXISTS event_hourly (
+        hour INTEGER NOT NULL,
+        device_id TEXT NOT NULL,
+        facility_id TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (hour, device_id, facility_id)
+    ) WITHOUT ROWID''',
+    'CREATE INDEX IF NOT EXISTS idx_hourly_device ON event_hourly (device_id, hour)',
+    'CREATE INDEX IF NOT EXISTS idx_hourly_facility ON event_hourly (facility_id, hour)',
+]
+
+_INSERT_EVENT = '''INSERT INTO events
+    (ts, device_id, device_name, facility_id, facility_name, person_id, confidence, time_since_first, payload)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+_UPSERT_HOURLY = '''INSERT INTO event_hourly (hour, device_id, facility_id, count) VALUES (?, ?, ?, ?)
+    ON CONFLICT (hour, device_id, facility_id) DO UPDATE SET count = count + excluded.count'''
+
+
+def _to_key(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+class EventStore:
+    def __init__(self, path: str = 'intrusion_events.db', batch_size: int = 200,
+                 flush_interval: float = 0.5, max_queue: int = 10000):
+        """
+        基于SQLite的告警事件库
+        告警由后台线程批量写入；按时间、设备、设施、人员建立索引，并维护按小时预聚合的计数表
+        :param path: 数据库文件路径
+        :param batch_size: 单个事务最多写入的事件数
+        :param flush_interval: 写入线程凑批的最长等待时间（秒）
+        :param max_queue: 写入队列容量，满时丢弃新事件 (事件日志文件中仍有记录)
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._flushed = threading.Condition()
+        self.written = 0
+        self.dropped = 0
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def start(self):
+        """启动后台写入线程"""
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='event-store', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """写完队列中剩余事件后停止写入线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+            self._thread = None
+
+    def append(self, event: Dict):
+        """提交一条告警事件 (不阻塞)"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0):
+        """等待队列中已提交的事件全部写入"""
+        deadline = time.time() + timeout
+        with self._flushed:
+            while self._queue.unfinished_tasks and time.time() < deadline:
+                self._flushed.wait(0.1)
+
+    @staticmethod
+    def _event_ts(event: Dict) -> float:
+        ts = event.get('ts')
+        if ts is not None:
+            return float(ts)
+        try:
+            return time.mktime(time.strptime(event['timestamp'], '%Y-%m-%d %H:%M:%S'))
+        except (KeyError, TypeError, ValueError):
+            return time.time()
+
+    def _write(self, conn: sqlite3.Connection, events: List[Dict]):
+        rows = []
+        hourly: Dict[tuple, int] = {}
+        for event in events:
+            ts = self._event_ts(event)
+            device_id = _to_key(event.get('deviceId'))
+            facility_id = _to_key(event.get('facilityId'))
+            rows.append((
+                ts, device_id, event.get('deviceName'), facility_id, event.get('facilityName'),
+                _to_key(event.get('person_id')), event.get('confidence'), event.get('time_since_first'),
+                json.dumps(event, ensure_ascii=False, default=str)
+            ))
+            key = (int(ts // 3600), device_id or '', facility_id or '')
+            hourly[key] = hourly.get(key, 0) + 1
+        with conn:
+            conn.executemany(_INSERT_EVENT, rows)
+            conn.executemany(_UPSERT_HOURLY, [key + (count,) for key, count in hourly.items()])
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while not (self._stop_event.is_set() and self._queue.empty()):
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self._write(conn, batch)
+                    self.written += len(batch)
+                except Exception as e:
+                    throttled_logger.error('write', "写入事件库失败: %s", e)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                    with self._flushed:
+                        self._flushed.notify_all()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _filters(start: Optional[float], end: Optional[float], device_id, facility_id,
+                 person_id=None, time_column: str = 'ts', time_scale: float = 1):
+        clauses, params = [], []
+        if device_id is not None:
+            clauses.append('device_id = ?')
+            params.append(str(device_id))
+        if facility_id is not None:
+            clauses.append('facility_id = ?')
+            params.append(str(facility_id))
+        if person_id is not None:
+            clauses.append('person_id = ?')
+            params.append(str(person_id))
+        if start is not None:
+            clauses.append(f'{time_column} >= ?')
+            params.append(start if time_scale == 1 else int(start // time_scale))
+        if end is not None:
+            clauses.append(f'{time_column} < ?' if time_scale == 1 else f'{time_column} <= ?')
+            params.append(end if time_scale == 1 else int(end // time_scale))
+        where = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+        return where, params
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None, device_id=None,
+              facility_id=None, person_id=None, page: int = 1, page_size: int = 50) -> Dict:
+        """
+        分页查询告警事件 (按时间倒序)
+        :param start: 开始时间 (Unix时间戳，包含)
+        :param end: 结束时间 (Unix时间戳，不包含)
+        :return: {'total', 'page', 'pageSize', 'rows'}
+        """
+        page = max(1, int(page))
+        page_size = max(1, min(int(page_size), 500))
+        where, params = self._filters(start, end, device_id, facility_id, person_id)
+        conn = self._connect()
+        try:
+            total = conn.execute(f'SELECT COUNT(*) FROM events {where}', params).fetchone()[0]
+            cursor = conn.execute(
+                f'SELECT id, ts, payload FROM events {where} ORDER BY ts DESC LIMIT ? OFFSET ?',
+                params + [page_size, (page - 1) * page_size]
+            )
+            rows = []
+            for event_id, ts, payload in cursor:
+                event = json.loads(payload)
+                event['id'] = event_id
+                event['ts'] = ts
+                rows.append(event)
+        finally:
+            conn.close()
+        return {'total': total, 'page': page, 'pageSize': page_size, 'rows': rows}
+
+    def aggregate(self, start: Optional[float] = None, end: Optional[float] = None, device_id=None,
+                  facility_id=None, group_by: str = 'device') -> List[Dict]:
+        """
+        按摄像头/设施/小时统计告警数量 (读取按小时预聚合的计数表，时间范围按整点对齐)
+        :param group_by: 'device'、'facility'、'hour' 或 'device_hour'
+        """
+        columns = {
+            'device': ['device_id'],
+            'facility': ['facility_id'],
+            'hour': ['hour'],
+            'device_hour': ['device_id', 'hour'],
+        }.get(group_by)
+        if columns is None:
+            raise ValueError(f"不支持的统计维度: {group_by}")
+        where, params = self._filters(start, end, device_id, facility_id,
+                                      time_column='hour', time_scale=3600)
+        group = ', '.join(columns)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f'SELECT {group}, SUM(count) FROM event_hourly {where} GROUP BY {group} ORDER BY {group}',
+                params
+            )
+            results = []
+            for row in cursor:
+                item = {'count': row[-1]}
+                for column, value in zip(columns, row[:-1]):
+                    if column == 'hour':
+                        item['hour'] = time.strftime('%Y-%m-%d %H:00:00', time.localtime(value * 3600))
+                    else:
+                        item['deviceId' if column == 'device_id' else 'facilityId'] = value
+                results.append(item)
+        finally:
+            conn.close()
+        return results
+
+    def get_stats(self) -> Dict:
+        """获取事件库写入统计"""
+        return {'path': self.path, 'written': self.written, 'dropped': self.dropped, 'queued': self._queue.qsize()}
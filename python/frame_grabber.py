@@ -0,0 +1,295 @@
+# python/frame_grabber.py
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import metrics
+from camera_supervisor import ConnectLimiter, ReconnectBackoff
+from capture_backends import CaptureBackend, DecodeStats, create_capture
+
+
+class FrameGrabber:
+    def __init__(self, device_id: str, rtsp_url: str, reconnect_delay: float = 1.0,
+                 read_retry_delay: float = 0.5, stats_window: int = 100, capture_options: Optional[Dict] = None,
+                 max_reconnect_delay: float = 60.0, reconnect_jitter: float = 0.5, max_read_failures: int = 5,
+                 connect_limiter: Optional[ConnectLimiter] = None, stream: str = 'main'):
+        """
+        单个摄像头的采集线程
+        持续读取RTSP流，只在单槽缓冲区中保留最新解码的一帧，避免推理期间FFmpeg缓冲区堆积导致延迟增长
+        :param device_id: 设备ID
+        :param rtsp_url: RTSP地址
+        :param reconnect_delay: 首次重连的等待时间（秒），连续失败时按指数退避加倍
+        :param read_retry_delay: 读帧失败后的重试间隔（秒）
+        :param stats_window: 统计最近多少帧的采集到检测延迟
+        :param capture_options: 采集后端参数 (摄像头配置中的 capture 段)：backend、transport、threads、decode 等，
+                                见 capture_backends.create_capture
+        :param max_reconnect_delay: 最大重连间隔（秒）
+        :param reconnect_jitter: 重连间隔的随机抖动比例
+        :param max_read_failures: 已打开的视频流连续读帧失败该次数后断开重连
+        :param connect_limiter: 所有摄像头共享的连接速率限制
+        :param stream: 码流类型 ('main' 主码流 / 'sub' 子码流)，用于区分同一摄像头两路采集的指标
+        """
+        self.device_id = device_id
+        self.rtsp_url = rtsp_url
+        self.read_retry_delay = read_retry_delay
+        self.max_read_failures = max_read_failures
+        self.backoff = ReconnectBackoff(reconnect_delay, max_reconnect_delay, reconnect_jitter)
+        self.connect_limiter = connect_limiter
+        self.capture_options = dict(capture_options or {})
+        self.decode_stats = DecodeStats()
+        self._cap: Optional[CaptureBackend] = None
+        self._target_fps: Optional[float] = None
+
+        # 单槽缓冲区
+        self._cond = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._seq = 0
+        self._captured_at = 0.0
+        self._taken_seq = 0
+
+        self._running = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._connected_at = 0.0  # 当前连接建立的时间，未连接时为0
+        self._reconnect_requested = False
+
+        # 统计信息
+        self._stats_lock = threading.Lock()
+        self.captured_frames = 0
+        self.dropped_frames = 0  # 未被检测就被新帧覆盖的帧数
+        self.detected_frames = 0
+        self.read_failures = 0
+        self.reconnects = 0
+        self.connect_failures = 0
+        self.stall_reconnects = 0
+        self._latencies = deque(maxlen=stats_window)  # 采集到检测完成的延迟（秒）
+        self._capture_times = deque(maxlen=stats_window)
+        self._captured_metric = metrics.CAPTURE_FRAMES.labels(device_id, stream, 'captured')
+        self._dropped_metric = metrics.CAPTURE_FRAMES.labels(device_id, stream, 'dropped')
+        self._failed_metric = metrics.CAPTURE_FRAMES.labels(device_id, stream, 'read_failed')
+        self._capture_seconds = metrics.STAGE_SECONDS.labels(device_id, 'capture')
+
+    def start(self):
+        """启动采集线程"""
+        if self._running:
+            return
+        self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f'grabber-{self.device_id}', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """停止采集线程并唤醒等待中的检测线程"""
+        self._running = False
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected_at > 0
+
+    def frame_age(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        距最近一帧的时间（秒）；本次连接后还没有帧时从连接建立开始计算
+        :return: 视频流未连接 (正在退避重连) 时返回None
+        """
+        connected_at = self._connected_at
+        if not connected_at:
+            return None
+        now = time.time() if now is None else now
+        return now - max(connected_at, self._captured_at)
+
+    def request_reconnect(self):
+        """请求断开并重连视频流 (由看门狗在视频流卡死时调用，在采集线程中执行)"""
+        self._reconnect_requested = True
+
+    def _open(self) -> CaptureBackend:
+        cap = create_capture(self.rtsp_url, stats=self.decode_stats, **self.capture_options)
+        cap.set_target_fps(self._target_fps)
+        self._cap = cap
+        return cap
+
+    def set_target_fps(self, fps: Optional[float]):
+        """
+        设置需要的输出帧率，decode为'auto'时采集后端据此只解关键帧或隔帧输出
+        :param fps: 帧率，None表示需要每一帧
+        """
+        if fps == self._target_fps:
+            return
+        self._target_fps = fps
+        cap = self._cap
+        if cap is not None:
+            cap.set_target_fps(fps)
+
+    def _connect(self, first: bool) -> Optional[CaptureBackend]:
+        """
+        打开视频流：重连前按退避间隔等待，并在所有摄像头共享的连接限速中排队
+        :return: 打开失败或采集已停止时返回None
+        """
+        if not first:
+            with self._stats_lock:
+                self.reconnects += 1
+            if self._stop_event.wait(self.backoff.next_delay()):
+                return None
+        if self.connect_limiter is not None and not self.connect_limiter.acquire(lambda: self._running):
+            return None
+        if not self._running:
+            return None
+        cap = self._open()
+        if cap.isOpened():
+            self._connected_at = time.time()
+            return cap
+        cap.release()
+        with self._stats_lock:
+            self.connect_failures += 1
+        return None
+
+    def _disconnect(self, cap: CaptureBackend):
+        self._connected_at = 0.0
+        cap.release()
+
+    def _run(self):
+        cap = None
+        first = True
+        failures = 0
+        try:
+            while self._running:
+                if cap is None:
+                    cap = self._connect(first)
+                    first = False
+                    failures = 0
+                    continue
+
+                if self._reconnect_requested:
+                    self._reconnect_requested = False
+                    with self._stats_lock:
+                        self.stall_reconnects += 1
+                    self._disconnect(cap)
+                    cap = None
+                    continue
+
+                started = time.perf_counter()
+                success, frame = cap.read()
+                if not success:
+                    failures += 1
+                    self._failed_metric.inc()
+                    with self._stats_lock:
+                        self.read_failures += 1
+                    # 视频流已关闭，或已打开但持续读不到帧 (连接假死)，断开后退避重连
+                    if not cap.isOpened() or failures >= self.max_read_failures:
+                        self._disconnect(cap)
+                        cap = None
+                    else:
+                        self._stop_event.wait(self.read_retry_delay)
+                    continue
+
+                failures = 0
+                self.backoff.reset()
+                # 读取耗时包含等待新帧到达的时间，帧率较低的码流该值接近帧间隔
+                self._capture_seconds.observe(time.perf_counter() - started)
+                self._publish(frame)
+        finally:
+            self._connected_at = 0.0
+            if cap is not None:
+                cap.release()
+
+    def _publish(self, frame: np.ndarray):
+        """将新帧放入单槽缓冲区，覆盖尚未被取走的旧帧"""
+        now = time.time()
+        with self._cond:
+            dropped = self._frame is not None and self._seq > self._taken_seq
+            self._frame = frame
+            self._seq += 1
+            self._captured_at = now
+            self._cond.notify_all()
+        with self._stats_lock:
+            self.captured_frames += 1
+            self._capture_times.append(now)
+            if dropped:
+                self.dropped_frames += 1
+        self._captured_metric.inc()
+        if dropped:
+            self._dropped_metric.inc()
+
+    def get_latest(self, last_seq: int = 0, timeout: Optional[float] = None) -> Optional[Tuple[int, np.ndarray, float]]:
+        """
+        取出最新一帧 (序号大于last_seq)，没有新帧时等待
+        :param last_seq: 上次取到的帧序号
+        :param timeout: 最长等待时间（秒）
+        :return: (帧序号, 帧, 采集时间)，超时或已停止时返回None
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._running and self._seq <= last_seq:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            if self._seq <= last_seq or self._frame is None:
+                return None
+            self._taken_seq = self._seq
+            return self._seq, self._frame, self._captured_at
+
+    def peek(self) -> Optional[Tuple[int, np.ndarray, float]]:
+        """
+        不等待地读取当前最新一帧 (用于显示码流，不计入被检测取走的帧)
+        :return: (帧序号, 帧, 采集时间)，尚未采集到帧时返回None
+        """
+        with self._cond:
+            if self._frame is None:
+                return None
+            return self._seq, self._frame, self._captured_at
+
+    def mark_detected(self, captured_at: float):
+        """检测阶段处理完一帧后调用，记录采集到检测完成的延迟"""
+        with self._stats_lock:
+            self.detected_frames += 1
+            self._latencies.append(time.time() - captured_at)
+
+    def get_stats(self) -> Dict:
+        """
+        获取采集统计信息
+        :return: 采集/丢弃/检测帧数、采集帧率以及采集到检测延迟（毫秒）
+        """
+        with self._stats_lock:
+            latencies = [latency * 1000 for latency in self._latencies]
+            capture_times = list(self._capture_times)
+            stats = {
+                'capturedFrames': self.captured_frames,
+                'droppedFrames': self.dropped_frames,
+                'detectedFrames': self.detected_frames,
+                'readFailures': self.read_failures,
+                'reconnects': self.reconnects,
+                'connectFailures': self.connect_failures,
+                'stallReconnects': self.stall_reconnects,
+                'connected': self.is_connected,
+            }
+        age = self.frame_age()
+        stats['frameAge'] = round(age, 2) if age is not None else None
+        if len(capture_times) > 1 and capture_times[-1] > capture_times[0]:
+            stats['captureFps'] = round((len(capture_times) - 1) / (capture_times[-1] - capture_times[0]), 2)
+        else:
+            stats['captureFps'] = 0
+        if latencies:
+            stats['avgCaptureToDetectMs'] = round(sum(latencies) / len(latencies), 2)
+            stats['maxCaptureToDetectMs'] = round(max(latencies), 2)
+            stats['lastCaptureToDetectMs'] = round(latencies[-1], 2)
+        else:
+            stats['avgCaptureToDetectMs'] = stats['maxCaptureToDetectMs'] = stats['lastCaptureToDetectMs'] = 0
+        stats['decode'] = self.decode_stats.get_stats()
+        cap = self._cap
+        if cap is not None:
+            stats['decode'].update(cap.describe())
+        return stats
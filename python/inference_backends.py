@@ -0,0 +1,501 @@
+# python/inference_backends.py
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+import metrics
+
+try:
+    import onnxruntime as ort
+except ImportError:  # onnxruntime为可选依赖，缺失时不能使用ONNX后端
+    ort = None
+
+try:
+    from openvino.runtime import Core as OpenVinoCore
+except ImportError:  # openvino为可选依赖，缺失时不能使用OpenVINO后端
+    OpenVinoCore = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'onnx', 'openvino', 'auto')
+
+# 检测结果统一为 (N, 6) float32 数组: x1, y1, x2, y2, conf, class_id (原图坐标)
+EMPTY_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+def file_hash(path: str, length: int = 16) -> str:
+    """计算模型文件的SHA-256 (截取前length位)，作为导出缓存的键"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def letterbox(image: np.ndarray, new_shape: int = 640, color=(114, 114, 114)) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    等比缩放并填充到 new_shape×new_shape (与YOLOv8预处理一致)
+    :return: (填充后的图像, 缩放比例, (左侧填充, 上侧填充))
+    """
+    height, width = image.shape[:2]
+    ratio = min(new_shape / height, new_shape / width)
+    resized_w, resized_h = int(round(width * ratio)), int(round(height * ratio))
+    pad_w, pad_h = (new_shape - resized_w) / 2, (new_shape - resized_h) / 2
+    if (width, height) != (resized_w, resized_h):
+        image = cv2.resize(image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, ratio, (left, top)
+
+
+def preprocess(frames: Sequence[np.ndarray], imgsz: int) -> Tuple[np.ndarray, List[Tuple[float, Tuple[float, float], Tuple[int, int]]]]:
+    """
+    BGR帧列表转为模型输入张量 (N, 3, imgsz, imgsz)，RGB，归一化到0~1
+    :return: (输入张量, 每帧的 (缩放比例, 填充, 原图尺寸))
+    """
+    batch = np.empty((len(frames), 3, imgsz, imgsz), dtype=np.float32)
+    metas = []
+    for i, frame in enumerate(frames):
+        padded, ratio, pad = letterbox(frame, imgsz)
+        batch[i] = padded[:, :, ::-1].transpose(2, 0, 1) / 255.0
+        metas.append((ratio, pad, frame.shape[:2]))
+    return batch, metas
+
+
+def align_imgsz(imgsz: int, stride: int = 32) -> int:
+    """输入尺寸向上取整到模型步长的整数倍"""
+    return max(stride, int(np.ceil(imgsz / stride)) * stride)
+
+
+def scale_detections(detections: np.ndarray, src_shape, dst_shape) -> np.ndarray:
+    """
+    把检测框从一种分辨率映射到另一种分辨率 (如检测用的子码流 -> 显示用的主码流)
+    :param src_shape: 检测所用画面的 (高, 宽)
+    :param dst_shape: 目标画面的 (高, 宽)
+    """
+    src_h, src_w = src_shape[:2]
+    dst_h, dst_w = dst_shape[:2]
+    if (src_h, src_w) == (dst_h, dst_w) or len(detections) == 0:
+        return detections
+    detections = np.array(detections, dtype=np.float32, copy=True)
+    detections[:, [0, 2]] *= dst_w / src_w
+    detections[:, [1, 3]] *= dst_h / src_h
+    return detections
+
+
+class Preprocessor:
+    def __init__(self, max_batch: int = 8, color: int = 114):
+        """
+        预分配缓冲区的预处理 (letterbox + BGR转RGB + 归一化)
+        每种输入尺寸保留一组画布和输入张量，逐帧直接缩放进画布并归一化写入张量，稳定运行时不再分配新内存；
+        返回的张量在下一次调用时会被覆盖，只能在同一线程中立即使用
+        :param max_batch: 初始批大小，超过时自动扩容
+        :param color: 填充颜色
+        """
+        self.max_batch = max_batch
+        self.color = color
+        self._canvases: Dict[int, np.ndarray] = {}  # 输入尺寸 -> (批, H, W, 3) uint8
+        self._tensors: Dict[int, np.ndarray] = {}  # 输入尺寸 -> (批, 3, H, W) float32
+        self._slot_shapes: Dict[Tuple[int, int], Tuple[int, int]] = {}  # (输入尺寸, 槽位) -> 上次的原图尺寸
+        self._layouts: Dict[Tuple[int, int, int], Tuple] = {}  # (输入尺寸, 高, 宽) -> 缩放布局
+        self._scale = np.float32(1 / 255.0)
+
+    def _buffers(self, imgsz: int, batch: int) -> Tuple[np.ndarray, np.ndarray]:
+        canvases = self._canvases.get(imgsz)
+        if canvases is None or len(canvases) < batch:
+            size = max(batch, self.max_batch)
+            canvases = np.full((size, imgsz, imgsz, 3), self.color, dtype=np.uint8)
+            self._canvases[imgsz] = canvases
+            self._tensors[imgsz] = np.empty((size, 3, imgsz, imgsz), dtype=np.float32)
+            self._slot_shapes = {key: value for key, value in self._slot_shapes.items() if key[0] != imgsz}
+        return canvases, self._tensors[imgsz]
+
+    def _layout(self, imgsz: int, height: int, width: int) -> Tuple:
+        key = (imgsz, height, width)
+        layout = self._layouts.get(key)
+        if layout is None:
+            ratio = min(imgsz / height, imgsz / width)
+            resized_w, resized_h = int(round(width * ratio)), int(round(height * ratio))
+            left = int(round((imgsz - resized_w) / 2 - 0.1))
+            top = int(round((imgsz - resized_h) / 2 - 0.1))
+            layout = (ratio, resized_w, resized_h, left, top)
+            self._layouts[key] = layout
+        return layout
+
+    def __call__(self, frames: Sequence[np.ndarray], imgsz: int) -> Tuple[np.ndarray, List]:
+        """
+        :return: (输入张量 (N, 3, imgsz, imgsz)，每帧的 (缩放比例, 填充, 原图尺寸))
+        """
+        canvases, tensors = self._buffers(imgsz, len(frames))
+        metas = []
+        for i, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            ratio, resized_w, resized_h, left, top = self._layout(imgsz, height, width)
+            canvas = canvases[i]
+            if self._slot_shapes.get((imgsz, i)) != (height, width):
+                # 原图尺寸变化时填充区域位置也变了，重新铺底色
+                canvas[...] = self.color
+                self._slot_shapes[(imgsz, i)] = (height, width)
+            region = canvas[top:top + resized_h, left:left + resized_w]
+            if (resized_w, resized_h) == (width, height):
+                region[...] = frame
+            else:
+                cv2.resize(frame, (resized_w, resized_h), dst=region, interpolation=cv2.INTER_LINEAR)
+            np.multiply(canvas[:, :, ::-1].transpose(2, 0, 1), self._scale, out=tensors[i])
+            metas.append((ratio, (left, top), (height, width)))
+        return tensors[:len(frames)], metas
+
+
+def postprocess(output: np.ndarray, ratio: float, pad: Tuple[float, float], orig_shape: Tuple[int, int],
+                conf_threshold: float = 0.5, classes: Optional[Sequence[int]] = None,
+                iou_threshold: float = 0.7, max_det: int = 300) -> np.ndarray:
+    """
+    解码单张图的YOLOv8原始输出 (84, anchors)：置信度过滤、NMS，并把框映射回原图坐标
+    :return: (N, 6) 检测结果
+    """
+    predictions = output.T  # (anchors, 4 + 类别数)
+    scores_all = predictions[:, 4:]
+    class_ids = scores_all.argmax(axis=1)
+    scores = scores_all[np.arange(len(scores_all)), class_ids]
+    keep = scores >= conf_threshold
+    if classes is not None:
+        keep &= np.isin(class_ids, classes)
+    if not keep.any():
+        return EMPTY_DETECTIONS
+
+    boxes = predictions[keep, :4]
+    scores = scores[keep]
+    class_ids = class_ids[keep]
+    xyxy = np.empty_like(boxes)
+    xyxy[:, 0] = boxes[:, 0] - boxes[:, 2] / 2
+    xyxy[:, 1] = boxes[:, 1] - boxes[:, 3] / 2
+    xyxy[:, 2] = boxes[:, 0] + boxes[:, 2] / 2
+    xyxy[:, 3] = boxes[:, 1] + boxes[:, 3] / 2
+
+    # 按类别偏移后统一做NMS (与ultralytics的类别独立NMS等价)
+    offset = class_ids[:, None].astype(np.float32) * 7680
+    shifted = xyxy + offset
+    indices = cv2.dnn.NMSBoxes(
+        (np.column_stack([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]])).tolist(),
+        scores.tolist(), conf_threshold, iou_threshold
+    )
+    indices = np.array(indices, dtype=np.int64).reshape(-1)[:max_det]
+
+    xyxy = xyxy[indices]
+    xyxy[:, [0, 2]] -= pad[0]
+    xyxy[:, [1, 3]] -= pad[1]
+    xyxy /= ratio
+    height, width = orig_shape
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+    return np.column_stack([xyxy, scores[indices], class_ids[indices]]).astype(np.float32)
+
+
+class InferenceBackend:
+    """推理后端基类：输入BGR帧列表，输出与之一一对应的 (N, 6) 检测结果"""
+    name = 'base'
+
+    def __init__(self, imgsz: int = 640, conf_threshold: float = 0.5, classes: Optional[Sequence[int]] = None,
+                 iou_threshold: float = 0.7):
+        self.imgsz = imgsz
+        self.conf_threshold = conf_threshold
+        self.classes = list(classes) if classes is not None else None
+        self.iou_threshold = iou_threshold
+
+    def infer(self, frames: List[np.ndarray], imgsz: Optional[int] = None) -> List[np.ndarray]:
+        """
+        :param imgsz: 本批次的输入尺寸 (按摄像头配置)，为None时使用默认尺寸
+        """
+        raise NotImplementedError
+
+    def warmup(self, runs: int = 2):
+        """用空白帧预热，避免首帧推理耗时过长"""
+        blank = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.infer([blank])
+
+    def describe(self) -> Dict:
+        return {'backend': self.name, 'imgsz': self.imgsz}
+
+
+class TorchBackend(InferenceBackend):
+    name = 'torch'
+
+    def __init__(self, model_path: str = 'yolov8n.pt', device: str = 'cpu', **kwargs):
+        """通过ultralytics/PyTorch直接推理 (原有方式)"""
+        super().__init__(**kwargs)
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.device = device
+        self.model_path = model_path
+
+    def infer(self, frames: List[np.ndarray], imgsz: Optional[int] = None) -> List[np.ndarray]:
+        if not frames:
+            return []
+        started = time.perf_counter()
+        results = self.model(frames, device=self.device, conf=self.conf_threshold, classes=self.classes,
+                             imgsz=align_imgsz(imgsz or self.imgsz), verbose=False)
+        # ultralytics内部完成预处理和后处理，只能整体计时
+        metrics.BATCH_SECONDS.labels(self.name, 'model').observe(time.perf_counter() - started)
+        return [result.boxes.data.cpu().numpy().astype(np.float32) for result in results]
+
+    def describe(self) -> Dict:
+        return {'backend': self.name, 'imgsz': self.imgsz, 'model': self.model_path, 'device': self.device}
+
+
+class _ExportedModelBackend(InferenceBackend):
+    """导出模型 (ONNX/OpenVINO) 的公共推理流程：预分配缓冲区预处理 -> 推理 -> 解码"""
+    dynamic_batch = False
+    dynamic_size = False
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.preprocessor = Preprocessor()
+        self._lock = threading.Lock()  # 预处理缓冲区在调用之间复用
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def infer(self, frames: List[np.ndarray], imgsz: Optional[int] = None) -> List[np.ndarray]:
+        if not frames:
+            return []
+        # 导出时输入尺寸固定的模型只能使用导出尺寸
+        size = align_imgsz(imgsz) if imgsz and self.dynamic_size else self.imgsz
+        started = time.perf_counter()
+        with self._lock:
+            batch, metas = self.preprocessor(frames, size)
+            preprocessed = time.perf_counter()
+            if self.dynamic_batch:
+                outputs = self._run(batch)
+            else:
+                outputs = np.concatenate([self._run(batch[i:i + 1]) for i in range(len(frames))])
+        inferred = time.perf_counter()
+        detections = [
+            postprocess(outputs[i].astype(np.float32, copy=False), ratio, pad, shape,
+                        self.conf_threshold, self.classes, self.iou_threshold)
+            for i, (ratio, pad, shape) in enumerate(metas)
+        ]
+        metrics.BATCH_SECONDS.labels(self.name, 'preprocess').observe(preprocessed - started)
+        metrics.BATCH_SECONDS.labels(self.name, 'model').observe(inferred - preprocessed)
+        metrics.BATCH_SECONDS.labels(self.name, 'postprocess').observe(time.perf_counter() - inferred)
+        return detections
+
+    def describe(self) -> Dict:
+        return {'backend': self.name, 'imgsz': self.imgsz, 'model': self.model_path,
+                'dynamicBatch': self.dynamic_batch, 'dynamicSize': self.dynamic_size}
+
+
+class OnnxRuntimeBackend(_ExportedModelBackend):
+    name = 'onnx'
+
+    def __init__(self, model_path: str, threads: Optional[int] = None, providers: Optional[List[str]] = None, **kwargs):
+        """
+        通过ONNX Runtime推理导出的ONNX模型
+        :param model_path: .onnx 文件路径
+        :param threads: 算子内部线程数，None表示由ONNX Runtime决定
+        :param providers: 执行提供者，默认只用CPU
+        """
+        super().__init__(**kwargs)
+        if ort is None:
+            raise RuntimeError("未安装onnxruntime，无法使用ONNX后端")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=providers or ['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_type = np.float16 if model_input.type == 'tensor(float16)' else np.float32
+        # 导出时未开启动态batch则只能逐帧推理；未开启动态尺寸则只能使用导出尺寸
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.dynamic_size = not isinstance(model_input.shape[2], int)
+        self.model_path = model_path
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch.astype(self.input_type, copy=False)})[0]
+
+    def describe(self) -> Dict:
+        info = super().describe()
+        info['inputType'] = np.dtype(self.input_type).name
+        return info
+
+
+class OpenVinoBackend(_ExportedModelBackend):
+    name = 'openvino'
+
+    def __init__(self, model_path: str, device: str = 'CPU', **kwargs):
+        """
+        通过OpenVINO推理导出的IR模型
+        :param model_path: .xml 文件路径 (或包含它的导出目录)
+        :param device: OpenVINO设备名
+        """
+        super().__init__(**kwargs)
+        if OpenVinoCore is None:
+            raise RuntimeError("未安装openvino，无法使用OpenVINO后端")
+        if os.path.isdir(model_path):
+            model_path = next(os.path.join(model_path, name) for name in os.listdir(model_path) if name.endswith('.xml'))
+        core = OpenVinoCore()
+        model = core.read_model(model_path)
+        input_shape = model.inputs[0].get_partial_shape()
+        self.dynamic_batch = input_shape[0].is_dynamic
+        self.dynamic_size = input_shape[2].is_dynamic
+        self.compiled = core.compile_model(model, device, {'PERFORMANCE_HINT': 'LATENCY'})
+        self.output = self.compiled.output(0)
+        self.model_path = model_path
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self.compiled([batch])[self.output]
+
+
+def export_model(model_path: str, fmt: str, imgsz: int = 640, cache_dir: str = 'model_cache', **export_args) -> str:
+    """
+    将PyTorch模型导出为ONNX或OpenVINO IR，按模型哈希和输入尺寸缓存，已导出过时直接返回缓存
+    :param model_path: .pt 模型路径
+    :param fmt: 'onnx' 或 'openvino'
+    :param imgsz: 输入尺寸
+    :param cache_dir: 缓存目录
+    :param export_args: 传给ultralytics导出的其他参数 (如 half、int8)
+    :return: 导出模型的路径 (ONNX为文件，OpenVINO为目录)
+    """
+    if fmt not in ('onnx', 'openvino'):
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    variant = ''.join(f"-{key}" for key, value in sorted(export_args.items()) if value is True)
+    key = f"{stem}-{file_hash(model_path)}-{imgsz}{variant}"
+    target = os.path.join(cache_dir, f"{key}.onnx" if fmt == 'onnx' else f"{key}_openvino_model")
+    if os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+    os.makedirs(cache_dir, exist_ok=True)
+    logger.info("正在导出模型 %s -> %s (imgsz=%s)", model_path, fmt, imgsz)
+    exported = YOLO(model_path).export(format=fmt, imgsz=imgsz, dynamic=fmt == 'onnx', **export_args)
+    # ultralytics把导出结果写在.pt旁边，移动到缓存目录 (先写临时名再改名，避免中断留下半个文件)
+    temp = target + '.tmp'
+    if os.path.exists(temp):
+        shutil.rmtree(temp) if os.path.isdir(temp) else os.remove(temp)
+    shutil.move(str(exported), temp)
+    os.replace(temp, target)
+    return target
+
+
+def create_backend(name: str = 'torch', model_path: str = 'yolov8n.pt', imgsz: int = 640,
+                   cache_dir: str = 'model_cache', device: str = 'cpu', precision: str = 'fp32',
+                   calibration_dir: Optional[str] = None, **kwargs) -> InferenceBackend:
+    """
+    创建推理后端
+    :param name: 'torch'、'onnx'、'openvino' 或 'auto' (按 OpenVINO > ONNX Runtime > PyTorch 选择已安装的)
+    :param model_path: .pt 模型路径 (ONNX/OpenVINO后端会自动导出并缓存)
+    :param precision: 'fp32'、'fp16' 或 'int8'，仅ONNX/OpenVINO后端支持量化模型
+    :param calibration_dir: INT8量化的校准图片目录
+    :param kwargs: conf_threshold、classes、iou_threshold 等
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的推理后端: {name}，可选 {BACKENDS}")
+    if name == 'auto':
+        name = 'openvino' if OpenVinoCore is not None else 'onnx' if ort is not None else 'torch'
+    if name == 'torch':
+        if precision != 'fp32':
+            raise ValueError("PyTorch后端只支持FP32，量化模型请使用onnx或openvino后端")
+        return TorchBackend(model_path, device=device, imgsz=imgsz, **kwargs)
+    if precision == 'fp32':
+        artifact = export_model(model_path, name, imgsz, cache_dir)
+    else:
+        from model_quantization import build_artifact
+        artifact = build_artifact(name, model_path, precision, imgsz, cache_dir, calibration_dir)
+    if name == 'onnx':
+        return OnnxRuntimeBackend(artifact, imgsz=imgsz, **kwargs)
+    return OpenVinoBackend(artifact, imgsz=imgsz, **kwargs)
+
+
+def _box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """两组框两两之间的IoU (M×N)"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def compare_detections(reference: List[np.ndarray], candidate: List[np.ndarray], iou_threshold: float = 0.5) -> Dict:
+    """
+    逐帧比较两个后端的检测结果 (按IoU贪心匹配)
+    :return: 参考框数、候选框数、匹配数、平均IoU、最大置信度差
+    """
+    total_ref = total_cand = matched = 0
+    ious, conf_diffs = [], []
+    for ref, cand in zip(reference, candidate):
+        total_ref += len(ref)
+        total_cand += len(cand)
+        iou = _box_iou(ref[:, :4], cand[:, :4])
+        while iou.size and iou.max() >= iou_threshold:
+            i, j = np.unravel_index(iou.argmax(), iou.shape)
+            matched += 1
+            ious.append(float(iou[i, j]))
+            conf_diffs.append(abs(float(ref[i, 4]) - float(cand[j, 4])))
+            iou[i, :] = -1
+            iou[:, j] = -1
+    return {
+        'referenceBoxes': total_ref,
+        'candidateBoxes': total_cand,
+        'matched': matched,
+        'meanIoU': round(sum(ious) / len(ious), 4) if ious else 1.0,
+        'maxConfDiff': round(max(conf_diffs), 4) if conf_diffs else 0.0,
+    }
+
+
+def default_check_frames() -> List[np.ndarray]:
+    """自检用的图片：ultralytics自带的示例图片，不可用时使用一张纯色图 (没有目标，自检结果为无法判断)"""
+    try:
+        from ultralytics.utils import ASSETS
+        frames = [cv2.imread(str(path)) for path in sorted(ASSETS.glob('*.jpg'))]
+        frames = [frame for frame in frames if frame is not None]
+        if frames:
+            return frames
+        logger.warning("ultralytics示例图片目录 %s 中没有可读取的图片，推理后端自检无法判断", ASSETS)
+    except Exception as e:
+        logger.warning("无法加载ultralytics示例图片，推理后端自检无法判断: %s", e)
+    return [np.full((480, 640, 3), 114, dtype=np.uint8)]
+
+
+def self_check(backend: InferenceBackend, reference: InferenceBackend, frames: Optional[List[np.ndarray]] = None,
+               iou_threshold: float = 0.5, min_match_rate: float = 0.9) -> Dict:
+    """
+    启动自检：用同一组图片对比候选后端与PyTorch参考后端的输出
+    :param min_match_rate: 匹配框数占两者较多一方框数的最低比例
+    :return: 对比结果及 'passed'、两个后端的平均耗时（毫秒）；参考后端没有检测到任何框时无法判断，'passed' 为None
+    """
+    frames = frames or default_check_frames()
+    start = time.perf_counter()
+    expected = reference.infer(frames)
+    reference_ms = (time.perf_counter() - start) * 1000 / len(frames)
+    start = time.perf_counter()
+    actual = backend.infer(frames)
+    backend_ms = (time.perf_counter() - start) * 1000 / len(frames)
+
+    report = compare_detections(expected, actual, iou_threshold)
+    if not report['referenceBoxes']:
+        # 两个后端都输出0个框时匹配率没有意义，不能视为通过
+        report['matchRate'] = None
+        report['passed'] = None
+    else:
+        most = max(report['referenceBoxes'], report['candidateBoxes'])
+        report['matchRate'] = round(report['matched'] / most, 4)
+        report['passed'] = report['matchRate'] >= min_match_rate
+    report['referenceMs'] = round(reference_ms, 2)
+    report['backendMs'] = round(backend_ms, 2)
+    return report
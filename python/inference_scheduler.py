@@ -0,0 +1,217 @@
+# python/inference_scheduler.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+import metrics
+from log_utils import RateLimitedLogger
+
+throttled_logger = RateLimitedLogger(logging.getLogger(__name__))
+
+
+class InferenceRequest:
+    """单个摄像头提交的一次推理请求"""
+    __slots__ = ('camera_id', 'frame', 'imgsz', 'submitted_at', 'event', 'result', 'error', 'superseded')
+
+    def __init__(self, camera_id: str, frame: np.ndarray, imgsz: Optional[int] = None):
+        self.camera_id = camera_id
+        self.frame = frame
+        self.imgsz = imgsz
+        self.submitted_at = time.time()
+        self.event = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[Exception] = None
+        self.superseded = False
+
+
+class InferenceScheduler:
+    def __init__(self, infer_batch: Callable[..., List[np.ndarray]],
+                 max_batch_size: int = 8, max_wait: float = 0.02, stats_window: int = 100):
+        """
+        跨摄像头批量推理调度器
+        各摄像头线程提交最新帧，调度线程将其合并为一个批次送入YOLO模型，再把检测结果分发回各摄像头
+        :param infer_batch: 批量推理函数 infer_batch(帧列表, imgsz)，输出与之一一对应的检测结果列表；
+                            同一批次中输入尺寸不同的帧按尺寸分组推理
+        :param max_batch_size: 单批次最多包含的帧数
+        :param max_wait: 批次中最早一帧的最长等待时间（秒），超过后即使未凑满也立即推理
+        :param stats_window: 统计最近多少个批次的延迟与占用率
+        """
+        self.infer_batch = infer_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+
+        # 每个摄像头只保留最新的一帧，按提交顺序排列
+        self._pending: "OrderedDict[str, InferenceRequest]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计信息
+        self._stats_lock = threading.Lock()
+        self._recent_batches = deque(maxlen=stats_window)  # (批大小, 推理耗时, 平均排队耗时)
+        self.total_batches = 0
+        self.total_frames = 0
+        self.superseded_frames = 0
+        self.failed_batches = 0
+        self.busy_time = 0.0  # 累计推理耗时（秒），用于计算推理线程占用率
+
+    def start(self):
+        """启动调度线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """停止调度线程，并唤醒所有仍在等待的摄像头线程"""
+        with self._cond:
+            self._running = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify_all()
+        for req in pending:
+            req.superseded = True
+            req.event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, camera_id: str, frame: np.ndarray, imgsz: Optional[int] = None) -> InferenceRequest:
+        """
+        提交一帧等待推理；若该摄像头已有未处理的旧帧，则旧帧被新帧替换
+        :param imgsz: 该摄像头的推理输入尺寸，为None时使用模型默认尺寸
+        :return: 推理请求对象，可通过 request.event 等待结果
+        """
+        req = InferenceRequest(camera_id, frame, imgsz)
+        with self._cond:
+            old = self._pending.pop(camera_id, None)
+            self._pending[camera_id] = req
+            self._cond.notify()
+        if old is not None:
+            old.superseded = True
+            old.event.set()
+            with self._stats_lock:
+                self.superseded_frames += 1
+        return req
+
+    def infer(self, camera_id: str, frame: np.ndarray, timeout: Optional[float] = None,
+              imgsz: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        提交一帧并阻塞等待其检测结果
+        :return: 检测结果 (x1, y1, x2, y2, conf, class_id)；超时或被新帧替换时返回None
+        """
+        req = self.submit(camera_id, frame, imgsz)
+        if not req.event.wait(timeout):
+            return None
+        if req.error is not None:
+            raise req.error
+        if req.superseded:
+            return None
+        return req.result
+
+    def _take_batch(self) -> List[InferenceRequest]:
+        """等待凑满一个批次或到达截止时间，返回本批次的请求"""
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait(0.5)
+            if not self._running:
+                return []
+
+            first = next(iter(self._pending.values()))
+            deadline = first.submitted_at + self.max_wait
+            while self._running and len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                _, req = self._pending.popitem(last=False)
+                batch.append(req)
+            return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._take_batch()
+            if not batch:
+                continue
+
+            start = time.time()
+            queue_wait = sum(start - req.submitted_at for req in batch) / len(batch)
+            groups: Dict[Optional[int], List[InferenceRequest]] = {}
+            for req in batch:
+                groups.setdefault(req.imgsz, []).append(req)
+            # 按输入尺寸分组推理，某一组失败只影响该组的请求
+            for imgsz, group in groups.items():
+                try:
+                    results = self.infer_batch([req.frame for req in group], imgsz)
+                    for req, result in zip(group, results):
+                        req.result = result
+                except Exception as e:
+                    throttled_logger.error(f'batch:{imgsz}', "批量推理失败 (imgsz=%s): %s", imgsz, e)
+                    for req in group:
+                        req.error = e
+                    with self._stats_lock:
+                        self.failed_batches += 1
+            elapsed = time.time() - start
+
+            for req in batch:
+                req.frame = None
+                req.event.set()
+            metrics.BATCH_SIZE.labels().observe(len(batch))
+            for req in batch:
+                metrics.STAGE_SECONDS.labels(req.camera_id, 'inference_queue').observe(start - req.submitted_at)
+                metrics.STAGE_SECONDS.labels(req.camera_id, 'inference').observe(elapsed)
+
+            with self._stats_lock:
+                self.total_batches += 1
+                self.total_frames += len(batch)
+                self.busy_time += elapsed
+                self._recent_batches.append((len(batch), elapsed, queue_wait))
+
+    def get_stats(self) -> Dict:
+        """
+        获取批量推理统计信息
+        :return: 批次数、平均批大小、占用率以及最近批次的推理/排队延迟（毫秒）
+        """
+        with self._stats_lock:
+            recent = list(self._recent_batches)
+            stats = {
+                'maxBatchSize': self.max_batch_size,
+                'maxWaitMs': self.max_wait * 1000,
+                'totalBatches': self.total_batches,
+                'totalFrames': self.total_frames,
+                'supersededFrames': self.superseded_frames,
+                'failedBatches': self.failed_batches,
+                'busySeconds': round(self.busy_time, 3),
+            }
+        with self._cond:
+            stats['pending'] = len(self._pending)
+
+        if recent:
+            sizes = [size for size, _, _ in recent]
+            latencies = [elapsed * 1000 for _, elapsed, _ in recent]
+            waits = [wait * 1000 for _, _, wait in recent]
+            avg_size = sum(sizes) / len(sizes)
+            stats.update({
+                'avgBatchSize': round(avg_size, 2),
+                'occupancy': round(avg_size / self.max_batch_size, 3),
+                'avgLatencyMs': round(sum(latencies) / len(latencies), 2),
+                'maxLatencyMs': round(max(latencies), 2),
+                'lastLatencyMs': round(latencies[-1], 2),
+                'avgQueueWaitMs': round(sum(waits) / len(waits), 2),
+            })
+        else:
+            stats.update({
+                'avgBatchSize': 0, 'occupancy': 0, 'avgLatencyMs': 0,
+                'maxLatencyMs': 0, 'lastLatencyMs': 0, 'avgQueueWaitMs': 0,
+            })
+        return stats
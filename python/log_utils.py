@@ -0,0 +1,57 @@
+# python/log_utils.py
+
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+
+def setup_logging(level='INFO'):
+    """
+    配置日志输出级别与格式 (Web进程和各分片进程启动时调用)
+    :param level: 'DEBUG' 时输出每帧的跟踪调试信息，'INFO' 及以上时不输出也不格式化
+    """
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    logging.getLogger().setLevel(level)
+
+
+class RateLimitedLogger:
+    def __init__(self, logger: logging.Logger, interval: float = 10.0):
+        """
+        按消息键限流的日志：同一键在 interval 秒内只输出一次，下次输出时附带期间省略的条数
+        用于每帧都可能触发的错误 (读帧失败、推理失败等)，避免日志刷屏拖慢检测线程
+        :param logger: 实际输出的logger
+        :param interval: 同一键两次输出的最小间隔（秒）
+        """
+        self.logger = logger
+        self.interval = interval
+        self._last: Dict[str, Tuple[float, int]] = {}  # 键 -> (上次输出时间, 之后省略的条数)
+        self._lock = threading.Lock()
+
+    def log(self, level: int, key: str, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._last.get(key, (0.0, 0))
+            if last and now - last < self.interval:
+                self._last[key] = (last, suppressed + 1)
+                return
+            self._last[key] = (now, 0)
+        if suppressed:
+            msg = f"{msg} (过去 {self.interval:.0f} 秒内省略 {suppressed} 条)"
+        self.logger.log(level, msg, *args)
+
+    def debug(self, key: str, msg: str, *args):
+        self.log(logging.DEBUG, key, msg, *args)
+
+    def info(self, key: str, msg: str, *args):
+        self.log(logging.INFO, key, msg, *args)
+
+    def warning(self, key: str, msg: str, *args):
+        self.log(logging.WARNING, key, msg, *args)
+
+    def error(self, key: str, msg: str, *args):
+        self.log(logging.ERROR, key, msg, *args)
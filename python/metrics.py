@@ -0,0 +1,338 @@
+# python/metrics.py
+
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from log_utils import RateLimitedLogger
+
+throttled_logger = RateLimitedLogger(logging.getLogger(__name__))
+
+# 延迟直方图的默认分桶上限（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Value:
+    """计数器/仪表盘的单个时间序列"""
+    __slots__ = ('_value', '_lock')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def get(self) -> float:
+        return self._value
+
+    def _sample(self) -> Dict:
+        return {'value': self._value}
+
+
+class _HistogramValue:
+    """直方图的单个时间序列：各分桶计数 (非累计)、总和与总数"""
+    __slots__ = ('_buckets', '_counts', '_sum', '_count', '_lock')
+
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def _sample(self) -> Dict:
+        with self._lock:
+            return {'counts': list(self._counts), 'sum': self._sum, 'count': self._count}
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        指标族：按标签值区分的一组时间序列
+        :param name: 指标名 (Prometheus命名规范)
+        :param documentation: 说明
+        :param labelnames: 标签名
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values):
+        """获取标签值对应的时间序列，不存在时创建"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def value(self, *values) -> float:
+        """计数器/仪表盘当前值，时间序列不存在时返回0 (不创建)"""
+        child = self._children.get(tuple(str(value) for value in values))
+        return child.get() if isinstance(child, _Value) else 0.0
+
+    def remove_matching(self, label: str, value) -> int:
+        """删除标签 label 等于 value 的所有时间序列 (摄像头移除后清理)"""
+        if label not in self.labelnames:
+            return 0
+        index = self.labelnames.index(label)
+        with self._lock:
+            keys = [key for key in self._children if key[index] == str(value)]
+            for key in keys:
+                del self._children[key]
+        return len(keys)
+
+    def collect(self) -> Dict:
+        with self._lock:
+            children = list(self._children.items())
+        return {
+            'name': self.name,
+            'type': self.type,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+            'samples': [dict(child._sample(), labels=list(key)) for key, child in children],
+        }
+
+
+class Counter(Metric):
+    type = 'counter'
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def collect(self) -> Dict:
+        family = super().collect()
+        family['buckets'] = list(self.buckets)
+        return family
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = 'yolo_'):
+        """
+        进程内的指标注册表
+        :param prefix: 指标名前缀
+        """
+        self.prefix = prefix
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """注册采集回调：每次导出前调用，用于刷新队列长度等按需读取的仪表盘"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_camera(self, camera_id):
+        """删除摄像头的所有时间序列"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.remove_matching('camera', camera_id)
+
+    def collect(self) -> List[Dict]:
+        """导出所有指标的快照 (可序列化，分片进程随心跳回传)"""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                throttled_logger.error('collector', "刷新指标失败: %s", e)
+        return [metric.collect() for metric in metrics]
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def merge_families(sources: Iterable[Tuple[List[Dict], Dict[str, str]]]) -> List[Dict]:
+    """
+    合并多个进程的指标快照，同名指标的时间序列加上各自的附加标签 (如 process) 后合并为一个指标族
+    :param sources: [(指标快照, 附加标签)]，各来源的附加标签名需一致
+    """
+    merged: Dict[str, Dict] = {}
+    for families, extra in sources:
+        extra_names, extra_values = list(extra), [str(value) for value in extra.values()]
+        for family in families:
+            target = merged.get(family['name'])
+            if target is None:
+                target = dict(family, labelnames=family['labelnames'] + extra_names, samples=[])
+                merged[family['name']] = target
+            elif target['labelnames'] != family['labelnames'] + extra_names:
+                # 不同进程标签不一致时无法合并，跳过
+                continue
+            target['samples'].extend(dict(sample, labels=sample['labels'] + extra_values)
+                                     for sample in family['samples'])
+    return list(merged.values())
+
+
+def render_prometheus(families: List[Dict]) -> str:
+    """按Prometheus文本格式 (0.0.4) 输出"""
+    lines = []
+    for family in families:
+        name, names = family['name'], family['labelnames']
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for sample in family['samples']:
+            values = sample['labels']
+            if family['type'] != 'histogram':
+                lines.append(f"{name}{_format_labels(names, values)} {_format_value(sample['value'])}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(family['buckets']) + [float('inf')], sample['counts']):
+                cumulative += count
+                labels = _format_labels(list(names) + ['le'], list(values) + [_format_value(bound)])
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(names, values)} {_format_value(sample['sum'])}")
+            lines.append(f"{name}_count{_format_labels(names, values)} {sample['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def histogram_quantile(quantile: float, buckets: Sequence[float], counts: Sequence[int]) -> Optional[float]:
+    """按分桶计数线性插值估算分位数 (与PromQL histogram_quantile一致)，没有观测值时返回None"""
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = quantile * total
+    cumulative = 0
+    lower = 0.0
+    for bound, count in zip(buckets, counts):
+        if cumulative + count >= rank and count > 0:
+            return lower + (bound - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = bound
+    # 落在 +Inf 分桶中，只能返回最大的有限上限
+    return buckets[-1] if buckets else None
+
+
+def summarize(families: List[Dict]) -> Dict:
+    """
+    指标快照的JSON摘要：计数器/仪表盘为当前值，直方图为次数、平均值和P50/P95/P99 (毫秒)
+    :return: {指标名: {'type', 'help', 'series': [{'labels': {...}, ...}]}}
+    """
+    summary = {}
+    for family in families:
+        series = []
+        for sample in family['samples']:
+            item = {'labels': dict(zip(family['labelnames'], sample['labels']))}
+            if family['type'] == 'histogram':
+                count = sample['count']
+                item['count'] = count
+                item['meanMs'] = round(sample['sum'] / count * 1000, 3) if count else None
+                for quantile in (0.5, 0.95, 0.99):
+                    value = histogram_quantile(quantile, family['buckets'], sample['counts'])
+                    item[f'p{int(quantile * 100)}Ms'] = round(value * 1000, 3) if value is not None else None
+            else:
+                item['value'] = sample['value']
+            series.append(item)
+        summary[family['name']] = {'type': family['type'], 'help': family['help'], 'series': series}
+    return summary
+
+
+def sample_value(families: List[Dict], name: str, labels: Dict[str, str]) -> float:
+    """从指标快照中取出计数器/仪表盘的值，匹配 labels 中给出的标签 (多个序列匹配时求和)"""
+    total = 0.0
+    for family in families:
+        if family['name'] != name or family['type'] == 'histogram':
+            continue
+        for sample in family['samples']:
+            values = dict(zip(family['labelnames'], sample['labels']))
+            if all(values.get(key) == str(value) for key, value in labels.items()):
+                total += sample['value']
+    return total
+
+
+# 进程内默认注册表及流水线各阶段的指标
+REGISTRY = MetricsRegistry()
+
+CAPTURE_FRAMES = REGISTRY.counter(
+    'capture_frames_total', '采集线程读取的帧数 (result: captured 采集、dropped 未被检测就被覆盖、read_failed 读取失败)',
+    ['camera', 'stream', 'result'])
+FRAMES = REGISTRY.counter(
+    'frames_total', '检测线程处理的帧数 (result: detected 完成检测、skipped 被帧率/运动门控跳过、timeout 推理超时或被新帧替换)',
+    ['camera', 'result'])
+STAGE_SECONDS = REGISTRY.histogram(
+    'stage_seconds', '各摄像头各处理阶段耗时 (stage: capture、inference_queue、inference、tracking、drawing、encoding)',
+    ['camera', 'stage'])
+BATCH_SECONDS = REGISTRY.histogram(
+    'inference_batch_seconds', '推理批次各步骤耗时 (stage: preprocess、model、postprocess)', ['backend', 'stage'])
+BATCH_SIZE = REGISTRY.histogram(
+    'inference_batch_size', '推理批次大小', buckets=(1, 2, 4, 8, 16, 32))
+ACTIVE_TRACKS = REGISTRY.gauge('active_tracks', '各摄像头当前的跟踪目标数', ['camera'])
+ALERTS = REGISTRY.counter('alerts_total', '各摄像头触发的告警数', ['camera'])
+ALERT_DELIVERY_SECONDS = REGISTRY.histogram(
+    'alert_delivery_seconds', '告警送达耗时 (channel: ruoyi 提交到上报成功、socketio 产生到推送、socketio_ack 推送到客户端确认)',
+    ['channel'])
+QUEUE_DEPTH = REGISTRY.gauge('queue_depth', '各队列当前长度', ['queue'])
@@ -0,0 +1,173 @@
+# python/model_evaluator.py
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from inference_backends import TorchBackend, compare_detections, create_backend
+from model_quantization import IMAGE_EXTENSIONS, list_images
+
+PERSON_CLASS_ID = 0
+
+
+def load_eval_frames(sources: List[str], every_n: int = 10, max_frames: int = 500) -> List[Dict]:
+    """
+    加载评估用的帧：图片目录中的全部图片，或视频文件中每隔 every_n 帧取一帧
+    :return: [{'name', 'frame', 'labels'}]，labels为同名YOLO格式标注 (.txt) 中的人员框，没有标注时为None
+    """
+    items = []
+    for source in sources:
+        if os.path.isdir(source):
+            for path in list_images(source):
+                frame = cv2.imread(path)
+                if frame is not None:
+                    items.append({'name': path, 'frame': frame, 'labels': load_labels(path, frame.shape[:2])})
+        elif source.lower().endswith(IMAGE_EXTENSIONS):
+            frame = cv2.imread(source)
+            if frame is not None:
+                items.append({'name': source, 'frame': frame, 'labels': load_labels(source, frame.shape[:2])})
+        else:
+            cap = cv2.VideoCapture(source)
+            index = 0
+            while len(items) < max_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if index % every_n == 0:
+                    items.append({'name': f"{source}#{index}", 'frame': frame, 'labels': None})
+                index += 1
+            cap.release()
+        if len(items) >= max_frames:
+            break
+    return items[:max_frames]
+
+
+def load_labels(image_path: str, shape) -> Optional[np.ndarray]:
+    """读取图片旁的YOLO格式标注 (class cx cy w h，归一化坐标)，只保留人员框并转为像素坐标 (N×4)"""
+    label_path = os.path.splitext(image_path)[0] + '.txt'
+    if not os.path.exists(label_path):
+        return None
+    height, width = shape
+    boxes = []
+    with open(label_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 5 and int(float(parts[0])) == PERSON_CLASS_ID:
+                cx, cy, w, h = (float(value) for value in parts[1:5])
+                boxes.append([(cx - w / 2) * width, (cy - h / 2) * height, (cx + w / 2) * width, (cy + h / 2) * height])
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def run_backend(backend, items: List[Dict], warmup: int = 3) -> Dict:
+    """逐帧推理并记录每帧耗时"""
+    for item in items[:warmup]:
+        backend.infer([item['frame']])
+    detections, latencies = [], []
+    for item in items:
+        start = time.perf_counter()
+        detections.append(backend.infer([item['frame']])[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {'detections': detections, 'latencies': latencies}
+
+
+def precision_recall(truth: List[np.ndarray], predictions: List[np.ndarray], iou_threshold: float = 0.5) -> Dict:
+    """按IoU匹配计算人员检测的准确率/召回率"""
+    padded_truth = [np.column_stack([boxes, np.ones(len(boxes)), np.zeros(len(boxes))]) for boxes in truth]
+    report = compare_detections(padded_truth, predictions, iou_threshold)
+    precision = report['matched'] / report['candidateBoxes'] if report['candidateBoxes'] else 1.0
+    recall = report['matched'] / report['referenceBoxes'] if report['referenceBoxes'] else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1': round(f1, 4),
+        'truthBoxes': report['referenceBoxes'],
+        'predictedBoxes': report['candidateBoxes'],
+        'meanIoU': report['meanIoU'],
+    }
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    values = np.array(latencies, dtype=np.float64)
+    return {
+        'meanMs': round(float(values.mean()), 2),
+        'p50Ms': round(float(np.percentile(values, 50)), 2),
+        'p95Ms': round(float(np.percentile(values, 95)), 2),
+        'fps': round(1000.0 / float(values.mean()), 2),
+    }
+
+
+def evaluate(model_path: str, sources: List[str], backend: str = 'onnx', precisions: List[str] = ('fp32', 'int8'),
+             calibration_dir: Optional[str] = None, imgsz: int = 640, cache_dir: str = 'model_cache',
+             conf_threshold: float = 0.5, iou_threshold: float = 0.5, every_n: int = 10, max_frames: int = 500) -> Dict:
+    """
+    在同一组画面上对比PyTorch FP32模型与各精度模型的人员检测准确率和延迟
+    有标注时以标注为准；没有标注的画面以PyTorch FP32的检测结果为参考
+    :return: {'frames', 'groundTruth', 'models': {名称: {precision, recall, f1, meanMs, p95Ms, fps, speedup}}}
+    """
+    items = load_eval_frames(sources, every_n, max_frames)
+    if not items:
+        raise ValueError("没有可用的评估画面")
+    options = {'imgsz': imgsz, 'conf_threshold': conf_threshold, 'classes': [PERSON_CLASS_ID]}
+
+    candidates = {'torch-fp32': TorchBackend(model_path, **options)}
+    for precision in precisions:
+        candidates[f"{backend}-{precision}"] = create_backend(
+            backend, model_path, cache_dir=cache_dir, precision=precision, calibration_dir=calibration_dir, **options
+        )
+
+    runs = {name: run_backend(model, items) for name, model in candidates.items()}
+    reference = runs['torch-fp32']['detections']
+    has_labels = all(item['labels'] is not None for item in items)
+    truth = [item['labels'] if has_labels else reference[i][:, :4] for i, item in enumerate(items)]
+
+    baseline_ms = latency_summary(runs['torch-fp32']['latencies'])['meanMs']
+    models = {}
+    for name, run in runs.items():
+        result = precision_recall(truth, run['detections'], iou_threshold)
+        result.update(latency_summary(run['latencies']))
+        result['speedup'] = round(baseline_ms / result['meanMs'], 2) if result['meanMs'] else 0
+        models[name] = result
+    return {'frames': len(items), 'groundTruth': 'labels' if has_labels else 'torch-fp32', 'models': models}
+
+
+def print_report(report: Dict):
+    print(f"评估画面: {report['frames']}  参考: {report['groundTruth']}")
+    print(f"{'模型':<16}{'准确率':>8}{'召回率':>8}{'F1':>8}{'平均ms':>9}{'P95ms':>9}{'FPS':>8}{'加速':>7}")
+    for name, result in report['models'].items():
+        print(f"{name:<16}{result['precision']:>10.3f}{result['recall']:>10.3f}{result['f1']:>8.3f}"
+              f"{result['meanMs']:>10.1f}{result['p95Ms']:>9.1f}{result['fps']:>8.1f}{result['speedup']:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比量化模型与FP32模型的人员检测准确率和延迟')
+    parser.add_argument('sources', nargs='+', help='评估画面：图片目录 (可带YOLO格式标注)、图片或视频文件')
+    parser.add_argument('--model', default='yolov8n.pt', help='PyTorch模型路径')
+    parser.add_argument('--backend', default='onnx', choices=['onnx', 'openvino'], help='量化模型使用的推理后端')
+    parser.add_argument('--precisions', default='fp32,int8', help='要对比的精度，逗号分隔 (fp32, fp16, int8)')
+    parser.add_argument('--calibration', default='calibration_frames', help='INT8校准图片目录')
+    parser.add_argument('--imgsz', type=int, default=640, help='模型输入尺寸')
+    parser.add_argument('--conf', type=float, default=0.5, help='置信度阈值 (与IntrusionDetector一致)')
+    parser.add_argument('--every', type=int, default=10, help='视频每隔多少帧取一帧')
+    parser.add_argument('--max-frames', type=int, default=500, help='最多评估的画面数')
+    parser.add_argument('--output', help='评估结果保存为JSON文件')
+    args = parser.parse_args()
+
+    report = evaluate(
+        args.model, args.sources, backend=args.backend, precisions=args.precisions.split(','),
+        calibration_dir=args.calibration, imgsz=args.imgsz, conf_threshold=args.conf,
+        every_n=args.every, max_frames=args.max_frames
+    )
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
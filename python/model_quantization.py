@@ -0,0 +1,197 @@
+# python/model_quantization.py
+
+import hashlib
+import logging
+import os
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from inference_backends import export_model, file_hash, preprocess
+
+try:
+    from onnxruntime import quantization as ort_quantization
+except ImportError:  # onnxruntime为可选依赖
+    ort_quantization = None
+
+try:
+    import onnx
+except ImportError:  # 读取/保存ONNX模型需要onnx
+    onnx = None
+
+try:
+    from onnxconverter_common import float16 as onnx_float16
+except ImportError:  # FP16转换需要onnxconverter-common
+    onnx_float16 = None
+
+try:
+    import nncf
+    from openvino.runtime import Core as OpenVinoCore, serialize as openvino_serialize
+except ImportError:  # OpenVINO的INT8量化需要nncf
+    nncf = None
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ('fp32', 'fp16', 'int8')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# YOLOv8检测头 (model.22) 对量化误差敏感，INT8量化时保持浮点计算
+DETECT_HEAD_PREFIX = '/model.22/'
+
+
+def list_images(directory: str) -> List[str]:
+    """列出目录下的图片文件 (按文件名排序)"""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def calibration_key(directory: str, max_images: int) -> str:
+    """校准图片集的指纹 (文件名+大小)，校准集变化后重新量化"""
+    digest = hashlib.sha256()
+    for path in list_images(directory)[:max_images]:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        digest.update(str(os.path.getsize(path)).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def iter_calibration_frames(directory: str, max_images: int = 200) -> Iterator[np.ndarray]:
+    """逐张读取校准图片 (我们自己摄像头录下的画面)"""
+    for path in list_images(directory)[:max_images]:
+        frame = cv2.imread(path)
+        if frame is not None:
+            yield frame
+
+
+class _CalibrationReader:
+    """ONNX Runtime静态量化的校准数据读取器"""
+
+    def __init__(self, input_name: str, directory: str, imgsz: int, max_images: int):
+        self.input_name = input_name
+        self._frames = iter_calibration_frames(directory, max_images)
+        self.imgsz = imgsz
+
+    def get_next(self):
+        frame = next(self._frames, None)
+        if frame is None:
+            return None
+        batch, _ = preprocess([frame], self.imgsz)
+        return {self.input_name: batch}
+
+    def rewind(self):
+        pass
+
+
+def quantize_onnx_int8(model_path: str, calibration_dir: str, imgsz: int = 640, cache_dir: str = 'model_cache',
+                       max_images: int = 200, keep_head_float: bool = True) -> str:
+    """
+    用校准图片对导出的ONNX模型做INT8静态量化 (QDQ格式，权重按通道量化)
+    :param model_path: .pt 模型路径
+    :param calibration_dir: 校准图片目录
+    :param max_images: 最多使用的校准图片数
+    :param keep_head_float: 检测头保持浮点，减少框坐标和置信度的量化误差
+    :return: 量化后的 .onnx 路径 (按模型哈希、输入尺寸和校准集缓存)
+    """
+    if ort_quantization is None or onnx is None:
+        raise RuntimeError("未安装onnxruntime或onnx，无法进行INT8量化")
+    if not list_images(calibration_dir):
+        raise ValueError(f"校准目录中没有图片: {calibration_dir}")
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    target = os.path.join(
+        cache_dir, f"{stem}-{file_hash(model_path)}-{imgsz}-int8-{calibration_key(calibration_dir, max_images)}.onnx"
+    )
+    if os.path.exists(target):
+        return target
+
+    # FP32模型按动态batch和输入尺寸导出，量化后的INT8模型同样支持批量推理；校准时逐张送入
+    fp32_path = export_model(model_path, 'onnx', imgsz, cache_dir)
+    model = onnx.load(fp32_path)
+    input_name = model.graph.input[0].name
+    excluded = [node.name for node in model.graph.node if node.name.startswith(DETECT_HEAD_PREFIX)] if keep_head_float else []
+
+    logger.info("正在INT8量化 %s (校准图片: %s)", fp32_path, calibration_dir)
+    temp = target + '.tmp'
+    ort_quantization.quantize_static(
+        fp32_path, temp,
+        _CalibrationReader(input_name, calibration_dir, imgsz, max_images),
+        quant_format=ort_quantization.QuantFormat.QDQ,
+        per_channel=True,
+        weight_type=ort_quantization.QuantType.QInt8,
+        activation_type=ort_quantization.QuantType.QUInt8,
+        calibrate_method=ort_quantization.CalibrationMethod.MinMax,
+        nodes_to_exclude=excluded,
+    )
+    os.replace(temp, target)
+    return target
+
+
+def convert_onnx_fp16(model_path: str, imgsz: int = 640, cache_dir: str = 'model_cache') -> str:
+    """
+    将导出的ONNX模型权重与计算转为FP16 (输入输出保持FP32)
+    :return: FP16 .onnx 路径
+    """
+    if onnx_float16 is None or onnx is None:
+        raise RuntimeError("未安装onnxconverter-common或onnx，无法转换FP16模型")
+    fp32_path = export_model(model_path, 'onnx', imgsz, cache_dir)
+    target = fp32_path[:-len('.onnx')] + '-fp16.onnx'
+    if os.path.exists(target):
+        return target
+    model = onnx_float16.convert_float_to_float16(onnx.load(fp32_path), keep_io_types=True)
+    onnx.save(model, target + '.tmp')
+    os.replace(target + '.tmp', target)
+    return target
+
+
+def quantize_openvino_int8(model_path: str, calibration_dir: str, imgsz: int = 640, cache_dir: str = 'model_cache',
+                           max_images: int = 200) -> str:
+    """
+    用校准图片通过NNCF对OpenVINO IR做INT8训练后量化
+    :return: 量化后的 .xml 路径
+    """
+    if nncf is None:
+        raise RuntimeError("未安装nncf/openvino，无法进行OpenVINO INT8量化")
+    if not list_images(calibration_dir):
+        raise ValueError(f"校准目录中没有图片: {calibration_dir}")
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    target = os.path.join(
+        cache_dir, f"{stem}-{file_hash(model_path)}-{imgsz}-int8-{calibration_key(calibration_dir, max_images)}.xml"
+    )
+    if os.path.exists(target):
+        return target
+
+    ir_dir = export_model(model_path, 'openvino', imgsz, cache_dir)
+    xml_path = next(os.path.join(ir_dir, name) for name in os.listdir(ir_dir) if name.endswith('.xml'))
+    model = OpenVinoCore().read_model(xml_path)
+    frames = list(iter_calibration_frames(calibration_dir, max_images))
+    dataset = nncf.Dataset(frames, lambda frame: preprocess([frame], imgsz)[0])
+    ignored = nncf.IgnoredScope(patterns=[f"{DETECT_HEAD_PREFIX}.*"])
+    logger.info("正在INT8量化 %s (校准图片: %s)", xml_path, calibration_dir)
+    quantized = nncf.quantize(model, dataset, preset=nncf.QuantizationPreset.MIXED, ignored_scope=ignored)
+    openvino_serialize(quantized, target)
+    return target
+
+
+def build_artifact(backend: str, model_path: str, precision: str = 'fp32', imgsz: int = 640,
+                   cache_dir: str = 'model_cache', calibration_dir: Optional[str] = None) -> str:
+    """
+    按后端和精度准备模型文件 (导出/量化结果均缓存)
+    :param backend: 'onnx' 或 'openvino'
+    :param precision: 'fp32'、'fp16' 或 'int8' (int8需要 calibration_dir)
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"不支持的模型精度: {precision}，可选 {PRECISIONS}")
+    if precision == 'int8' and not calibration_dir:
+        raise ValueError("INT8量化需要提供校准图片目录")
+    if backend == 'onnx':
+        if precision == 'int8':
+            return quantize_onnx_int8(model_path, calibration_dir, imgsz, cache_dir)
+        if precision == 'fp16':
+            return convert_onnx_fp16(model_path, imgsz, cache_dir)
+        return export_model(model_path, 'onnx', imgsz, cache_dir)
+    if backend == 'openvino':
+        if precision == 'int8':
+            return quantize_openvino_int8(model_path, calibration_dir, imgsz, cache_dir)
+        return export_model(model_path, 'openvino', imgsz, cache_dir, half=precision == 'fp16')
+    raise ValueError(f"后端 {backend} 不支持量化模型")
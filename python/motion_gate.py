@@ -0,0 +1,137 @@
+# python/motion_gate.py
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, enabled: bool = True, sensitivity: float = 0.003, pixel_threshold: int = 25,
+                 downscale_width: int = 160, region: Optional[List] = None,
+                 keyframe_interval: float = 5.0, background_alpha: float = 0.05):
+        """
+        基于帧差的运动预过滤器
+        在缩小的灰度图上与背景做差分，画面静止且没有活动跟踪目标时跳过YOLO推理，并定期强制推理作为兜底
+        :param enabled: 是否启用；关闭时每帧都推理
+        :param sensitivity: 判定为运动所需的变化像素比例 (相对检测区域)
+        :param pixel_threshold: 单个像素灰度变化超过该值才算变化
+        :param downscale_width: 差分前将画面缩小到的宽度
+        :param region: 检测区域，归一化坐标；[x1, y1, x2, y2] 矩形或 [[x, y], ...] 多边形，None表示全画面
+        :param keyframe_interval: 最长多少秒强制推理一次（秒）
+        :param background_alpha: 背景更新速率
+        """
+        self.enabled = enabled
+        self.sensitivity = sensitivity
+        self.pixel_threshold = pixel_threshold
+        self.downscale_width = downscale_width
+        self.region = region
+        self.keyframe_interval = keyframe_interval
+        self.background_alpha = background_alpha
+
+        self._background: Optional[np.ndarray] = None
+        self._mask: Optional[np.ndarray] = None
+        self._mask_pixels = 0
+        self._last_inference = 0.0
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.total_frames = 0
+        self.skipped_frames = 0
+        self.motion_frames = 0
+        self.keyframes = 0
+        self.last_motion_ratio = 0.0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> 'MotionGate':
+        """根据摄像头配置中的 motion_gate 段创建"""
+        config = config or {}
+        return cls(
+            enabled=config.get('enabled', False),
+            sensitivity=config.get('sensitivity', 0.003),
+            pixel_threshold=config.get('pixel_threshold', 25),
+            downscale_width=config.get('downscale_width', 160),
+            region=config.get('region'),
+            keyframe_interval=config.get('keyframe_interval', 5.0),
+            background_alpha=config.get('background_alpha', 0.05)
+        )
+
+    def _build_mask(self, shape) -> np.ndarray:
+        height, width = shape
+        if not self.region:
+            return np.ones((height, width), dtype=bool)
+        mask = np.zeros((height, width), dtype=np.uint8)
+        if len(self.region) == 4 and not isinstance(self.region[0], (list, tuple)):
+            x1, y1, x2, y2 = self.region
+            points = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+        else:
+            points = self.region
+        polygon = np.array([[x * width, y * height] for x, y in points], dtype=np.int32)
+        cv2.fillPoly(mask, [polygon], 1)
+        return mask.astype(bool)
+
+    def _preprocess(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        scale = self.downscale_width / width
+        small = cv2.resize(frame, (self.downscale_width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def should_infer(self, frame: np.ndarray, has_active_tracks: bool = False, now: Optional[float] = None) -> bool:
+        """
+        判断该帧是否需要送入模型推理
+        :param frame: 当前帧
+        :param has_active_tracks: 该摄像头是否还有活动的跟踪目标 (有则必须推理以维持跟踪)
+        :param now: 当前时间，默认 time.time()
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self.total_frames += 1
+            if not self.enabled:
+                self._last_inference = now
+                return True
+
+            gray = self._preprocess(frame)
+            if self._background is None or self._background.shape != gray.shape:
+                self._background = gray.astype(np.float32)
+                self._mask = self._build_mask(gray.shape)
+                self._mask_pixels = max(1, int(self._mask.sum()))
+                self._last_inference = now
+                self.keyframes += 1
+                return True
+
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+            changed = np.count_nonzero((diff > self.pixel_threshold) & self._mask)
+            self.last_motion_ratio = changed / self._mask_pixels
+            cv2.accumulateWeighted(gray, self._background, self.background_alpha)
+
+            motion = self.last_motion_ratio >= self.sensitivity
+            if motion:
+                self.motion_frames += 1
+            if motion or has_active_tracks:
+                self._last_inference = now
+                return True
+            if now - self._last_inference >= self.keyframe_interval:
+                # 兜底：长时间未推理时强制推理一次，防止缓慢进入画面的人员被漏检
+                self._last_inference = now
+                self.keyframes += 1
+                return True
+
+            self.skipped_frames += 1
+            return False
+
+    def get_stats(self) -> Dict:
+        """获取跳帧统计：总帧数、跳过帧数、跳帧率、运动帧数、强制推理次数"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'totalFrames': self.total_frames,
+                'skippedFrames': self.skipped_frames,
+                'skipRate': round(self.skipped_frames / self.total_frames, 4) if self.total_frames else 0,
+                'motionFrames': self.motion_frames,
+                'keyframes': self.keyframes,
+                'lastMotionRatio': round(self.last_motion_ratio, 5),
+            }
@@ -0,0 +1,174 @@
+# python/rate_controller.py
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class _CameraRate:
+    """单个摄像头的检测频率状态"""
+    __slots__ = ('idle_fps', 'active_fps', 'alert_fps', 'level', 'target_fps', 'last_processed',
+                 'last_alert', 'processed', 'skipped', 'actual_fps')
+
+    def __init__(self, idle_fps: float, active_fps: float, alert_fps: float):
+        self.idle_fps = idle_fps
+        self.active_fps = active_fps
+        self.alert_fps = alert_fps
+        self.level = 'idle'
+        self.target_fps = idle_fps
+        self.last_processed = 0.0
+        self.last_alert = 0.0
+        self.processed = 0
+        self.skipped = 0
+        self.actual_fps = 0.0
+
+
+class DetectionRateController:
+    LEVELS = ('idle', 'active', 'alert')
+
+    def __init__(self, idle_fps: float = 2.0, active_fps: float = 8.0, alert_fps: float = 12.0,
+                 min_fps: float = 0.5, alert_hold: float = 10.0, cpu_budget: float = 0.8,
+                 adjust_interval: float = 1.0, reference_fps: float = 10.0,
+                 busy_time_provider: Optional[Callable[[], float]] = None):
+        """
+        自适应的摄像头检测频率控制器
+        每个摄像头按场景状态获得目标检测帧率：有近期告警的最高，有活动目标的次之，空闲的最低；
+        推理线程占用率超过CPU预算时按比例降低所有摄像头的帧率，低于预算时逐步恢复
+        :param idle_fps: 空闲摄像头的检测帧率
+        :param active_fps: 有活动跟踪目标时的检测帧率
+        :param alert_fps: 近期有告警时的检测帧率
+        :param min_fps: 降频后的最低检测帧率
+        :param alert_hold: 告警后保持高帧率的时间（秒）
+        :param cpu_budget: 推理线程占用率上限 (推理耗时 / 墙钟时间)
+        :param adjust_interval: 重新计算降频比例的间隔（秒）
+        :param reference_fps: 跟踪器的基准帧率，用于把两次检测的时间间隔换算为帧数
+        :param busy_time_provider: 返回累计推理耗时（秒）的函数，为None时不做负载调节
+        """
+        self.idle_fps = idle_fps
+        self.active_fps = active_fps
+        self.alert_fps = alert_fps
+        self.min_fps = min_fps
+        self.alert_hold = alert_hold
+        self.cpu_budget = cpu_budget
+        self.adjust_interval = adjust_interval
+        self.reference_fps = reference_fps
+        self.busy_time_provider = busy_time_provider
+
+        self._cameras: Dict[str, _CameraRate] = {}
+        self._lock = threading.Lock()
+        self.scale = 1.0  # 负载降频比例 (0, 1]
+        self.utilization = 0.0
+        self._last_adjust = time.time()
+        self._last_busy = busy_time_provider() if busy_time_provider else 0.0
+
+    def register(self, camera_id, config: Optional[Dict] = None):
+        """
+        登记摄像头，可按摄像头配置覆盖各级帧率
+        :param config: 摄像头配置中的 detection_rate 段 {'idle_fps', 'active_fps', 'alert_fps'}
+        """
+        config = config or {}
+        with self._lock:
+            self._cameras[str(camera_id)] = _CameraRate(
+                config.get('idle_fps', self.idle_fps),
+                config.get('active_fps', self.active_fps),
+                config.get('alert_fps', self.alert_fps)
+            )
+
+    def unregister(self, camera_id):
+        """移除摄像头"""
+        with self._lock:
+            self._cameras.pop(str(camera_id), None)
+
+    def note_alert(self, camera_id, now: Optional[float] = None):
+        """记录摄像头产生了告警 (可由告警事件回调调用)"""
+        with self._lock:
+            camera = self._cameras.get(str(camera_id))
+            if camera is not None:
+                camera.last_alert = time.time() if now is None else now
+
+    def _adjust(self, now: float):
+        """按推理线程占用率更新全局降频比例"""
+        if self.busy_time_provider is None or now - self._last_adjust < self.adjust_interval:
+            return
+        busy = self.busy_time_provider()
+        self.utilization = (busy - self._last_busy) / (now - self._last_adjust)
+        self._last_busy = busy
+        self._last_adjust = now
+        if self.utilization > self.cpu_budget:
+            # 超出预算：按超出比例降频 (单次最多减半，避免震荡)
+            self.scale = max(0.05, self.scale * max(0.5, self.cpu_budget / self.utilization))
+        else:
+            # 低于预算：缓慢恢复
+            self.scale = min(1.0, self.scale * 1.1)
+
+    def should_process(self, camera_id, has_active_tracks: bool = False, now: Optional[float] = None) -> bool:
+        """
+        判断摄像头当前帧是否到了检测时间
+        :param camera_id: 摄像头ID
+        :param has_active_tracks: 摄像头是否有活动跟踪目标
+        :param now: 当前时间，默认 time.time()
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._adjust(now)
+            camera = self._cameras.get(str(camera_id))
+            if camera is None:
+                return True
+
+            if now - camera.last_alert < self.alert_hold:
+                camera.level, level_fps = 'alert', camera.alert_fps
+            elif has_active_tracks:
+                camera.level, level_fps = 'active', camera.active_fps
+            else:
+                camera.level, level_fps = 'idle', camera.idle_fps
+            camera.target_fps = max(min(self.min_fps, level_fps), level_fps * self.scale)
+
+            if camera.last_processed and now - camera.last_processed < 1.0 / camera.target_fps:
+                camera.skipped += 1
+                return False
+            return True
+
+    def get_target_fps(self, camera_id) -> Optional[float]:
+        """摄像头当前的目标检测帧率 (未登记时返回None)"""
+        with self._lock:
+            camera = self._cameras.get(str(camera_id))
+            return camera.target_fps if camera is not None else None
+
+    def mark_processed(self, camera_id, now: Optional[float] = None) -> float:
+        """
+        记录摄像头完成了一次检测
+        :return: 距上次检测经过的帧数 (按基准帧率换算，作为跟踪器预测的dt)，首次检测返回1
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            camera = self._cameras.get(str(camera_id))
+            if camera is None:
+                return 1.0
+            dt = 1.0
+            if camera.last_processed:
+                elapsed = now - camera.last_processed
+                dt = max(1.0, elapsed * self.reference_fps)
+                if elapsed > 0:
+                    camera.actual_fps = camera.actual_fps * 0.8 + (1.0 / elapsed) * 0.2 if camera.actual_fps else 1.0 / elapsed
+            camera.last_processed = now
+            camera.processed += 1
+            return dt
+
+    def get_stats(self) -> Dict:
+        """获取降频比例、推理占用率以及各摄像头的目标/实际检测帧率"""
+        with self._lock:
+            return {
+                'scale': round(self.scale, 3),
+                'utilization': round(self.utilization, 3),
+                'cpuBudget': self.cpu_budget,
+                'cameras': {
+                    camera_id: {
+                        'level': camera.level,
+                        'targetFps': round(camera.target_fps, 2),
+                        'actualFps': round(camera.actual_fps, 2),
+                        'processed': camera.processed,
+                        'skipped': camera.skipped,
+                    }
+                    for camera_id, camera in self._cameras.items()
+                },
+            }
@@ -0,0 +1,414 @@
+# python/replay_benchmark.py
+
+import argparse
+import configparser
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from intrusion_detector import IntrusionDetector, PersonTracker, linear_assignment
+from model_quantization import list_images
+from rate_controller import DetectionRateController
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不统计峰值RSS
+    resource = None
+
+REPLAY_CAMERA_ID = 'replay'
+STAGES = ('decode', 'inference', 'tracking', 'drawing')
+
+
+class SimulatedClock:
+    def __init__(self, fps: float, start: float = 0.0):
+        """
+        按源帧率推进的模拟时钟：报警间隔 (10/30/60秒) 按视频时间而不是处理耗时计算，同一输入的结果可复现
+        :param fps: 源帧率
+        :param start: 起始时间戳
+        """
+        self.interval = 1.0 / fps
+        self.now = start
+
+    def tick(self) -> float:
+        self.now += self.interval
+        return self.now
+
+
+def resolve_source(source: str, gt_path: Optional[str], fps: Optional[float]) -> Tuple[str, Optional[str], Optional[float]]:
+    """
+    识别MOTChallenge目录结构 (img1/、gt/gt.txt、seqinfo.ini)，未指定标注和帧率时使用其中的文件
+    :return: (画面来源, 标注文件, 帧率)
+    """
+    if not os.path.isdir(source) or not os.path.isdir(os.path.join(source, 'img1')):
+        return source, gt_path, fps
+    if gt_path is None and os.path.exists(os.path.join(source, 'gt', 'gt.txt')):
+        gt_path = os.path.join(source, 'gt', 'gt.txt')
+    seqinfo = os.path.join(source, 'seqinfo.ini')
+    if fps is None and os.path.exists(seqinfo):
+        parser = configparser.ConfigParser()
+        parser.read(seqinfo)
+        fps = parser.getfloat('Sequence', 'frameRate', fallback=None)
+    return os.path.join(source, 'img1'), gt_path, fps
+
+
+def source_fps(source: str) -> Optional[float]:
+    """视频文件的帧率，图片序列返回None"""
+    if os.path.isdir(source):
+        return None
+    cap = cv2.VideoCapture(source)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps if fps and fps > 0 else None
+
+
+def iter_frames(source: str, max_frames: int = 0) -> Iterator[Tuple[int, Optional[np.ndarray], float]]:
+    """
+    依次读取视频文件或图片目录中的帧
+    :return: (帧号 (从1开始，与MOT标注一致), 画面, 解码耗时 (秒))，图片无法读取时画面为None
+    """
+    if os.path.isdir(source):
+        for index, path in enumerate(list_images(source), 1):
+            if max_frames and index > max_frames:
+                break
+            started = time.perf_counter()
+            frame = cv2.imread(path)
+            yield index, frame, time.perf_counter() - started
+        return
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频: {source}")
+    index = 0
+    try:
+        while not max_frames or index < max_frames:
+            started = time.perf_counter()
+            ret, frame = cap.read()
+            elapsed = time.perf_counter() - started
+            if not ret:
+                break
+            index += 1
+            yield index, frame, elapsed
+    finally:
+        cap.release()
+
+
+def load_mot_file(path: str, min_conf: Optional[float] = None) -> Dict[int, np.ndarray]:
+    """
+    读取MOTChallenge格式的文件 (frame, id, left, top, width, height, conf, ...)
+    标注文件 (gt.txt) 中 conf 为0的行表示忽略；检测文件 (det.txt) 按 min_conf 过滤
+    :return: {帧号: N×6 (id, x1, y1, x2, y2, conf)}
+    """
+    rows = defaultdict(list)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.replace(',', ' ').split()
+            if len(parts) < 6:
+                continue
+            frame_no, object_id, left, top, width, height = (float(value) for value in parts[:6])
+            conf = float(parts[6]) if len(parts) > 6 else 1.0
+            if (min_conf is None and conf == 0) or (min_conf is not None and conf < min_conf):
+                continue
+            rows[int(frame_no)].append([object_id, left, top, left + width, top + height, conf])
+    return {frame_no: np.array(values, dtype=np.float32) for frame_no, values in rows.items()}
+
+
+class TrackingEvaluator:
+    def __init__(self, iou_threshold: float = 0.5):
+        """
+        按帧累计跟踪结果与标注的匹配情况，计算 CLEAR MOT (MOTA、MOTP、ID切换) 与 IDF1
+        :param iou_threshold: 跟踪框与标注框视为同一目标的最小IoU
+        """
+        self.iou_threshold = iou_threshold
+        self.mapping: Dict[int, str] = {}  # 标注ID -> 上次匹配的跟踪ID
+        self.gt_total = 0
+        self.track_total = 0
+        self.matches = 0
+        self.false_positives = 0
+        self.misses = 0
+        self.id_switches = 0
+        self.iou_sum = 0.0
+        # IDF1：每对 (标注ID, 跟踪ID) 重叠的帧数，以及各ID出现的帧数
+        self.pair_frames: Dict[Tuple[int, str], int] = defaultdict(int)
+        self.gt_frames: Dict[int, int] = defaultdict(int)
+        self.track_frames: Dict[str, int] = defaultdict(int)
+
+    def update(self, gt: np.ndarray, tracks: List[Dict]):
+        """
+        :param gt: 本帧标注 N×6 (id, x1, y1, x2, y2, conf)
+        :param tracks: process_detections 返回的跟踪结果
+        """
+        gt_ids = [int(value) for value in gt[:, 0]]
+        track_ids = [track['id'] for track in tracks]
+        gt_boxes = gt[:, 1:5].astype(np.float64)
+        track_boxes = np.array([track['bbox'] for track in tracks], dtype=np.float64).reshape(-1, 4)
+        iou = PersonTracker._iou_matrix(gt_boxes, track_boxes) if len(gt_ids) and len(track_ids) \
+            else np.zeros((len(gt_ids), len(track_ids)))
+
+        for gt_id in gt_ids:
+            self.gt_frames[gt_id] += 1
+        for track_id in track_ids:
+            self.track_frames[track_id] += 1
+        for i, j in zip(*np.nonzero(iou >= self.iou_threshold)):
+            self.pair_frames[(gt_ids[i], track_ids[j])] += 1
+
+        # 先保留上一帧的对应关系 (IoU仍满足阈值)，剩余的再做最优匹配
+        matched: Dict[int, int] = {}
+        used = set()
+        column_of = {track_id: j for j, track_id in enumerate(track_ids)}
+        for i, gt_id in enumerate(gt_ids):
+            j = column_of.get(self.mapping.get(gt_id))
+            if j is not None and j not in used and iou[i, j] >= self.iou_threshold:
+                matched[i] = j
+                used.add(j)
+        rows = [i for i in range(len(gt_ids)) if i not in matched]
+        cols = [j for j in range(len(track_ids)) if j not in used]
+        if rows and cols:
+            sub = iou[np.ix_(rows, cols)]
+            for r, c in zip(*linear_assignment(1.0 - sub)):
+                if sub[r, c] >= self.iou_threshold:
+                    matched[rows[r]] = cols[c]
+
+        for i, j in matched.items():
+            previous = self.mapping.get(gt_ids[i])
+            if previous is not None and previous != track_ids[j]:
+                self.id_switches += 1
+            self.mapping[gt_ids[i]] = track_ids[j]
+            self.iou_sum += float(iou[i, j])
+        self.gt_total += len(gt_ids)
+        self.track_total += len(track_ids)
+        self.matches += len(matched)
+        self.misses += len(gt_ids) - len(matched)
+        self.false_positives += len(track_ids) - len(matched)
+
+    def result(self) -> Dict:
+        # IDF1：标注ID与跟踪ID一对一全局匹配，使正确关联的帧数 (IDTP) 最大
+        gt_ids, track_ids = list(self.gt_frames), list(self.track_frames)
+        weights = np.zeros((len(gt_ids), len(track_ids)))
+        gt_index = {gt_id: i for i, gt_id in enumerate(gt_ids)}
+        track_index = {track_id: j for j, track_id in enumerate(track_ids)}
+        for (gt_id, track_id), frames in self.pair_frames.items():
+            weights[gt_index[gt_id], track_index[track_id]] = frames
+        rows, cols = linear_assignment(-weights)
+        idtp = float(weights[rows, cols].sum()) if len(rows) else 0.0
+        denominator = self.gt_total + self.track_total
+        return {
+            'mota': round(1.0 - (self.misses + self.false_positives + self.id_switches) / self.gt_total, 4)
+            if self.gt_total else None,
+            'motp': round(self.iou_sum / self.matches, 4) if self.matches else None,
+            'idf1': round(2 * idtp / denominator, 4) if denominator else None,
+            'idPrecision': round(idtp / self.track_total, 4) if self.track_total else None,
+            'idRecall': round(idtp / self.gt_total, 4) if self.gt_total else None,
+            'idSwitches': self.id_switches,
+            'falsePositives': self.false_positives,
+            'misses': self.misses,
+            'gtBoxes': self.gt_total,
+            'gtIdentities': len(gt_ids),
+            'trackIdentities': len(track_ids),
+        }
+
+
+def percentiles(values: List[float]) -> Dict:
+    """各阶段耗时的统计 (毫秒)"""
+    if not values:
+        return {'count': 0}
+    ms = np.array(values, dtype=np.float64) * 1000
+    return {
+        'count': len(values),
+        'meanMs': round(float(ms.mean()), 3),
+        'p50Ms': round(float(np.percentile(ms, 50)), 3),
+        'p95Ms': round(float(np.percentile(ms, 95)), 3),
+        'p99Ms': round(float(np.percentile(ms, 99)), 3),
+        'maxMs': round(float(ms.max()), 3),
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程的峰值常驻内存 (MB)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return round(peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def replay(source: str, model_path: str = 'yolov8n.pt', backend: str = 'torch', imgsz: int = 640,
+           matching: str = 'hungarian', gt_path: Optional[str] = None, detections_path: Optional[str] = None,
+           fps: Optional[float] = None, every_n: int = 1, max_frames: int = 0, draw: bool = True,
+           warmup: int = 3, iou_threshold: float = 0.5, trace_memory: bool = False) -> Dict:
+    """
+    离线回放录像或图片序列：按 process_frame 的步骤 (推理 -> 跟踪报警 -> 绘制) 逐帧处理，报警时间使用模拟时钟
+    :param detections_path: MOT格式的预先检测结果 (det.txt)，指定时不做推理，只比较跟踪器
+    :param fps: 源帧率，默认取视频帧率 (图片序列为seqinfo.ini中的帧率或25)
+    :param every_n: 每隔多少帧检测一次 (跟踪器的dt与线上一致，由检测频率控制器按模拟时钟换算为基准帧率下的帧数)
+    :param draw: 是否统计绘制阶段 (有人观看视频流时的开销)
+    :param trace_memory: 用tracemalloc统计Python分配的峰值内存 (会降低速度)
+    :return: {'source', 'frames', 'fps', 'stages', 'memory', 'alerts', 'tracking'}
+    """
+    source, gt_path, fps = resolve_source(source, gt_path, fps)
+    fps = fps or source_fps(source) or 25.0
+    detector = IntrusionDetector(model_path, tracker_matching=matching, backend=backend, imgsz=imgsz)
+    precomputed = load_mot_file(detections_path, detector.confidence_threshold) if detections_path else None
+    ground_truth = load_mot_file(gt_path) if gt_path else None
+    evaluator = TrackingEvaluator(iou_threshold) if ground_truth is not None else None
+
+    alerts: List[Dict] = []
+    detector.add_event_callback(alerts.append)
+    detector.set_report_alert_callback(lambda report: None)  # 回放不上报RuoYi
+    clock = SimulatedClock(fps)
+    # 与线上流水线相同，dt按两次检测的时间间隔换算为基准帧率 (reference_fps) 下的帧数，而不是源帧数
+    rate_controller = DetectionRateController()
+    rate_controller.register(REPLAY_CAMERA_ID)
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    frame_totals: List[float] = []
+
+    if trace_memory:
+        tracemalloc.start()
+    processed, decoded = 0, 0
+    started = time.perf_counter()
+    try:
+        for frame_no, frame, decode_seconds in iter_frames(source, max_frames):
+            now = clock.tick()
+            decoded += 1
+            timings['decode'].append(decode_seconds)
+            if frame is None or (frame_no - 1) % every_n:
+                continue
+            if precomputed is None and processed == 0:
+                for _ in range(warmup):
+                    detector.detect(frame)
+                started = time.perf_counter()
+
+            total = decode_seconds
+            if precomputed is None:
+                stage_started = time.perf_counter()
+                detections = detector.detect(frame)
+                elapsed = time.perf_counter() - stage_started
+                timings['inference'].append(elapsed)
+                total += elapsed
+            else:
+                rows = precomputed.get(frame_no, np.zeros((0, 6), dtype=np.float32))
+                detections = np.column_stack([rows[:, 1:6], np.full(len(rows), detector.person_class_id)])
+
+            dt = rate_controller.mark_processed(REPLAY_CAMERA_ID, now=now)
+            stage_started = time.perf_counter()
+            tracks = detector.process_detections(frame.shape, REPLAY_CAMERA_ID, detections, dt, now=now)
+            elapsed = time.perf_counter() - stage_started
+            timings['tracking'].append(elapsed)
+            total += elapsed
+
+            if draw:
+                stage_started = time.perf_counter()
+                detector.annotate_frame(frame, tracks, REPLAY_CAMERA_ID)
+                elapsed = time.perf_counter() - stage_started
+                timings['drawing'].append(elapsed)
+                total += elapsed
+
+            frame_totals.append(total)
+            processed += 1
+            if evaluator is not None:
+                evaluator.update(ground_truth.get(frame_no, np.zeros((0, 6), dtype=np.float32)), tracks)
+        wall = time.perf_counter() - started
+    finally:
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    if not processed:
+        raise ValueError(f"没有可用的回放画面: {source}")
+
+    throughput = processed / wall if wall > 0 else 0.0
+    alerted_tracks = sorted({event['person_id'] for event in alerts})
+    return {
+        'source': source,
+        'groundTruth': gt_path,
+        'detections': detections_path or f"{backend}:{model_path}",
+        'matching': matching,
+        'frames': decoded,
+        'processedFrames': processed,
+        'sourceFps': round(fps, 2),
+        'simulatedSeconds': round(decoded / fps, 2),
+        'fps': round(throughput, 2),
+        'realtimeFactor': round(throughput * every_n / fps, 2),
+        'stages': {stage: percentiles(values) for stage, values in timings.items() if values},
+        'frame': percentiles(frame_totals),
+        'memory': {
+            'peakRssMB': peak_rss_mb(),
+            'peakTracedMB': round(traced_peak / 1e6, 1) if traced_peak is not None else None,
+        },
+        'alerts': {
+            'total': len(alerts),
+            'tracks': len(alerted_tracks),
+            'byLevel': _alerts_by_level(alerts),
+        },
+        'tracking': evaluator.result() if evaluator is not None else None,
+    }
+
+
+def _alerts_by_level(alerts: List[Dict]) -> Dict[str, int]:
+    """按报警次序 (首次、第2次……) 统计，检查10/30/60秒的升级报警是否按时触发"""
+    counts: Dict[str, int] = defaultdict(int)
+    seen: Dict[str, int] = defaultdict(int)
+    for event in alerts:
+        seen[event['person_id']] += 1
+        counts[str(seen[event['person_id']])] += 1
+    return dict(counts)
+
+
+def print_report(report: Dict):
+    print(f"回放: {report['source']}  检测: {report['detections']}  匹配: {report['matching']}")
+    print(f"帧数: {report['frames']} (处理 {report['processedFrames']})  源帧率: {report['sourceFps']}  "
+          f"模拟时长: {report['simulatedSeconds']}s")
+    print(f"处理FPS: {report['fps']:.1f}  实时倍数: {report['realtimeFactor']:.2f}x")
+    print(f"{'阶段':<12}{'次数':>8}{'平均ms':>10}{'P50ms':>10}{'P95ms':>10}{'P99ms':>10}")
+    for name, stats in list(report['stages'].items()) + [('frame', report['frame'])]:
+        print(f"{name:<12}{stats['count']:>8}{stats['meanMs']:>10.2f}{stats['p50Ms']:>10.2f}"
+              f"{stats['p95Ms']:>10.2f}{stats['p99Ms']:>10.2f}")
+    memory = report['memory']
+    line = f"峰值RSS: {memory['peakRssMB']} MB"
+    if memory['peakTracedMB'] is not None:
+        line += f"  峰值Python分配: {memory['peakTracedMB']} MB"
+    print(line)
+    alerts = report['alerts']
+    print(f"告警: {alerts['total']} 次，涉及 {alerts['tracks']} 个跟踪ID，按次序: {alerts['byLevel']}")
+    tracking = report['tracking']
+    if tracking:
+        print(f"MOTA: {tracking['mota']}  MOTP: {tracking['motp']}  IDF1: {tracking['idf1']}  "
+              f"ID切换: {tracking['idSwitches']}  误检: {tracking['falsePositives']}  漏检: {tracking['misses']}  "
+              f"标注ID: {tracking['gtIdentities']}  跟踪ID: {tracking['trackIdentities']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线回放录像/图片序列，测量检测跟踪性能与跟踪准确率 (结果可复现)')
+    parser.add_argument('source', help='视频文件、图片目录或MOTChallenge序列目录 (含img1/、gt/gt.txt)')
+    parser.add_argument('--model', default='yolov8n.pt', help='模型路径')
+    parser.add_argument('--backend', default='torch', choices=['torch', 'onnx', 'openvino', 'auto'], help='推理后端')
+    parser.add_argument('--imgsz', type=int, default=640, help='模型输入尺寸')
+    parser.add_argument('--matching', default='hungarian', choices=PersonTracker.MATCHING_MODES, help='跟踪匹配方式')
+    parser.add_argument('--gt', help='MOT格式的标注文件 (gt.txt)，指定时计算MOTA/IDF1')
+    parser.add_argument('--detections', help='MOT格式的检测结果 (det.txt)，指定时跳过推理只比较跟踪器')
+    parser.add_argument('--fps', type=float, help='源帧率 (默认取视频帧率，图片序列为25)')
+    parser.add_argument('--every', type=int, default=1, help='每隔多少帧检测一次')
+    parser.add_argument('--max-frames', type=int, default=0, help='最多回放的帧数，0表示全部')
+    parser.add_argument('--no-draw', action='store_true', help='不绘制标注 (模拟无人观看)')
+    parser.add_argument('--iou', type=float, default=0.5, help='跟踪框与标注框匹配的IoU阈值')
+    parser.add_argument('--trace-memory', action='store_true', help='统计Python分配的峰值内存 (会降低速度)')
+    parser.add_argument('--output', help='结果保存为JSON文件')
+    args = parser.parse_args()
+
+    report = replay(
+        args.source, model_path=args.model, backend=args.backend, imgsz=args.imgsz, matching=args.matching,
+        gt_path=args.gt, detections_path=args.detections, fps=args.fps, every_n=max(1, args.every),
+        max_frames=args.max_frames, draw=not args.no_draw, iou_threshold=args.iou, trace_memory=args.trace_memory
+    )
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
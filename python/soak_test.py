@@ -0,0 +1,605 @@
+# python/soak_test.py
+
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+import socketio
+
+try:
+    import psutil
+except ImportError:  # psutil为可选依赖，缺失时在Linux上读取 /proc
+    psutil = None
+
+SYNTHETIC_DEVICE_BASE = 9001  # 模拟摄像头的设备ID起始值，避免与RuoYi中的真实设备冲突
+
+
+class RuoYiStandIn:
+    def __init__(self):
+        """
+        本地模拟的RuoYi后端：提供Token、设备列表和告警上报接口
+        设备列表可在运行中修改，配合 /api/devices/refresh 增删模拟摄像头
+        """
+        self.devices: List[Dict] = []
+        self.reports = 0
+        self.lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, payload: Dict):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith('/api/yolo/device/list'):
+                    with standin.lock:
+                        devices = list(standin.devices)
+                    self._reply({'code': 200, 'data': devices, 'msg': 'success'})
+                else:
+                    self._reply({'code': 404, 'msg': 'not found'})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                if self.path.startswith('/api/auth/token'):
+                    self._reply({'code': 200, 'data': 'soak-test-token', 'msg': 'success'})
+                elif self.path.startswith('/api/yolo/alert/report'):
+                    with standin.lock:
+                        standin.reports += 1
+                    self._reply({'code': 200, 'msg': 'success'})
+                else:
+                    self._reply({'code': 404, 'msg': 'not found'})
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def set_devices(self, devices: List[Dict]):
+        with self.lock:
+            self.devices = list(devices)
+
+
+class MjpegClient(threading.Thread):
+    BOUNDARY = b'--frame'
+
+    def __init__(self, base_url: str, camera_id: int, tier: str, overlay: str, stop_event: threading.Event):
+        """
+        模拟观看 /video_feed 的浏览器：持续读取MJPEG流并统计帧数和字节数，断开后自动重连
+        :param tier: 视频流档位
+        :param overlay: 标注方式 (server/client)
+        """
+        super().__init__(name=f'mjpeg-{camera_id}-{tier}', daemon=True)
+        self.url = f"{base_url}/video_feed/{camera_id}?tier={tier}&overlay={overlay}"
+        self.stop_event = stop_event
+        self.frames = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                with requests.get(self.url, stream=True, timeout=(5, 10)) as response:
+                    tail = b''
+                    for chunk in response.iter_content(65536):
+                        self.bytes += len(chunk)
+                        data = tail + chunk
+                        self.frames += data.count(self.BOUNDARY)
+                        # 保留不足一个分隔符长度的尾部，跨块的分隔符不会重复计数
+                        tail = data[-(len(self.BOUNDARY) - 1):]
+                        if self.stop_event.is_set():
+                            break
+            except requests.RequestException:
+                self.errors += 1
+                self.stop_event.wait(1.0)
+
+
+class SocketClient:
+    def __init__(self, base_url: str, track_devices: Optional[List[int]] = None):
+        """
+        模拟前端的Socket.IO连接：接收告警 (并确认)，按告警中的采集时间 ts 统计端到端延迟
+        :param track_devices: 订阅跟踪结果推送的设备ID，为None时不订阅
+        """
+        self.base_url = base_url
+        self.track_devices = track_devices
+        self.alerts = 0
+        self.track_updates = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=10000)  # 采集到收到告警的延迟（秒）
+        self.sio = socketio.Client(reconnection=True)
+        self.sio.on('intrusion_alert', self._on_alert)
+        self.sio.on('track_update', self._on_track_update)
+        self.sio.on('connect', self._on_connect)
+
+    def _on_alert(self, payload):
+        now = time.time()
+        events = payload.get('alerts', [payload]) if isinstance(payload, dict) else []
+        for event in events:
+            if event.get('ts') is not None:
+                self.latencies.append(now - float(event['ts']))
+        self.alerts += len(events)
+        return True  # 返回值作为确认回传给服务端
+
+    def _on_track_update(self, payload):
+        self.track_updates += 1
+
+    def _on_connect(self):
+        if self.track_devices:
+            self.sio.emit('subscribe_tracks', {'deviceIds': self.track_devices})
+
+    def connect(self):
+        try:
+            self.sio.connect(self.base_url, wait_timeout=10)
+        except Exception:
+            self.errors += 1
+
+    def disconnect(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+
+class ProcessSampler:
+    def __init__(self, pid: int):
+        """
+        采样服务进程 (含分片子进程) 的CPU占用、常驻内存和线程数
+        优先使用psutil，缺失时读取 /proc (仅Linux)，两者都不可用时只返回时间戳
+        """
+        self.pid = pid
+        self._last = None  # (采样时间, 累计CPU时间)
+        self._ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def _tree(self) -> List[int]:
+        if psutil is not None:
+            try:
+                process = psutil.Process(self.pid)
+                return [self.pid] + [child.pid for child in process.children(recursive=True)]
+            except psutil.Error:
+                return []
+        parents = {}
+        for name in os.listdir('/proc'):
+            if name.isdigit():
+                stat = self._read_stat(int(name))
+                if stat is not None:
+                    parents.setdefault(int(stat[1]), []).append(int(name))
+        pids, pending = [], [self.pid]
+        while pending:
+            pid = pending.pop()
+            pids.append(pid)
+            pending.extend(parents.get(pid, []))
+        return pids
+
+    @staticmethod
+    def _read_stat(pid: int) -> Optional[List[str]]:
+        """/proc/<pid>/stat 中进程名之后的字段 (state, ppid, ...)"""
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                data = f.read()
+        except OSError:
+            return None
+        return data[data.rfind(')') + 2:].split()
+
+    def _stats(self, pid: int) -> Optional[tuple]:
+        """单个进程的 (累计CPU秒数, 常驻内存字节数, 线程数)"""
+        if psutil is not None:
+            try:
+                process = psutil.Process(pid)
+                times = process.cpu_times()
+                return times.user + times.system, process.memory_info().rss, process.num_threads()
+            except psutil.Error:
+                return None
+        stat = self._read_stat(pid)
+        if stat is None:
+            return None
+        # 字段 utime、stime、num_threads、rss 在进程名之后的下标分别为 11、12、17、21
+        return ((int(stat[11]) + int(stat[12])) / self._ticks, int(stat[21]) * self._page_size, int(stat[17]))
+
+    def sample(self) -> Dict:
+        now = time.time()
+        if psutil is None and not os.path.isdir('/proc'):
+            return {'t': now}
+        stats = [s for s in (self._stats(pid) for pid in self._tree()) if s is not None]
+        cpu_seconds = sum(s[0] for s in stats)
+        result = {
+            't': now,
+            'rssMB': round(sum(s[1] for s in stats) / 1024 / 1024, 1),
+            'threads': sum(s[2] for s in stats),
+            'processes': len(stats),
+        }
+        if self._last is not None and now > self._last[0]:
+            result['cpuPercent'] = round(max(0.0, cpu_seconds - self._last[1]) / (now - self._last[0]) * 100, 1)
+        self._last = (now, cpu_seconds)
+        return result
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _latency_summary(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {'count': 0}
+    ms = np.array(latencies, dtype=np.float64) * 1000
+    return {
+        'count': len(latencies),
+        'meanMs': round(float(ms.mean()), 1),
+        'p50Ms': round(float(np.percentile(ms, 50)), 1),
+        'p95Ms': round(float(np.percentile(ms, 95)), 1),
+        'p99Ms': round(float(np.percentile(ms, 99)), 1),
+        'maxMs': round(float(ms.max()), 1),
+    }
+
+
+def _normalize_thread_name(name: str) -> str:
+    """去掉线程名中的编号 (Thread-12 (run) -> Thread (run))，同类线程合并计数"""
+    return re.sub(r'-\d+', '', name)
+
+
+def growth_per_hour(samples: List[Dict], key: str = 'rssMB') -> Optional[float]:
+    """对采样值做最小二乘线性拟合，返回每小时增长量"""
+    points = [(sample['t'], sample[key]) for sample in samples if key in sample]
+    if len(points) < 3:
+        return None
+    t, values = np.array(points, dtype=np.float64).T
+    if t[-1] - t[0] <= 0:
+        return None
+    slope = np.polyfit((t - t[0]) / 3600.0, values, 1)[0]
+    return round(float(slope), 2)
+
+
+class ServerClient:
+    def __init__(self, base_url: str):
+        """访问被测服务的HTTP接口"""
+        self.base_url = base_url
+
+    def get(self, path: str, timeout: float = 10):
+        response = requests.get(self.base_url + path, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def wait_ready(self, timeout: float, process: subprocess.Popen) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if process.poll() is not None:
+                return False
+            try:
+                if requests.get(self.base_url + '/health', timeout=2).status_code == 200:
+                    return True
+            except requests.RequestException:
+                pass
+            time.sleep(1.0)
+        return False
+
+    def refresh_devices(self) -> Dict:
+        return requests.post(self.base_url + '/api/devices/refresh', timeout=30).json()
+
+    def threads(self) -> List[str]:
+        return self.get('/soak/threads')['data']['threads']
+
+    def counters(self) -> Dict:
+        """服务端指标中与吞吐量相关的累计值 (多进程模式下为各进程之和)"""
+        summary = self.get('/api/metrics')['data']
+
+        def total(name: str, **labels) -> float:
+            series = summary.get(name, {}).get('series', [])
+            return sum(item.get('value', 0) for item in series
+                       if all(item['labels'].get(key) == value for key, value in labels.items()))
+
+        return {
+            'captured': total('yolo_capture_frames_total', result='captured'),
+            'detected': total('yolo_frames_total', result='detected'),
+            'alerts': total('yolo_alerts_total'),
+            'summary': summary,
+        }
+
+
+def _stage_summary(summary: Dict) -> Dict:
+    """各阶段在所有摄像头中最差的P95/P99 (毫秒)，以及告警送达各渠道的延迟"""
+    stages = {}
+    for item in summary.get('yolo_stage_seconds', {}).get('series', []):
+        if not item.get('count'):
+            continue
+        stage = stages.setdefault(item['labels']['stage'], {'count': 0, 'worstP95Ms': 0.0, 'worstP99Ms': 0.0})
+        stage['count'] += item['count']
+        stage['worstP95Ms'] = max(stage['worstP95Ms'], item.get('p95Ms') or 0.0)
+        stage['worstP99Ms'] = max(stage['worstP99Ms'], item.get('p99Ms') or 0.0)
+    delivery = {}
+    for item in summary.get('yolo_alert_delivery_seconds', {}).get('series', []):
+        if item.get('count'):
+            delivery[item['labels']['channel']] = {key: item.get(key) for key in ('count', 'p50Ms', 'p95Ms', 'p99Ms')}
+    return {'stages': stages, 'alertDelivery': delivery}
+
+
+def serve(args):
+    """被测服务进程：把RuoYi地址指向本地模拟后端，事件文件写到工作目录，启动 app_vue"""
+    import app_vue  # 只在服务进程中加载模型和Web服务
+
+    app_vue.RUOYI_BASE_URL = args.ruoyi
+    app_vue.RUOYI_DEVICE_LIST_URL = f"{args.ruoyi}/api/yolo/device/list"
+    app_vue.RUOYI_AUTH_URL = f"{args.ruoyi}/api/auth/token"
+    app_vue.RUOYI_ALERT_REPORT_URL = f"{args.ruoyi}/api/yolo/alert/report"
+    app_vue.RUOYI_ALERT_BATCH_URL = None
+    app_vue.USE_HTTPS = False
+    app_vue.EVENT_LOG_PATH = os.path.join(args.workdir, 'intrusion_events.csv')
+    app_vue.EVENT_DB_PATH = os.path.join(args.workdir, 'intrusion_events.db')
+    app_vue.ALERT_OUTBOX_JOURNAL = os.path.join(args.workdir, 'alert_outbox.jsonl')
+    app_vue.SHARD_PROCESSES = args.shards
+
+    @app_vue.app.route('/soak/threads')
+    def get_soak_threads():
+        """服务进程当前的线程名 (检查线程泄漏)"""
+        names = sorted(thread.name for thread in threading.enumerate())
+        return {'code': 200, 'data': {'count': len(names), 'threads': names}, 'message': 'success'}
+
+    app_vue.start_detection_service()
+    app_vue.socketio.run(app_vue.app, host='127.0.0.1', port=args.port, debug=False, use_reloader=False,
+                         allow_unsafe_werkzeug=True)
+
+
+def run(sources: List[str], cameras: int = 4, mjpeg_clients: int = 4, socket_clients: int = 2,
+        duration: float = 600.0, tiers: List[str] = ('full',), overlay: str = 'server', track_updates: bool = False,
+        shards: int = 0, port: int = 0, warmup: float = 60.0, settle: float = 30.0, sample_interval: float = 5.0,
+        startup_timeout: float = 300.0, max_growth: float = 50.0, workdir: Optional[str] = None) -> Dict:
+    """
+    启动被测服务和模拟负载，运行 duration 秒后撤除负载，统计吞吐量、告警延迟、CPU、内存增长和线程泄漏
+    :param sources: 模拟摄像头的画面来源 (本地视频文件或本地RTSP服务地址)，按摄像头轮流分配
+    :param cameras: 模拟摄像头数
+    :param mjpeg_clients: MJPEG观看者数 (按摄像头和档位轮流分配)
+    :param socket_clients: Socket.IO客户端数
+    :param track_updates: Socket.IO客户端是否订阅所有摄像头的跟踪结果推送
+    :param shards: 分片进程数 (SHARD_PROCESSES)，0为线程模式
+    :param warmup: 计算内存增长斜率时跳过的启动时间（秒）
+    :param settle: 基线采样前和撤除负载后等待的时间（秒），需大于Socket.IO心跳间隔 (25秒)，断开连接的心跳线程才会退出
+    :param max_growth: 允许的常驻内存增长 (MB/小时)，超出视为不通过
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='soak_')
+    os.makedirs(workdir, exist_ok=True)
+    port = port or _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    standin = RuoYiStandIn()
+    standin.start()
+    log_file = open(os.path.join(workdir, 'server.log'), 'w', encoding='utf-8')
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port), '--ruoyi', standin.url,
+         '--shards', str(shards), '--workdir', workdir],
+        stdout=log_file, stderr=subprocess.STDOUT
+    )
+    server = ServerClient(base_url)
+    sampler = ProcessSampler(process.pid)
+    stop_clients = threading.Event()
+    mjpeg: List[MjpegClient] = []
+    sockets: List[SocketClient] = []
+    try:
+        if not server.wait_ready(startup_timeout, process):
+            raise RuntimeError(f"被测服务未能启动，请查看日志: {log_file.name}")
+
+        # 基线：服务已启动但没有摄像头和客户端；先连接断开一次，使Socket.IO的常驻后台线程在基线前启动
+        probe = SocketClient(base_url)
+        probe.connect()
+        probe.disconnect()
+        time.sleep(settle)
+        sampler.sample()
+        baseline = sampler.sample()
+        baseline_threads = server.threads()
+
+        device_ids = [SYNTHETIC_DEVICE_BASE + i for i in range(cameras)]
+        standin.set_devices([{
+            'deviceId': device_id,
+            'deviceName': f'模拟摄像头{i + 1}',
+            'facilityId': 1,
+            'facilityName': '压力测试',
+            'rtspUrl': sources[i % len(sources)],
+        } for i, device_id in enumerate(device_ids)])
+        server.refresh_devices()
+        counters_start = server.counters()
+        started = time.time()
+
+        for i in range(mjpeg_clients):
+            client = MjpegClient(base_url, device_ids[i % cameras], tiers[(i // cameras) % len(tiers)], overlay,
+                                 stop_clients)
+            client.start()
+            mjpeg.append(client)
+        for _ in range(socket_clients):
+            client = SocketClient(base_url, device_ids if track_updates else None)
+            client.connect()
+            sockets.append(client)
+
+        samples = []
+        while time.time() - started < duration:
+            if process.poll() is not None:
+                raise RuntimeError(f"被测服务在压测中退出 (返回码 {process.returncode})，请查看日志: {log_file.name}")
+            samples.append(dict(sampler.sample(), elapsed=round(time.time() - started, 1)))
+            time.sleep(min(sample_interval, max(0.0, duration - (time.time() - started))))
+        elapsed = time.time() - started
+        counters_end = server.counters()
+        peak_threads = server.threads()
+
+        # 撤除负载：断开客户端并删除所有模拟摄像头，等待资源释放
+        stop_clients.set()
+        for client in sockets:
+            client.disconnect()
+        for client in mjpeg:
+            client.join(15)
+        standin.set_devices([])
+        server.refresh_devices()
+        time.sleep(settle)
+        after = sampler.sample()
+        after_threads = server.threads()
+    finally:
+        stop_clients.set()
+        for client in sockets:
+            client.disconnect()
+        process.terminate()
+        try:
+            process.wait(15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        log_file.close()
+        standin.stop()
+
+    steady = [sample for sample in samples if sample['elapsed'] >= warmup]
+    growth = growth_per_hour(steady)
+    leaked = Counter(map(_normalize_thread_name, after_threads)) - Counter(map(_normalize_thread_name, baseline_threads))
+    cpu = [sample['cpuPercent'] for sample in samples if 'cpuPercent' in sample]
+    rss = [sample['rssMB'] for sample in samples if 'rssMB' in sample]
+    latencies = [latency for client in sockets for latency in client.latencies]
+    mjpeg_frames = sum(client.frames for client in mjpeg)
+    memory_ok = growth is None or growth <= max_growth
+    report = {
+        'config': {
+            'sources': sources, 'cameras': cameras, 'mjpegClients': mjpeg_clients, 'socketClients': socket_clients,
+            'tiers': list(tiers), 'overlay': overlay, 'trackUpdates': track_updates, 'shards': shards,
+            'duration': duration, 'workdir': workdir,
+        },
+        'elapsedSeconds': round(elapsed, 1),
+        'throughput': {
+            'captureFps': round((counters_end['captured'] - counters_start['captured']) / elapsed, 1),
+            'detectFps': round((counters_end['detected'] - counters_start['detected']) / elapsed, 1),
+            'detectFpsPerCamera': round((counters_end['detected'] - counters_start['detected']) / elapsed / cameras, 2)
+            if cameras else 0,
+            'mjpegFps': round(mjpeg_frames / elapsed, 1),
+            'mjpegFpsPerClient': round(mjpeg_frames / elapsed / len(mjpeg), 2) if mjpeg else 0,
+            'mjpegMBps': round(sum(client.bytes for client in mjpeg) / elapsed / 1e6, 2),
+            'trackUpdatesPerSecond': round(sum(client.track_updates for client in sockets) / elapsed, 1),
+        },
+        'alerts': {
+            'detected': int(counters_end['alerts'] - counters_start['alerts']),
+            'ruoyiReports': standin.reports,
+            'socketReceived': sum(client.alerts for client in sockets),
+            'endToEnd': _latency_summary(latencies),
+        },
+        'server': _stage_summary(counters_end['summary']),
+        'cpu': {
+            'meanPercent': round(float(np.mean(cpu)), 1) if cpu else None,
+            'maxPercent': round(float(np.max(cpu)), 1) if cpu else None,
+        },
+        'memory': {
+            'baselineMB': baseline.get('rssMB'),
+            'peakMB': max(rss) if rss else None,
+            'endMB': rss[-1] if rss else None,
+            'afterTeardownMB': after.get('rssMB'),
+            'growthMBPerHour': growth,
+            'maxGrowthMBPerHour': max_growth,
+            'passed': memory_ok,
+        },
+        'threads': {
+            'baseline': len(baseline_threads),
+            'peak': len(peak_threads),
+            'afterTeardown': len(after_threads),
+            'osThreadsBaseline': baseline.get('threads'),
+            'osThreadsAfterTeardown': after.get('threads'),
+            'leaked': dict(leaked),
+            'passed': not leaked,
+        },
+        'clientErrors': sum(client.errors for client in mjpeg) + sum(client.errors for client in sockets),
+        'samples': samples,
+    }
+    report['passed'] = memory_ok and not leaked
+    return report
+
+
+def print_report(report: Dict):
+    config = report['config']
+    print(f"摄像头: {config['cameras']}  MJPEG客户端: {config['mjpegClients']}  Socket.IO客户端: {config['socketClients']}  "
+          f"分片进程: {config['shards']}  时长: {report['elapsedSeconds']}s")
+    throughput = report['throughput']
+    print(f"采集FPS: {throughput['captureFps']}  检测FPS: {throughput['detectFps']} "
+          f"(每路 {throughput['detectFpsPerCamera']})  MJPEG: {throughput['mjpegFps']} 帧/秒 "
+          f"(每客户端 {throughput['mjpegFpsPerClient']}, {throughput['mjpegMBps']} MB/s)  "
+          f"跟踪推送: {throughput['trackUpdatesPerSecond']}/s")
+    alerts = report['alerts']
+    e2e = alerts['endToEnd']
+    print(f"告警: 检测 {alerts['detected']}  上报RuoYi {alerts['ruoyiReports']}  客户端收到 {alerts['socketReceived']}")
+    if e2e['count']:
+        print(f"端到端告警延迟: 平均 {e2e['meanMs']}ms  P50 {e2e['p50Ms']}ms  P95 {e2e['p95Ms']}ms  "
+              f"P99 {e2e['p99Ms']}ms  最大 {e2e['maxMs']}ms")
+    for stage, stats in report['server']['stages'].items():
+        print(f"  {stage:<16}次数 {stats['count']:>8}  最差P95 {stats['worstP95Ms']:>8.2f}ms  "
+              f"最差P99 {stats['worstP99Ms']:>8.2f}ms")
+    cpu, memory, threads = report['cpu'], report['memory'], report['threads']
+    print(f"CPU: 平均 {cpu['meanPercent']}%  最高 {cpu['maxPercent']}%")
+    print(f"内存: 基线 {memory['baselineMB']}MB  峰值 {memory['peakMB']}MB  结束 {memory['endMB']}MB  "
+          f"撤除负载后 {memory['afterTeardownMB']}MB  增长 {memory['growthMBPerHour']} MB/小时 "
+          f"(上限 {memory['maxGrowthMBPerHour']}) {'通过' if memory['passed'] else '不通过'}")
+    print(f"线程: 基线 {threads['baseline']}  峰值 {threads['peak']}  撤除负载后 {threads['afterTeardown']}  "
+          f"{'无泄漏' if threads['passed'] else '泄漏: ' + json.dumps(threads['leaked'], ensure_ascii=False)}")
+    if report['clientErrors']:
+        print(f"客户端错误: {report['clientErrors']}")
+    print(f"结果: {'通过' if report['passed'] else '不通过'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多摄像头压力/长稳测试：模拟摄像头与MJPEG、Socket.IO客户端，检查吞吐量、延迟、内存增长和线程泄漏')
+    parser.add_argument('sources', nargs='*', help='模拟摄像头的画面来源：本地视频文件或本地RTSP服务地址')
+    parser.add_argument('--cameras', type=int, default=4, help='模拟摄像头数')
+    parser.add_argument('--mjpeg-clients', type=int, default=4, help='MJPEG观看者数')
+    parser.add_argument('--socket-clients', type=int, default=2, help='Socket.IO客户端数')
+    parser.add_argument('--tiers', default='full', help='MJPEG客户端使用的视频流档位，逗号分隔')
+    parser.add_argument('--overlay', default='server', choices=['server', 'client'], help='MJPEG标注方式')
+    parser.add_argument('--track-updates', action='store_true', help='Socket.IO客户端订阅所有摄像头的跟踪结果推送')
+    parser.add_argument('--shards', type=int, default=0, help='分片进程数，0为线程模式')
+    parser.add_argument('--duration', type=float, default=600.0, help='压测时长（秒）')
+    parser.add_argument('--warmup', type=float, default=60.0, help='计算内存增长时跳过的启动时间（秒）')
+    parser.add_argument('--settle', type=float, default=30.0, help='基线采样前和撤除负载后的等待时间（秒）')
+    parser.add_argument('--sample-interval', type=float, default=5.0, help='CPU/内存采样间隔（秒）')
+    parser.add_argument('--startup-timeout', type=float, default=300.0, help='等待服务启动 (加载模型) 的最长时间（秒）')
+    parser.add_argument('--max-growth', type=float, default=50.0, help='允许的常驻内存增长 (MB/小时)')
+    parser.add_argument('--port', type=int, default=0, help='被测服务端口，0为自动选择')
+    parser.add_argument('--workdir', help='事件文件和服务日志的目录，默认为临时目录')
+    parser.add_argument('--output', help='结果保存为JSON文件')
+    # 以下参数由压测进程启动被测服务时使用
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--ruoyi', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+    if not args.sources:
+        parser.error("需要至少一个画面来源")
+    report = run(
+        args.sources, cameras=args.cameras, mjpeg_clients=args.mjpeg_clients, socket_clients=args.socket_clients,
+        duration=args.duration, tiers=[tier for tier in args.tiers.split(',') if tier], overlay=args.overlay,
+        track_updates=args.track_updates, shards=args.shards, port=args.port, warmup=args.warmup,
+        settle=args.settle, sample_interval=args.sample_interval, startup_timeout=args.startup_timeout,
+        max_growth=args.max_growth, workdir=args.workdir
+    )
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+# python/stream_broadcaster.py
+
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple, Union
+
+import cv2
+import numpy as np
+
+import metrics
+
+
+# 默认的视频流档位：full 用于单画面全屏，medium 用于少量画面网格，thumb 用于多画面缩略图墙
+DEFAULT_STREAM_TIERS = {
+    'full': {'max_width': None, 'max_fps': 15, 'jpeg_quality': 80},
+    'medium': {'max_width': 640, 'max_fps': 10, 'jpeg_quality': 70},
+    'thumb': {'max_width': 320, 'max_fps': 5, 'jpeg_quality': 60},
+}
+
+
+class RenderedFrame:
+    """一帧原始画面及其延迟绘制的标注版本：只有订阅了标注视频流的客户端取帧时才绘制，且每帧只绘制一次"""
+    __slots__ = ('raw', '_render', '_annotated', '_lock')
+
+    def __init__(self, raw: np.ndarray, render: Optional[Callable[[np.ndarray], np.ndarray]] = None):
+        self.raw = raw
+        self._render = render
+        self._annotated: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def get(self, annotated: bool = True) -> np.ndarray:
+        """
+        :param annotated: 是否需要标注版本 (在原始画面的副本上绘制)
+        """
+        if not annotated or self._render is None:
+            return self.raw
+        with self._lock:
+            if self._annotated is None:
+                self._annotated = self._render(self.raw.copy())
+            return self._annotated
+
+
+class MjpegBroadcaster:
+    def __init__(self, camera_id: str, jpeg_quality: int = 80, max_fps: float = 15.0,
+                 max_width: Optional[int] = None, tier: str = 'full', overlay: bool = True):
+        """
+        单个摄像头单个档位的MJPEG广播器
+        每个新的处理后帧最多只缩放并编码一次，编码结果由所有订阅该档位 /video_feed 的客户端共享
+        :param camera_id: 摄像头ID
+        :param jpeg_quality: JPEG编码质量 (1-100)
+        :param max_fps: 最大输出帧率，超出部分的帧不再编码
+        :param max_width: 输出画面最大宽度，超过时等比缩小；None表示保持原始分辨率
+        :param tier: 档位名称
+        :param overlay: 是否输出服务端绘制的标注画面；False时输出原始画面，由浏览器根据跟踪结果叠加绘制
+        """
+        self.camera_id = camera_id
+        self.tier = tier
+        self.overlay = overlay
+        self.max_width = max_width
+        self.jpeg_quality = int(jpeg_quality)
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+
+        self._cond = threading.Condition()
+        self._frame: Optional[RenderedFrame] = None
+        self._seq = 0
+        self._closed = False
+
+        # 编码缓存：同一序号的帧只编码一次
+        self._encode_lock = threading.Lock()
+        self._chunk: Optional[bytes] = None
+        self._chunk_seq = 0
+        self._last_encode = 0.0
+
+        # 统计信息
+        self._encode_seconds = metrics.STAGE_SECONDS.labels(camera_id, 'encoding')
+        self.published_frames = 0
+        self.encoded_frames = 0
+        self.sent_frames = 0
+        self.subscribers = 0
+
+    def publish(self, frame: Union[np.ndarray, RenderedFrame]):
+        """发布一帧新画面 (不在此处绘制和编码，只有存在订阅者时才会绘制、编码)"""
+        if not isinstance(frame, RenderedFrame):
+            frame = RenderedFrame(frame)
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self.published_frames += 1
+            self._cond.notify_all()
+
+    def publish_encoded(self, chunk: bytes):
+        """发布已编码好的multipart数据块 (分片进程回传的画面，Web进程不再解码和编码)"""
+        with self._encode_lock:
+            with self._cond:
+                self._frame = None
+                self._seq += 1
+                self._chunk = chunk
+                self._chunk_seq = self._seq
+                self.published_frames += 1
+                self._cond.notify_all()
+
+    def close(self):
+        """关闭广播器，结束所有订阅者的输出"""
+        with self._cond:
+            self._closed = True
+            self._frame = None
+            self._cond.notify_all()
+
+    def _get_chunk(self) -> Tuple[int, Optional[bytes]]:
+        """获取最新帧的multipart数据块，必要时编码 (受最大帧率限制)"""
+        with self._encode_lock:
+            with self._cond:
+                frame, seq = self._frame, self._seq
+            if frame is not None and seq != self._chunk_seq:
+                now = time.time()
+                if self._chunk is None or now - self._last_encode >= self.min_interval:
+                    frame = frame.get(self.overlay)
+                    started = time.perf_counter()
+                    height, width = frame.shape[:2]
+                    if self.max_width and width > self.max_width:
+                        scale = self.max_width / width
+                        frame = cv2.resize(frame, (self.max_width, max(1, int(height * scale))),
+                                           interpolation=cv2.INTER_AREA)
+                    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                    self._encode_seconds.observe(time.perf_counter() - started)
+                    if ret:
+                        self._chunk = (b'--frame\r\n'
+                                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                        self._chunk_seq = seq
+                        self._last_encode = now
+                        self.encoded_frames += 1
+            return self._chunk_seq, self._chunk
+
+    def subscribe(self) -> Iterator[bytes]:
+        """
+        订阅该摄像头的视频流
+        :return: multipart/x-mixed-replace 数据块生成器，只输出新帧
+        """
+        with self._cond:
+            self.subscribers += 1
+        last_seq = 0
+        last_sent = 0.0
+        try:
+            while True:
+                with self._cond:
+                    if self._seq <= last_seq and not self._closed:
+                        self._cond.wait(1.0)
+                    if self._closed:
+                        return
+                    if self._seq <= last_seq:
+                        continue
+
+                # 限制输出帧率
+                delay = last_sent + self.min_interval - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+
+                seq, chunk = self._get_chunk()
+                if chunk is None or seq == last_seq:
+                    time.sleep(0.01)
+                    continue
+                last_seq = seq
+                last_sent = time.time()
+                self.sent_frames += 1
+                yield chunk
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def get_stats(self) -> Dict:
+        """获取广播统计：发布/编码/发送帧数与当前订阅者数"""
+        with self._cond:
+            return {
+                'tier': self.tier,
+                'overlay': 'server' if self.overlay else 'client',
+                'maxWidth': self.max_width,
+                'subscribers': self.subscribers,
+                'publishedFrames': self.published_frames,
+                'encodedFrames': self.encoded_frames,
+                'sentFrames': self.sent_frames,
+                'jpegQuality': self.jpeg_quality,
+                'maxFps': round(1.0 / self.min_interval, 2) if self.min_interval else 0,
+            }
+
+
+class StreamHub:
+    def __init__(self, tiers: Optional[Dict[str, Dict]] = None):
+        """
+        管理所有摄像头各档位的MJPEG广播器
+        :param tiers: 档位配置 {档位名: {'max_width', 'max_fps', 'jpeg_quality'}}，默认 DEFAULT_STREAM_TIERS
+        """
+        self.tiers = tiers or DEFAULT_STREAM_TIERS
+        self._broadcasters: Dict[str, Dict[str, MjpegBroadcaster]] = {}
+        self._lock = threading.Lock()
+
+    def _create_broadcaster(self, camera_id: str, tier: str, overlay: bool = True) -> MjpegBroadcaster:
+        config = self.tiers[tier]
+        return MjpegBroadcaster(
+            camera_id,
+            jpeg_quality=config.get('jpeg_quality', 80),
+            max_fps=config.get('max_fps', 15),
+            max_width=config.get('max_width'),
+            tier=tier,
+            overlay=overlay
+        )
+
+    def _create_tiers(self, camera_id: str) -> Dict[str, MjpegBroadcaster]:
+        return {tier: self._create_broadcaster(camera_id, tier) for tier in self.tiers}
+
+    def _get_camera(self, camera_id) -> Dict[str, MjpegBroadcaster]:
+        key = str(camera_id)
+        with self._lock:
+            broadcasters = self._broadcasters.get(key)
+            if broadcasters is None:
+                broadcasters = self._create_tiers(key)
+                self._broadcasters[key] = broadcasters
+            return broadcasters
+
+    def get(self, camera_id, tier: str = 'full', overlay: bool = True) -> MjpegBroadcaster:
+        """
+        获取摄像头指定档位的广播器，不存在时自动创建
+        :param overlay: False时获取输出原始画面的广播器 (浏览器端叠加跟踪结果)
+        :raises KeyError: 档位未配置
+        """
+        if tier not in self.tiers:
+            raise KeyError(tier)
+        broadcasters = self._get_camera(camera_id)
+        key = tier if overlay else f'{tier}:raw'
+        with self._lock:
+            broadcaster = broadcasters.get(key)
+            if broadcaster is None:
+                broadcaster = self._create_broadcaster(str(camera_id), tier, overlay)
+                broadcasters[key] = broadcaster
+            return broadcaster
+
+    def publish(self, camera_id, frame: np.ndarray, render: Optional[Callable[[np.ndarray], np.ndarray]] = None):
+        """
+        发布摄像头的新画面到所有档位 (各档位仅在有订阅者时才绘制、缩放和编码)
+        :param frame: 原始画面
+        :param render: 标注绘制函数，在画面副本上绘制并返回；同一帧被多个档位使用时只绘制一次
+        """
+        rendered = RenderedFrame(frame, render)
+        broadcasters = self._get_camera(camera_id)
+        with self._lock:
+            broadcasters = list(broadcasters.values())
+        for broadcaster in broadcasters:
+            broadcaster.publish(rendered)
+
+    def publish_encoded(self, camera_id, tier: str, chunk: bytes, overlay: bool = True):
+        """发布摄像头指定档位已编码好的数据块"""
+        self.get(camera_id, tier, overlay=overlay).publish_encoded(chunk)
+
+    def active_streams(self) -> Set[Tuple[str, str, bool]]:
+        """当前有人观看的视频流 {(摄像头ID, 档位, 是否服务端标注)}"""
+        with self._lock:
+            cameras = {camera_id: list(broadcasters.values()) for camera_id, broadcasters in self._broadcasters.items()}
+        return {
+            (camera_id, broadcaster.tier, broadcaster.overlay)
+            for camera_id, broadcasters in cameras.items()
+            for broadcaster in broadcasters if broadcaster.subscribers > 0
+        }
+
+    def has_subscribers(self, camera_id) -> bool:
+        """摄像头是否有正在观看的视频流客户端"""
+        with self._lock:
+            broadcasters = list(self._broadcasters.get(str(camera_id), {}).values())
+        return any(broadcaster.subscribers > 0 for broadcaster in broadcasters)
+
+    def remove(self, camera_id):
+        """移除摄像头的所有广播器并结束其订阅者"""
+        with self._lock:
+            broadcasters = self._broadcasters.pop(str(camera_id), None)
+        for broadcaster in (broadcasters or {}).values():
+            broadcaster.close()
+
+    def get_stats(self) -> Dict:
+        """获取所有广播器的统计信息 {摄像头ID: {档位: 统计}}"""
+        with self._lock:
+            cameras = {camera_id: dict(broadcasters) for camera_id, broadcasters in self._broadcasters.items()}
+        return {
+            camera_id: {tier: broadcaster.get_stats() for tier, broadcaster in broadcasters.items()}
+            for camera_id, broadcasters in cameras.items()
+        }
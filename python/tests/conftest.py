@@ -0,0 +1,7 @@
+# python/tests/conftest.py
+
+import os
+import sys
+
+# 各模块按 python/ 目录下的顶层模块互相导入 (与 app_vue.py 的运行方式一致)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,168 @@
+# python/tests/test_alert_outbox.py
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import alert_outbox
+from alert_outbox import AlertOutbox
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.received.append((self.path, json.loads(body), time.monotonic()))
+            ok = server.failures <= 0
+            server.failures -= 1
+        payload = json.dumps({'code': 200 if ok else 500}).encode()
+        self.send_response(200 if ok else 503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubRuoYi:
+    """本地的RuoYi告警上报接口：记录收到的请求，前 failures 次请求返回失败"""
+
+    def __init__(self, failures: int = 0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.received = []
+        self.server.failures = failures
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    @property
+    def received(self):
+        with self.server.lock:
+            return list(self.server.received)
+
+    def set_failures(self, failures: int):
+        with self.server.lock:
+            self.server.failures = failures
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubRuoYi()
+    yield server
+    server.close()
+
+
+def _make_outbox(stub, tmp_path, **kwargs):
+    options = dict(batch_url=stub.base_url + '/batch', batch_wait=0.2, backoff_base=0.05, backoff_max=0.5,
+                   journal_path=str(tmp_path / 'outbox.jsonl'), timeout=2.0)
+    options.update(kwargs)
+    return AlertOutbox(stub.base_url + '/report', lambda: 'token', **options)
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def _read_journal(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_alerts_submitted_together_are_sent_as_one_batch(stub, tmp_path):
+    outbox = _make_outbox(stub, tmp_path, batch_size=10)
+    outbox.start()
+    try:
+        for i in range(5):
+            assert outbox.submit({'id': i})
+        assert _wait_for(lambda: outbox.get_stats()['delivered'] == 5)
+    finally:
+        outbox.stop()
+    assert [path for path, _, _ in stub.received] == ['/batch']
+    assert stub.received[0][1] == [{'id': i} for i in range(5)]
+
+
+def test_failed_delivery_is_retried_with_exponential_backoff(stub, tmp_path, monkeypatch):
+    # 去掉随机抖动，第n次重试前等待 backoff_base * 2^n
+    monkeypatch.setattr(alert_outbox.random, 'random', lambda: 1.0)
+    stub.set_failures(2)
+    outbox = _make_outbox(stub, tmp_path, max_retries=3, backoff_base=0.1)
+    outbox.start()
+    try:
+        outbox.submit({'id': 1})
+        assert _wait_for(lambda: outbox.get_stats()['delivered'] == 1)
+    finally:
+        outbox.stop()
+
+    attempts = [received_at for _, _, received_at in stub.received]
+    assert len(attempts) == 3
+    assert attempts[1] - attempts[0] >= 0.1
+    assert attempts[2] - attempts[1] >= 0.2
+    stats = outbox.get_stats()
+    assert stats['retries'] == 2
+    assert stats['spilled'] == 0
+
+
+def test_alerts_spill_to_journal_when_ruoyi_is_down(stub, tmp_path):
+    stub.set_failures(1000)
+    outbox = _make_outbox(stub, tmp_path, max_retries=1, batch_size=1, backoff_max=5.0)
+    outbox.start()
+    try:
+        outbox.submit({'id': 1})
+        assert _wait_for(lambda: outbox.get_stats()['spilled'] == 1)
+        # 判定不可达后新的告警直接写入日志，不再请求RuoYi
+        requests_before = len(stub.received)
+        outbox.submit({'id': 2})
+        assert _wait_for(lambda: outbox.get_stats()['spilled'] == 2)
+        assert len(stub.received) == requests_before
+    finally:
+        outbox.stop()
+    assert outbox.get_stats()['delivered'] == 0
+    assert _read_journal(outbox.journal_path) == [{'id': 1}, {'id': 2}]
+
+
+def test_journal_is_replayed_on_restart(stub, tmp_path):
+    journal = tmp_path / 'outbox.jsonl'
+    with open(journal, 'w', encoding='utf-8') as f:
+        for i in range(3):
+            f.write(json.dumps({'id': i}) + '\n')
+
+    outbox = _make_outbox(stub, tmp_path, batch_size=10)
+    outbox.start()
+    try:
+        assert _wait_for(lambda: outbox.get_stats()['replayed'] == 3)
+    finally:
+        outbox.stop()
+    assert [payload for _, payload, _ in stub.received] == [[{'id': 0}, {'id': 1}, {'id': 2}]]
+    assert not os.path.exists(journal)
+    assert not os.path.exists(str(journal) + '.replay')
+
+
+def test_submit_never_blocks_when_queue_is_full(stub, tmp_path):
+    # 不启动后台线程，队列满后的告警直接写入本地日志
+    outbox = _make_outbox(stub, tmp_path, max_queue=2)
+    started = time.perf_counter()
+    accepted = [outbox.submit({'id': i}) for i in range(5)]
+    assert time.perf_counter() - started < 0.5
+    assert accepted == [True, True, False, False, False]
+    assert _read_journal(outbox.journal_path) == [{'id': 2}, {'id': 3}, {'id': 4}]
+    stats = outbox.get_stats()
+    assert stats['queued'] == 2
+    assert stats['spilled'] == 3
+    assert stub.received == []
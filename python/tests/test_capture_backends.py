@@ -0,0 +1,91 @@
+# python/tests/test_capture_backends.py
+
+import numpy as np
+import pytest
+
+av = pytest.importorskip('av')
+
+from capture_backends import PyAvCapture, redact_url  # noqa: E402
+
+FRAMES = 40
+GOP = 10
+FPS = 25
+
+
+@pytest.fixture(scope='module')
+def video_file(tmp_path_factory):
+    """生成一段固定GOP、没有B帧的小视频 (每 GOP 帧一个关键帧)，代替RTSP码流"""
+    path = str(tmp_path_factory.mktemp('capture') / 'sample.mp4')
+    with av.open(path, 'w') as container:
+        stream = container.add_stream('mpeg4', rate=FPS)
+        stream.width, stream.height = 160, 120
+        stream.pix_fmt = 'yuv420p'
+        stream.codec_context.gop_size = GOP
+        stream.codec_context.max_b_frames = 0
+        stream.codec_context.options = {'sc_threshold': '1000000000'}  # 关闭场景切换插入的关键帧
+        for i in range(FRAMES):
+            image = np.zeros((120, 160, 3), dtype=np.uint8)
+            image[40:80, i * 3:i * 3 + 40] = 255
+            for packet in stream.encode(av.VideoFrame.from_ndarray(image, format='bgr24')):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    return path
+
+
+def _read_all(capture):
+    frames = []
+    while True:
+        success, frame = capture.read()
+        if not success:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def test_every_nth_frame_decodes_all_but_converts_only_output_frames(video_file):
+    capture = PyAvCapture(video_file, decode='nth', every_n=4)
+    assert capture.isOpened()
+    frames = _read_all(capture)
+
+    assert len(frames) == FRAMES // 4
+    assert frames[0].shape == (120, 160, 3)
+    stats = capture.stats.get_stats()
+    assert stats['decodedFrames'] == FRAMES
+    assert stats['outputFrames'] == FRAMES // 4
+    assert stats['skippedFrames'] == FRAMES - FRAMES // 4
+    assert stats['skippedPackets'] == 0
+    assert stats['decodeCpuSeconds'] > 0
+    # 解码耗时 (包括未输出帧的解码) 按输出帧数分摊
+    assert stats['cpuMsPerFrame'] == pytest.approx(capture.stats.cpu_seconds * 1000 / (FRAMES // 4), abs=0.01)
+
+
+def test_keyframes_mode_skips_non_keyframe_packets(video_file):
+    capture = PyAvCapture(video_file, decode='keyframes')
+    frames = _read_all(capture)
+
+    keyframes = FRAMES // GOP
+    assert len(frames) == keyframes
+    stats = capture.stats.get_stats()
+    assert stats['decodedFrames'] == keyframes
+    assert stats['outputFrames'] == keyframes
+    assert stats['skippedFrames'] == 0
+    assert stats['skippedPackets'] == FRAMES - keyframes
+    assert stats['decodeCpuSeconds'] > 0
+
+
+def test_keyframes_mode_uses_less_decode_cpu_than_decoding_every_frame(video_file):
+    every_frame = PyAvCapture(video_file, decode='all')
+    _read_all(every_frame)
+    keyframes = PyAvCapture(video_file, decode='keyframes')
+    _read_all(keyframes)
+    assert keyframes.stats.cpu_seconds < every_frame.stats.cpu_seconds
+
+
+def test_redact_url_strips_credentials():
+    url = 'rtsp://admin:p@ss@192.168.1.64:554/Streaming/Channels/101'
+    assert redact_url(url) == 'rtsp://192.168.1.64:554/Streaming/Channels/101'
+    assert redact_url(f"[Errno 5] I/O error: '{url}'") == \
+        "[Errno 5] I/O error: 'rtsp://192.168.1.64:554/Streaming/Channels/101'"
+    assert redact_url('rtsp://192.168.1.64/stream') == 'rtsp://192.168.1.64/stream'
@@ -0,0 +1,78 @@
+# python/tests/test_linear_assignment.py
+
+import itertools
+
+import numpy as np
+import pytest
+
+import intrusion_detector
+from intrusion_detector import linear_assignment
+
+# PersonTracker 中超出距离/IoU门限的配对使用的代价
+GATED = 1e6
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    """强制使用内置的最短增广路实现 (未安装scipy时的默认路径)"""
+    monkeypatch.setattr(intrusion_detector, '_scipy_linear_sum_assignment', None)
+    return linear_assignment
+
+
+def brute_force_cost(cost: np.ndarray) -> float:
+    """枚举所有分配方式得到的最小总代价"""
+    rows, cols = cost.shape
+    if rows <= cols:
+        return min(cost[range(rows), list(perm)].sum() for perm in itertools.permutations(range(cols), rows))
+    return min(cost[list(perm), range(cols)].sum() for perm in itertools.permutations(range(rows), cols))
+
+
+def random_cost(rng: np.random.Generator, rows: int, cols: int, gated_ratio: float = 0.0) -> np.ndarray:
+    cost = rng.uniform(0, 100, size=(rows, cols))
+    cost[rng.random((rows, cols)) < gated_ratio] = GATED
+    return cost
+
+
+def assert_valid_assignment(cost: np.ndarray, rows: np.ndarray, cols: np.ndarray):
+    assert len(rows) == len(cols) == min(cost.shape)
+    assert len(set(rows.tolist())) == len(rows)
+    assert len(set(cols.tolist())) == len(cols)
+    assert (np.diff(rows) > 0).all()
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (1, 5), (5, 1), (3, 3), (3, 6), (6, 3), (5, 7), (7, 5)])
+@pytest.mark.parametrize('gated_ratio', [0.0, 0.5, 0.9])
+def test_fallback_matches_brute_force_on_random_rectangular_matrices(fallback, shape, gated_ratio):
+    rng = np.random.default_rng(hash((shape, gated_ratio)) % 2 ** 32)
+    for _ in range(20):
+        cost = random_cost(rng, *shape, gated_ratio=gated_ratio)
+        rows, cols = fallback(cost)
+        assert_valid_assignment(cost, rows, cols)
+        assert cost[rows, cols].sum() == pytest.approx(brute_force_cost(cost))
+
+
+def test_fallback_matches_scipy_on_larger_matrices(fallback):
+    scipy_optimize = pytest.importorskip('scipy.optimize')
+    rng = np.random.default_rng(0)
+    for rows_count, cols_count in [(12, 30), (30, 12), (25, 25), (40, 60)]:
+        for gated_ratio in (0.0, 0.7):
+            cost = random_cost(rng, rows_count, cols_count, gated_ratio=gated_ratio)
+            rows, cols = fallback(cost)
+            assert_valid_assignment(cost, rows, cols)
+            expected_rows, expected_cols = scipy_optimize.linear_sum_assignment(cost)
+            assert cost[rows, cols].sum() == pytest.approx(cost[expected_rows, expected_cols].sum())
+
+
+def test_fallback_prefers_ungated_pairs(fallback):
+    # 只有对角线上的配对在门限内，最优解不能选择任何被门控的配对
+    cost = np.full((4, 6), GATED)
+    cost[range(4), [5, 0, 3, 1]] = [1.0, 2.0, 3.0, 4.0]
+    rows, cols = fallback(cost)
+    assert rows.tolist() == [0, 1, 2, 3]
+    assert cols.tolist() == [5, 0, 3, 1]
+
+
+def test_fallback_handles_empty_matrices(fallback):
+    for shape in [(0, 0), (0, 3), (3, 0)]:
+        rows, cols = fallback(np.zeros(shape))
+        assert len(rows) == len(cols) == 0
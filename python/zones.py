@@ -0,0 +1,141 @@
+# python/zones.py
+
+import json
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class Zone:
+    def __init__(self, name: str, polygon: List):
+        """
+        单个禁区
+        :param name: 禁区名称
+        :param polygon: 多边形顶点 [[x, y], ...]；坐标都不大于1时视为相对画面宽高的归一化坐标，否则为像素坐标
+        """
+        if len(polygon) < 3:
+            raise ValueError(f"禁区 {name} 至少需要3个顶点")
+        self.name = name
+        self.points = np.array(polygon, dtype=np.float64).reshape(-1, 2)
+        self.normalized = bool((self.points <= 1.0).all())
+
+    def to_pixels(self, width: int, height: int) -> np.ndarray:
+        """转换为该分辨率下的像素坐标 (int32，供OpenCV使用)"""
+        points = self.points * (width, height) if self.normalized else self.points
+        return np.round(points).astype(np.int32)
+
+
+class ZoneSet:
+    def __init__(self, zones: List[Zone], crop_margin: float = 0.1, max_crop_ratio: float = 0.8):
+        """
+        单个摄像头的禁区集合
+        只有脚底点 (检测框底边中点) 落在禁区内的人员才触发告警；推理时只送入覆盖所有禁区的外接矩形区域
+        :param zones: 禁区列表
+        :param crop_margin: 裁剪区域在禁区外接矩形基础上向外扩展的比例 (保证禁区边缘的人完整可见)
+        :param max_crop_ratio: 裁剪区域面积超过画面该比例时不裁剪，直接使用整帧
+        """
+        self.zones = zones
+        self.crop_margin = crop_margin
+        self.max_crop_ratio = max_crop_ratio
+        # 按画面尺寸缓存的 (像素多边形, 裁剪区域)；检测用子码流、显示用主码流时会同时存在两种尺寸
+        self._cache: Dict[Tuple[int, int], Tuple[List[np.ndarray], Optional[Tuple[int, int, int, int]]]] = {}
+        self._crop_rect: Optional[Tuple[int, int, int, int]] = None
+
+    @classmethod
+    def from_config(cls, config) -> Optional['ZoneSet']:
+        """
+        从配置创建禁区集合
+        :param config: 禁区列表 [{'name', 'polygon'}]，或其JSON字符串 (RuoYi设备数据中的zones字段)；
+                       也可以是 {'zones': [...], 'crop_margin', 'max_crop_ratio'}
+        :return: 没有配置禁区时返回None (整帧告警，与原有行为一致)
+        """
+        if not config:
+            return None
+        if isinstance(config, str):
+            config = json.loads(config)
+        options = {}
+        if isinstance(config, dict):
+            options = {key: config[key] for key in ('crop_margin', 'max_crop_ratio') if key in config}
+            config = config.get('zones', [])
+        zones = [Zone(item.get('name', f'禁区{i + 1}'), item['polygon']) for i, item in enumerate(config)]
+        return cls(zones, **options) if zones else None
+
+    def _resolve(self, shape) -> Tuple[List[np.ndarray], Optional[Tuple[int, int, int, int]]]:
+        """按画面尺寸计算并缓存像素多边形和裁剪区域"""
+        height, width = shape[:2]
+        cached = self._cache.get((height, width))
+        if cached is not None:
+            return cached
+        polygons = [zone.to_pixels(width, height) for zone in self.zones]
+        points = np.concatenate(polygons)
+        x1, y1 = points.min(axis=0)
+        x2, y2 = points.max(axis=0)
+        margin_x, margin_y = (x2 - x1) * self.crop_margin, (y2 - y1) * self.crop_margin
+        x1, y1 = max(0, int(x1 - margin_x)), max(0, int(y1 - margin_y))
+        x2, y2 = min(width, int(x2 + margin_x)), min(height, int(y2 + margin_y))
+        # 人员只有脚底在禁区内才告警，身体会伸出禁区上方，裁剪区域向上多留一段
+        y1 = max(0, y1 - (y2 - y1) // 2)
+        area_ratio = (x2 - x1) * (y2 - y1) / float(width * height)
+        crop_rect = (x1, y1, x2, y2) if area_ratio <= self.max_crop_ratio else None
+        self._cache[(height, width)] = (polygons, crop_rect)
+        return polygons, crop_rect
+
+    def crop_rect(self, shape) -> Optional[Tuple[int, int, int, int]]:
+        """推理区域 (x1, y1, x2, y2)，禁区覆盖大部分画面时返回None"""
+        self._crop_rect = self._resolve(shape)[1]
+        return self._crop_rect
+
+    def crop(self, frame: np.ndarray, reference_shape=None) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        裁剪出推理区域
+        :param reference_shape: 禁区所对应画面的尺寸 (检测用子码流、告警按主码流判断时为主码流尺寸)；
+                                裁剪区域按该尺寸计算后再缩放到 frame 的分辨率，None表示与 frame 相同
+        :return: (裁剪后的图像, 裁剪区域左上角在 frame 中的坐标)；不需要裁剪时返回原帧和(0, 0)
+        """
+        height, width = frame.shape[:2]
+        if reference_shape is None:
+            reference_shape = frame.shape
+        rect = self.crop_rect(reference_shape)
+        if rect is None:
+            return frame, (0, 0)
+        x1, y1, x2, y2 = rect
+        ref_height, ref_width = reference_shape[:2]
+        if (ref_height, ref_width) != (height, width):
+            scale_x, scale_y = width / ref_width, height / ref_height
+            x1, y1 = int(x1 * scale_x), int(y1 * scale_y)
+            x2, y2 = min(width, int(np.ceil(x2 * scale_x))), min(height, int(np.ceil(y2 * scale_y)))
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    @staticmethod
+    def offset_detections(detections: np.ndarray, offset: Tuple[int, int]) -> np.ndarray:
+        """把裁剪图上的检测框平移回原图坐标"""
+        if offset == (0, 0) or len(detections) == 0:
+            return detections
+        detections = np.array(detections, dtype=np.float32, copy=True)
+        detections[:, [0, 2]] += offset[0]
+        detections[:, [1, 3]] += offset[1]
+        return detections
+
+    def zone_of(self, bbox, shape) -> Optional[str]:
+        """
+        人员所在的禁区
+        :param bbox: 检测框 (x1, y1, x2, y2)
+        :return: 脚底点所在禁区的名称，不在任何禁区内时返回None
+        """
+        polygons = self._resolve(shape)[0]
+        foot = (float(bbox[0] + bbox[2]) / 2, float(bbox[3]))
+        for zone, polygon in zip(self.zones, polygons):
+            if cv2.pointPolygonTest(polygon, foot, False) >= 0:
+                return zone.name
+        return None
+
+    def draw(self, frame: np.ndarray, color=(0, 0, 255)):
+        """在画面上绘制禁区边界"""
+        cv2.polylines(frame, self._resolve(frame.shape)[0], True, color, 2)
+
+    def describe(self) -> Dict:
+        return {
+            'zones': [{'name': zone.name, 'polygon': zone.points.tolist()} for zone in self.zones],
+            'cropRect': list(self._crop_rect) if self._crop_rect else None,
+        }
@@ -21,9 +21,13 @@ export const API_CONFIG = {
     } : {})
   },
   
-  // 视频流端点
+  // 检测框由浏览器根据 track_update 推送叠加绘制 (视频流为不含标注的原始画面，服务端不再绘制)
+  CLIENT_OVERLAY: true,
+
+  // 视频流端点 (tier: full 全分辨率 / medium 中等分辨率 / thumb 缩略图；overlay: server 服务端绘制 / client 浏览器绘制)
   VIDEO_STREAM: {
-    getUrl: (cameraId) => `${API_CONFIG.BASE_URL}/video_feed/${cameraId}`
+    getUrl: (cameraId, tier = 'full', overlay = 'server') =>
+      `${API_CONFIG.BASE_URL}/video_feed/${cameraId}?tier=${tier}` + (overlay === 'client' ? '&overlay=client' : '')
   },
   
   // 设备管理端点